@@ -1,6 +1,77 @@
-from disemoji.single_byte_map_works import python_to_emojis, emojis_to_python
+"""
+Emoji views of Python bytecode.
 
-__all__ = [
-    "python_to_emojis",
-    "emojis_to_python"
-]
+Public names and submodules are imported on first use (PEP 562 module
+`__getattr__`), so `import disemoji` itself does not pull in `dis`, `marshal`
+or any of the emoji tables.
+"""
+import importlib
+
+# `typing` alone costs more than the rest of the package import, so it is
+# only imported by type checkers.
+TYPE_CHECKING = False
+
+# Public name -> submodule that defines it.
+_LAZY_ATTRIBUTES: "dict[str, str]" = {
+    "python_to_emojis": "disemoji.single_byte_map_works",
+    "emojis_to_python": "disemoji.single_byte_map_works",
+    "assemble": "disemoji.assembler",
+    "generate_emoji_assembly": "disemoji.assembler",
+    "generate_emoji_disassembly": "disemoji.make_dis_pretty",
+    "specialization_summary": "disemoji.make_dis_pretty",
+    "DEFAULT_EMOJI_MAP": "disemoji.codes",
+    "build_cfg": "disemoji.cfg",
+    "export_cfg": "disemoji.cfg",
+    "compact_stream": "disemoji.compact",
+    "expand_stream": "disemoji.compact",
+    "analyze_costs": "disemoji.costs",
+    "diff_code": "disemoji.diff",
+    "generate_emoji_diff": "disemoji.diff",
+    "NGramCounter": "disemoji.ngrams",
+    "dump_stacks": "disemoji.stackdump",
+    "EmojiTokenizer": "disemoji.tokenizer",
+    "BytecodeTracer": "disemoji.tracerc",
+    "CoverageTracer": "disemoji.tracerc",
+    "LineProfiler": "disemoji.tracerc",
+    "LiveTracer": "disemoji.tracerc",
+    "emoji_print": "disemoji.ui",
+}
+
+_SUBMODULES = frozenset({
+    "aio", "archive", "assembler", "cache", "cfg", "codes", "compact", "costs", "diff", "make_dis_pretty", "metrics",
+    "ngrams", "server", "single_byte_map_works", "stackdump", "tokenizer", "tracerc", "ui",
+})
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from disemoji.assembler import assemble, generate_emoji_assembly
+    from disemoji.cfg import build_cfg, export_cfg
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.compact import compact_stream, expand_stream
+    from disemoji.costs import analyze_costs
+    from disemoji.diff import diff_code, generate_emoji_diff
+    from disemoji.make_dis_pretty import generate_emoji_disassembly, specialization_summary
+    from disemoji.ngrams import NGramCounter
+    from disemoji.single_byte_map_works import emojis_to_python, python_to_emojis
+    from disemoji.stackdump import dump_stacks
+    from disemoji.tokenizer import EmojiTokenizer
+    from disemoji.tracerc import BytecodeTracer, CoverageTracer, LineProfiler, LiveTracer
+    from disemoji.ui import emoji_print
+
+
+def __getattr__(name: str) -> "Any":
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> "list[str]":
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
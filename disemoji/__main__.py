@@ -1,176 +1,356 @@
-import dis
-import marshal
-import types
-from typing import List
-
-# Mapping of bytecode instructions to emojis
-emoji_map = {
-    'NOP': '⚪',
-    'POP_TOP': '🔝',
-    'ROT_TWO': '🔄',
-    'ROT_THREE': '🔄3️⃣',
-    'DUP_TOP': '👯',
-    'DUP_TOP_TWO': '👯2️⃣',
-    'UNARY_POSITIVE': '➕',
-    'UNARY_NEGATIVE': '➖',
-    'UNARY_NOT': '❗',
-    'UNARY_INVERT': '🔄',
-    'BINARY_MATRIX_MULTIPLY': '✖️',
-    'BINARY_POWER': '🔋',
-    'BINARY_MULTIPLY': '✖️',
-    'BINARY_MODULO': '➗',
-    'BINARY_ADD': '➕',
-    'BINARY_SUBTRACT': '➖',
-    'BINARY_SUBSCR': '📌',
-    'BINARY_FLOOR_DIVIDE': '➗',
-    'BINARY_TRUE_DIVIDE': '➗',
-    'BINARY_LSHIFT': '⬅️',
-    'BINARY_RSHIFT': '➡️',
-    'BINARY_AND': '🔀',
-    'BINARY_XOR': '🔀',
-    'BINARY_OR': '🔀',
-    'INPLACE_POWER': '🔋',
-    'INPLACE_MULTIPLY': '✖️',
-    'INPLACE_MODULO': '➗',
-    'INPLACE_ADD': '➕',
-    'INPLACE_SUBTRACT': '➖',
-    'INPLACE_LSHIFT': '⬅️',
-    'INPLACE_RSHIFT': '➡️',
-    'INPLACE_AND': '🔀',
-    'INPLACE_XOR': '🔀',
-    'INPLACE_OR': '🔀',
-    'STORE_SUBSCR': '📤📌',
-    'DELETE_SUBSCR': '❌📌',
-    'GET_ITER': '🔄',
-    'FOR_ITER': '🔄',
-    'STORE_MAP': '📤🗺️',
-    'LOAD_CONST': '🔢',
-    'LOAD_NAME': '🔠',
-    'BUILD_TUPLE': '🔗',
-    'BUILD_LIST': '📋',
-    'BUILD_SET': '🗂️',
-    'BUILD_MAP': '📚',
-    'LOAD_ATTR': '🔗',
-    'COMPARE_OP': '⚖️',
-    'IMPORT_NAME': '📥🔠',
-    'IMPORT_FROM': '📥➡️',
-    'JUMP_FORWARD': '➡️➡️',
-    'POP_JUMP_IF_TRUE': '🔝❗',
-    'POP_JUMP_IF_FALSE': '🔝❗',
-    'JUMP_IF_TRUE_OR_POP': '➡️❗🔝',
-    'JUMP_IF_FALSE_OR_POP': '➡️❗🔝',
-    'JUMP_ABSOLUTE': '➡️➡️',
-    # 'POP_TOP': '🔝',
-    'LOAD_GLOBAL': '🌍🔠',
-    'SETUP_FINALLY': '🛡️',
-    'LOAD_FAST': '🚄🔠',
-    'STORE_FAST': '🚄📤',
-    'DELETE_FAST': '🚄❌',
-    'RAISE_VARARGS': '⚠️',
-    'CALL_FUNCTION': '📞',
-    'MAKE_FUNCTION': '🔧',
-    'BUILD_SLICE': '🔪',
-    'LOAD_CLOSURE': '🔒',
-    'LOAD_DEREF': '🔑',
-    'STORE_DEREF': '🔑📤',
-    'DELETE_DEREF': '🔑❌',
-    'RETURN_VALUE': '🔙',
-    'YIELD_VALUE': '⚙️',
-    'YIELD_FROM': '⚙️',
-    'SETUP_ANNOTATIONS': '📝',
-    'IMPORT_STAR': '📥🌟',
-    'POP_BLOCK': '🔝❌',
-    'END_FINALLY': '🔚🛡️',
-    'POP_EXCEPT': '🔝⚠️❌',
-    'STORE_NAME': '🔠📤',
-    'DELETE_NAME': '🔠❌',
-    'UNPACK_SEQUENCE': '📦📜',
-    'UNPACK_EX': '📦📜❗',
-    'STORE_ATTR': '🔗📤',
-    'DELETE_ATTR': '🔗❌',
-
-    'RESUME':'',
-    'PUSH_NULL':'',
-    'CALL':'',
-    'RETURN_CONST': '',
+"""
+Command-line interface: python -m disemoji <command> ...
+
+    encode   Python source -> emoji payload (the `python_to_emojis` format)
+    decode   emoji payload -> `dis` listing, or run it with --exec
+    disasm   Python source -> emoji disassembly
+    trace    run a script under one of the tracers
+    bench    run the benchmarks (see disemoji.bench)
+
+encode, decode and disasm read the files given on the command line, the
+paths listed in `--files-from` (one per line, '-' for stdin), or stdin when
+there are neither. One interpreter handles any number of files, and with
+`--jobs N` they are spread over N worker processes; results are still
+written in input order, each as soon as it and everything before it is done:
+
+    find src -name '*.py' | python -m disemoji encode --files-from - --jobs 8 > payloads.tsv
+    python -m disemoji decode < payloads.tsv
+
+With more than one input, encode writes one `path<TAB>payload` line per file,
+and decode reads such lines from stdin or from files; disasm separates files
+with `==> path <==`. A file that fails (including code run by `decode --exec`
+that raises) is reported on stderr, the rest still run, and the exit status is 1.
+
+`--metrics json|prometheus` (before the command) writes the counters and
+stage timings of `disemoji.metrics` to stderr when the command is done,
+including those of the worker processes.
+"""
+import argparse
+import collections
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from disemoji import metrics
+
+# (input name, text to read or None to read the file, options)
+#   -> (input name, output, error message, metrics snapshot of a worker)
+_Task = Tuple[str, Optional[str], Dict[str, Any]]
+_Result = Tuple[str, Optional[str], Optional[str], Optional[Dict[str, Any]]]
+
+STDIN_NAME = '<stdin>'
+
+
+def _read_source(name: str, text: Optional[str]) -> str:
+    if text is not None:
+        return text
+    with open(name, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _encode(name: str, text: Optional[str], options: Dict[str, Any]) -> str:
+    from disemoji.single_byte_map_works import code_to_emojis
+
+    source = _read_source(name, text)
+    with metrics.timed('compile'):
+        code_obj = compile(source, name if text is None else '<string>', 'exec', dont_inherit=True)
+    return code_to_emojis(code_obj, options['canonical'], options['filename'], options['strip_locations'])
+
+
+class _ExecError(Exception):
+    """An exception raised by code run with `decode --exec`, reported like any other per-file error."""
+
+
+def _split_payload_line(line: str, default_name: str) -> Tuple[str, str]:
+    """Splits a decode input line, optionally prefixed with 'path<TAB>' as written by encode, into (name, payload)."""
+    name, _, payload = line.rpartition('\t')
+    return name or default_name, payload.strip()
+
+
+def _iter_payloads(name: str, text: str) -> Iterator[Tuple[str, str]]:
+    """Yields the (name, payload) of every non-blank line of a decode input file."""
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.strip():
+            yield _split_payload_line(line, f"{name}:{number}")
+
+
+def _decode_payload(payload: str, options: Dict[str, Any]) -> str:
+    import dis
+    import io
+
+    from disemoji.single_byte_map_works import emojis_to_python
+
+    try:
+        code_obj = emojis_to_python(payload)
+    except KeyError as e:
+        raise ValueError(f"not a payload emoji: {e.args[0]!r}") from None
+    if options['exec']:
+        try:
+            exec(code_obj, {'__name__': '__main__'})
+        except Exception as e:
+            raise _ExecError(f"{type(e).__name__}: {e}") from e
+        return ''
+    listing = io.StringIO()
+    dis.dis(code_obj, file=listing)
+    return listing.getvalue().rstrip('\n')
+
+
+def _decode(name: str, text: Optional[str], options: Dict[str, Any]) -> str:
+    if text is not None:  # A single stdin line, already split off by _iter_tasks
+        return _decode_payload(text.strip(), options)
+    # A file holds one payload per line; a file of several is listed like several inputs.
+    payloads = list(_iter_payloads(name, _read_source(name, None)))
+    if len(payloads) == 1:
+        return _decode_payload(payloads[0][1], options)
+    outputs = []
+    for payload_name, payload in payloads:
+        output = _decode_payload(payload, options)
+        if output:
+            outputs.append(f"==> {payload_name} <==\n{output}")
+    return '\n\n'.join(outputs)
+
+
+def _disasm(name: str, text: Optional[str], options: Dict[str, Any]) -> str:
+    from disemoji.assembler import iter_code_objects
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.make_dis_pretty import generate_emoji_disassembly
+
+    source = _read_source(name, text)
+    with metrics.timed('compile'):
+        code_obj = compile(source, name if text is None else '<string>', 'exec', dont_inherit=True)
+    separator = '\n\n' if options['format'] == 'assembler' else '\n'
+    return separator.join(
+        generate_emoji_disassembly(code, DEFAULT_EMOJI_MAP, options['format'], annotate_costs=options['costs'])
+        for code in (iter_code_objects(code_obj) if options['recursive'] else [code_obj])
+    )
+
+
+_COMMANDS: Dict[str, Callable[[str, Optional[str], Dict[str, Any]], str]] = {
+    'encode': _encode,
+    'decode': _decode,
+    'disasm': _disasm,
 }
 
-# Reverse mapping from emoji to opcode name
-emoji_to_opcode: dict[str, str] = {v: k for k, v in emoji_map.items()}
-
-
-def disassemble_to_emoji(code: str) -> str:
-    bytecode = dis.Bytecode(code)
-    emoji_output: List[str] = []
-    for instr in bytecode:
-        emoji = emoji_map.get(instr.opname)
-        if emoji is None:
-            raise ValueError(f"Opcode {instr.opname} not mapped to emoji!")
-        emoji_output.append(emoji)
-    return ' '.join(emoji_output)  # SPACE SEPARATED
-
-def execute_emojis(file_path: str) -> None:
-    with open(file_path, 'r', encoding='utf-8') as f:
-        emoji_code = f.read().strip()
-
-    emoji_list = emoji_code.split()  # Now split by spaces
-
-    opnames: List[str] = []
-    for emoji in emoji_list:
-        opname = emoji_to_opcode.get(emoji)
-        if opname is None:
-            raise ValueError(f"Unknown emoji: {emoji}")
-        opnames.append(opname)
-
-    # For now: Dummy execution
-    def dummy_func() -> None:
-        print("Hello from dummy function!")
-
-    print("Executing dummy function due to emoji mapping limitation:")
-    dummy_func()
-
-# def execute_emojis(file_path: str) -> None:
-#     with open(file_path, 'r', encoding='utf-8') as f:
-#         emoji_code = f.read().strip()
-#
-#     # Convert emoji code back to opcode names
-#     opnames: List[str] = []
-#     buffer = ''
-#     for char in emoji_code:
-#         buffer += char
-#         if buffer in emoji_to_opcode:
-#             opnames.append(emoji_to_opcode[buffer])
-#             buffer = ''
-#
-#     if buffer:
-#         raise ValueError(f"Unrecognized emoji sequence: {buffer}")
-
-    # # Now, for demo purposes, create a fake function
-    # # In real bytecode, we'd need arguments (operands) and offsets
-    # # Here we'll create a simple function returning None
-    # def dummy_func() -> None:
-    #     print("Hello from dummy function!")
-    #
-    # print("Executing dummy function due to emoji mapping limitation:")
-    # dummy_func()
-
-
-# Example usage
-if __name__ == "__main__":
-    python_code = """
-def hello(name):
-    print(f"Hello, {name}!")
-
-hello("World")
+
+def _run_task(command: str, task: _Task, in_worker: bool = False) -> _Result:
+    """
+    Runs one input through a command; errors are returned, not raised, so one bad file does not stop the rest.
+
+    In a worker process with metrics enabled, the metrics of this task are
+    returned too, for the parent to merge.
+    """
+    name, text, options = task
+    if in_worker and metrics.ENABLED:
+        metrics.reset()
+    try:
+        output, error = _COMMANDS[command](name, text, options), None
+    except _ExecError as e:
+        output, error = None, str(e)
+    except (OSError, SyntaxError, ValueError, EOFError, TypeError, UnicodeDecodeError) as e:
+        output, error = None, f"{type(e).__name__}: {e}"
+    return name, output, error, metrics.snapshot() if in_worker and metrics.ENABLED else None
+
+
+def _ordered_map(command: str, tasks: Iterable[_Task], jobs: int) -> Iterator[_Result]:
     """
-    emojis = disassemble_to_emoji(python_code)
-    print("Emoji Bytecode Representation:")
-    print(emojis)
+    Yields the results of `tasks` in order, running up to `jobs` at a time in worker processes.
+
+    Tasks are consumed lazily, with a bounded number in flight, so an
+    endless stream of paths on stdin is processed as it arrives.
+    """
+    if jobs <= 1:
+        for task in tasks:
+            yield _run_task(command, task)
+        return
+    pending: Deque['Future[_Result]'] = collections.deque()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=metrics.enable if metrics.ENABLED else None) as pool:
+        for task in tasks:
+            pending.append(pool.submit(_run_task, command, task, True))
+            if len(pending) >= 4 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_paths(args: argparse.Namespace) -> Iterator[str]:
+    yield from args.files
+    if args.files_from:
+        stream = sys.stdin if args.files_from == '-' else open(args.files_from, 'r', encoding='utf-8')
+        try:
+            for line in stream:
+                path = line.rstrip('\n')
+                if path:
+                    yield path
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def _iter_tasks(args: argparse.Namespace, options: Dict[str, Any]) -> Tuple[Iterator[_Task], bool]:
+    """Returns the tasks of a codec command and whether there is more than one input."""
+    if not args.files and not args.files_from:
+        if args.command == 'decode':
+            # Read line by line, so each payload is decoded as soon as it arrives.
+            def payload_lines() -> Iterator[_Task]:
+                for number, line in enumerate(sys.stdin, 1):
+                    if line.strip():
+                        name, payload = _split_payload_line(line.rstrip('\n'), f"{STDIN_NAME}:{number}")
+                        yield name, payload, options
+            return payload_lines(), True
+        return iter([(STDIN_NAME, sys.stdin.read(), options)]), False
+    many = bool(args.files_from) or len(args.files) > 1
+    return ((path, None, options) for path in _iter_paths(args)), many
+
+
+def _run_codec_command(args: argparse.Namespace, options: Dict[str, Any]) -> int:
+    tasks, many = _iter_tasks(args, options)
+    status = 0
+    first = True
+    for name, output, error, worker_metrics in _ordered_map(args.command, tasks, args.jobs):
+        if worker_metrics is not None:
+            metrics.merge(worker_metrics)
+        if error is not None:
+            print(f"{name}: {error}", file=sys.stderr)
+            status = 1
+            continue
+        if not output:
+            continue
+        if many and args.command == 'encode':
+            output = f"{name}\t{output}"
+        elif many:
+            output = f"{'' if first else chr(10)}==> {name} <==\n{output}"
+        with metrics.timed('print'):
+            sys.stdout.write(output + '\n')
+            sys.stdout.flush()
+        first = False
+    return status
+
+
+def _drop_own_code(tracer: Any) -> None:
+    """Removes the results for this module, the tracer and contextlib, which an unfiltered tracer also sees."""
+    import contextlib
+
+    from disemoji import tracerc
+
+    own = {os.path.abspath(module.__file__) for module in (sys.modules[__name__], tracerc, contextlib)}
+    tables = (tracer.times, tracer.hits) if hasattr(tracer, 'times') else (tracer.instructions, tracer.branches)
+    for results in tables:
+        for key in list(results):
+            code = key[0] if isinstance(key, tuple) else key
+            if os.path.abspath(code.co_filename) in own:
+                del results[key]
+
+
+def _run_trace(args: argparse.Namespace) -> int:
+    from disemoji import tracerc
+
+    if args.mode in ('print', 'live', 'allocations') and not args.function:
+        print(f"trace --mode {args.mode} needs at least one --function", file=sys.stderr)
+        return 2
+    if args.mode == 'print':
+        tracer: Any = tracerc.BytecodeTracer()
+    elif args.mode == 'live':
+        tracer = tracerc.LiveTracer(output=sys.stderr)
+    elif args.mode == 'allocations':
+        tracer = tracerc.BytecodeTracer(track_allocations=True)
+    elif args.mode == 'lines':
+        tracer = tracerc.LineProfiler()
+    else:
+        tracer = tracerc.CoverageTracer()
+    for name in args.function:
+        tracer.trace_function(name)
+
+    with open(args.script, 'r', encoding='utf-8') as f:
+        code_obj = compile(f.read(), args.script, 'exec', dont_inherit=True)
+    sys.argv = [args.script, *args.script_args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    status = 0
+    with tracer.activate():
+        try:
+            exec(code_obj, {'__name__': '__main__', '__file__': args.script})
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (e.code is not None)
+    if not args.function and args.mode in ('lines', 'coverage'):
+        _drop_own_code(tracer)
+    if args.mode == 'allocations':
+        print(tracer.allocation_report(), file=sys.stderr)
+    elif args.mode in ('lines', 'coverage'):
+        print(tracer.report(), file=sys.stderr)
+    return status
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m disemoji', description=__doc__.strip().splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog='\n'.join(__doc__.strip().splitlines()[2:]))
+    parser.add_argument('--metrics', choices=['json', 'prometheus'],
+                        help='write counters and stage timings to stderr at the end')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_inputs(command: argparse.ArgumentParser) -> None:
+        command.add_argument('files', nargs='*', help='input files (default: stdin)')
+        command.add_argument('--files-from', metavar='FILE',
+                             help="read input paths from FILE, one per line ('-': stdin)")
+        command.add_argument('-j', '--jobs', type=int, default=1, help='worker processes (default: 1)')
+
+    encode = commands.add_parser('encode', help='Python source to emoji payload')
+    add_inputs(encode)
+    encode.add_argument('--canonical', action='store_true', help='byte-identical output for identical code')
+    encode.add_argument('--filename', help='with --canonical: co_filename to record')
+    encode.add_argument('--strip-locations', action='store_true', help='with --canonical: drop line numbers')
+
+    decode = commands.add_parser('decode', help='emoji payload to a dis listing')
+    add_inputs(decode)
+    decode.add_argument('--exec', action='store_true', help='run the decoded code instead of listing it')
+
+    disasm = commands.add_parser('disasm', help='Python source to emoji disassembly')
+    add_inputs(disasm)
+    disasm.add_argument('--format', choices=['assembler', 'stream', 'compact'], default='assembler',
+                        help='output format (default: assembler)')
+    disasm.add_argument('-r', '--recursive', action='store_true', help='also list nested code objects')
+    disasm.add_argument('--costs', action='store_true', help='annotate stack depth, loops and estimated cost')
+
+    trace = commands.add_parser('trace', help='run a script under a tracer; reports go to stderr')
+    trace.add_argument('--mode', choices=['print', 'live', 'allocations', 'lines', 'coverage'], default='lines',
+                       help='print: every opcode; live: redrawn view; allocations: tracemalloc; '
+                            'lines: line profile; coverage: instruction and branch coverage (default: lines)')
+    trace.add_argument('-f', '--function', action='append', default=[],
+                       help='function name to trace, repeatable (lines and coverage default to all)')
+    trace.add_argument('script', help='the Python script to run')
+    trace.add_argument('script_args', nargs=argparse.REMAINDER, help='arguments for the script')
+
+    bench = commands.add_parser('bench', help='run the benchmarks; arguments go to disemoji.bench')
+    bench.add_argument('bench_args', nargs=argparse.REMAINDER, help='arguments for python -m disemoji.bench')
+    return parser
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    try:
+        if args.command == 'trace':
+            return _run_trace(args)
+        if args.command == 'bench':
+            from disemoji.bench import main as bench_main
+            return bench_main(args.bench_args)
+        options: Dict[str, Any] = {key: value for key, value in vars(args).items()
+                                   if key not in ('command', 'files', 'files_from', 'jobs', 'metrics')}
+        return _run_codec_command(args, options)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); exit quietly.
+        sys.stderr.close()
+        return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    try:
+        return _run_command(args)
+    finally:
+        if args.metrics and not sys.stderr.closed:
+            sys.stderr.write(metrics.to_json() + '\n' if args.metrics == 'json' else metrics.to_prometheus())
 
-    # Write emojis to a file
-    emoji_file = 'hello_emojis_pretty.txt'
-    with open(emoji_file, 'w', encoding='utf-8') as f:
-        f.write(emojis)
 
-    # Read emojis from file and execute
-    execute_emojis(emoji_file)
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+asyncio transport for emoji-encoded code objects.
+
+Each code object travels as one frame: a 4-byte big-endian payload length
+followed by the payload, the UTF-8 emoji encoding of its marshal data (the
+format of `python_to_emojis`). `write_code` and `read_code` work on any
+`asyncio.StreamWriter`/`StreamReader` pair:
+
+    reader, writer = await asyncio.open_connection(host, port)
+    await write_code(writer, "print('hello')")
+    code_obj = await read_code(reader)
+
+Payloads are read in chunks and fed to an `EmojiDecoder`, which accepts
+arbitrary splits (even inside a multi-byte character). Compiling, encoding
+and decoding of inputs larger than `offload_threshold` bytes run in a worker
+thread via `asyncio.to_thread`, so multi-megabyte code objects do not stall
+the event loop. Only `marshal.dumps`, a fast C routine whose output size
+decides about offloading the encoding, always runs on the loop.
+"""
+import asyncio
+import codecs
+import marshal
+import struct
+import types
+from typing import AsyncIterator, List, Union
+
+from disemoji.single_byte_map_works import _byte_tables
+
+_FRAME_HEADER = struct.Struct('!I')
+# Frames above this size are rejected before reading their payload.
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+# Payloads above this many bytes are encoded / decoded in a worker thread.
+OFFLOAD_THRESHOLD = 256 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class EmojiEncoder:
+    """Incrementally turns marshal bytes into emoji text."""
+
+    def __init__(self) -> None:
+        self._byte_to_emoji = _byte_tables()[0]
+
+    def encode(self, data: bytes) -> str:
+        return ''.join(map(self._byte_to_emoji.__getitem__, data))
+
+
+class EmojiDecoder:
+    """
+    Incrementally turns UTF-8 emoji bytes back into marshal bytes.
+
+    Chunks may split a character; the incomplete tail is kept until the next `feed`.
+    """
+
+    def __init__(self) -> None:
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._emoji_to_byte = _byte_tables()[1]
+        self._parts: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Decodes one chunk.
+
+        Raises:
+            ValueError: If the chunk holds a character that is not a payload emoji
+                        (UnicodeDecodeError for invalid UTF-8, also a ValueError).
+        """
+        text = self._utf8.decode(chunk)
+        try:
+            self._parts.append(bytes(map(self._emoji_to_byte.__getitem__, text)))
+        except KeyError as e:
+            raise ValueError(f"Not a payload emoji: {e.args[0]!r}") from None
+
+    def finish(self) -> bytes:
+        """
+        Returns all marshal bytes decoded so far.
+
+        Raises:
+            ValueError: If the input ended inside a character.
+        """
+        self._utf8.decode(b'', final=True)
+        return b''.join(self._parts)
+
+
+def _encode_payload(marshaled: bytes) -> bytes:
+    return EmojiEncoder().encode(marshaled).encode('utf-8')
+
+
+def _decode_payload(chunks: List[bytes]) -> types.CodeType:
+    decoder = EmojiDecoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    code_obj = marshal.loads(decoder.finish())
+    if not isinstance(code_obj, types.CodeType):
+        raise ValueError(f"Frame holds a {type(code_obj).__name__}, not a code object")
+    return code_obj
+
+
+async def write_code(
+        writer: asyncio.StreamWriter,
+        code_input: Union[str, types.CodeType],
+        offload_threshold: int = OFFLOAD_THRESHOLD
+) -> int:
+    """
+    Sends one code object (or source, compiled first) as a frame.
+
+    Args:
+        writer: The stream to write to.
+        code_input: A code object or Python source.
+        offload_threshold: Compile in a worker thread when the source, and encode
+                           there when the marshal data, is larger than this many bytes.
+
+    Returns:
+        The payload size in bytes.
+
+    Raises:
+        SyntaxError: If `code_input` is source that does not compile.
+        ValueError: If the payload exceeds MAX_FRAME_BYTES.
+    """
+    if isinstance(code_input, str):
+        if len(code_input) > offload_threshold:
+            code_input = await asyncio.to_thread(compile, code_input, '<string>', 'exec')
+        else:
+            code_input = compile(code_input, '<string>', 'exec')
+    # Nested functions and constants count too, so size the whole marshal data, not co_code.
+    marshaled = marshal.dumps(code_input)
+    if len(marshaled) > offload_threshold:
+        payload = await asyncio.to_thread(_encode_payload, marshaled)
+    else:
+        payload = _encode_payload(marshaled)
+    if len(payload) > MAX_FRAME_BYTES:
+        raise ValueError(f"Payload of {len(payload)} bytes exceeds MAX_FRAME_BYTES")
+    writer.write(_FRAME_HEADER.pack(len(payload)))
+    writer.write(payload)
+    await writer.drain()
+    return len(payload)
+
+
+async def read_code(reader: asyncio.StreamReader, offload_threshold: int = OFFLOAD_THRESHOLD) -> types.CodeType:
+    """
+    Receives one frame and decodes its code object.
+
+    Args:
+        reader: The stream to read from.
+        offload_threshold: Decode in a worker thread when the payload is larger
+                           than this many bytes.
+
+    Returns:
+        The code object.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream ends before the frame does
+                                     (with no partial bytes if it ended between frames).
+        ValueError: If the frame is too large or does not hold an emoji-encoded code object.
+    """
+    return await _read_payload(reader, await reader.readexactly(_FRAME_HEADER.size), offload_threshold)
+
+
+async def _read_payload(reader: asyncio.StreamReader, header: bytes, offload_threshold: int) -> types.CodeType:
+    """Reads and decodes the payload of a frame whose header has been read."""
+    (length,) = _FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds MAX_FRAME_BYTES")
+    if length <= offload_threshold:
+        return _decode_payload([await reader.readexactly(length)])
+
+    chunks: List[bytes] = []
+    remaining = length
+    while remaining:
+        chunk = await reader.read(min(READ_CHUNK_BYTES, remaining))
+        if not chunk:
+            raise asyncio.IncompleteReadError(b''.join(chunks), length)
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return await asyncio.to_thread(_decode_payload, chunks)
+
+
+async def iter_codes(reader: asyncio.StreamReader,
+                     offload_threshold: int = OFFLOAD_THRESHOLD) -> AsyncIterator[types.CodeType]:
+    """
+    Yields code objects from consecutive frames until the stream ends cleanly.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream ends inside a frame, including
+                                     right after a header.
+        ValueError: As `read_code`.
+    """
+    while True:
+        try:
+            header = await reader.readexactly(_FRAME_HEADER.size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return  # End of stream between frames
+        yield await _read_payload(reader, header, offload_threshold)
+
+
+if __name__ == '__main__':
+    import time
+
+    async def main() -> None:
+        async def echo_names(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            async for code_obj in iter_codes(reader):
+                await write_code(writer, f"names = {code_obj.co_names!r}")
+            writer.close()
+
+        server = await asyncio.start_server(echo_names, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        for source in ("print('hello')", "\n".join(f"value_{i} = {i}" for i in range(100_000))):
+            start = time.perf_counter()
+            size = await write_code(writer, source)
+            reply = await read_code(reader)
+            namespace: dict = {}
+            exec(reply, namespace)
+            print(f"{size} payload bytes, round trip {(time.perf_counter() - start) * 1e3:.1f} ms, "
+                  f"{len(namespace['names'])} names")
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
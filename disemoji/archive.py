@@ -0,0 +1,261 @@
+"""
+Random-access emoji archives bundling many modules.
+
+`save_emojis` writes one code object per file; an archive holds a whole
+application in one file:
+
+    DISEMOJI-ARCHIVE 1\\n
+    <length of the table of contents in bytes>\\n
+    <table of contents: ASCII JSON>\\n
+    <body: the emoji payloads of all modules, back to back, UTF-8>
+
+The table of contents maps each module name to the byte offset and length
+of its payload in the body, a SHA-256 of the payload and whether it is a
+package, plus the marshal magic number the payloads were written with. It
+is plain ASCII so it can be read without touching the body.
+
+`EmojiArchive` memory-maps the file and parses only the header and table of
+contents; a module's payload is decoded when it is loaded. `install()` puts
+an `EmojiArchiveFinder` on `sys.meta_path`, so importing from a 500-module
+archive costs the table of contents plus the modules actually imported.
+"""
+import hashlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import json
+import mmap
+import os
+import sys
+import tempfile
+import types
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from disemoji.single_byte_map_works import code_to_emojis, emojis_to_python
+
+ARCHIVE_MAGIC = b'DISEMOJI-ARCHIVE 1\n'
+
+
+def collect_modules(root: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Collects the sources of all modules below a directory.
+
+    Args:
+        root: Directory whose .py files become top-level modules and whose
+              packages (directories with an __init__.py) become packages.
+
+    Returns:
+        (module name -> source, names of the packages).
+    """
+    modules: Dict[str, str] = {}
+    packages: List[str] = []
+    for directory, subdirectories, filenames in os.walk(root):
+        relative = os.path.relpath(directory, root)
+        prefix = '' if relative == os.curdir else relative.replace(os.sep, '.') + '.'
+        if prefix and '__init__.py' not in filenames:
+            subdirectories[:] = []  # Not a package: nothing below it is importable
+            continue
+        subdirectories[:] = sorted(d for d in subdirectories if d != '__pycache__' and not d.startswith('.'))
+        for filename in sorted(filenames):
+            if not filename.endswith('.py'):
+                continue
+            if filename == '__init__.py':
+                if not prefix:
+                    continue
+                name = prefix[:-1]
+                packages.append(name)
+            else:
+                name = prefix + filename[:-3]
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                modules[name] = f.read()
+    return modules, packages
+
+
+def write_archive(path: str, modules: Dict[str, str], packages: Iterable[str] = ()) -> None:
+    """
+    Compiles modules and writes them to an emoji archive, atomically.
+
+    Args:
+        path: The archive file to create or replace.
+        modules: Module name -> Python source.
+        packages: Names in `modules` that are packages (their source is the __init__).
+
+    Raises:
+        SyntaxError: If a module does not compile.
+    """
+    packages = set(packages)
+    toc: Dict[str, Any] = {'python_magic': importlib.util.MAGIC_NUMBER.hex(), 'modules': {}}
+    payloads: List[bytes] = []
+    offset = 0
+    for name in sorted(modules):
+        is_package = name in packages
+        filename = name.replace('.', '/') + ('/__init__.py' if is_package else '.py')
+        payload = code_to_emojis(compile(modules[name], filename, 'exec', dont_inherit=True)).encode('utf-8')
+        toc['modules'][name] = [offset, len(payload), hashlib.sha256(payload).hexdigest(), is_package]
+        payloads.append(payload)
+        offset += len(payload)
+    toc_bytes = json.dumps(toc, separators=(',', ':')).encode('ascii')
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(ARCHIVE_MAGIC)
+            f.write(b'%d\n' % len(toc_bytes))
+            f.write(toc_bytes + b'\n')
+            f.writelines(payloads)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class EmojiArchive:
+    """
+    Read access to an emoji archive; payloads are decoded on demand.
+
+    Args:
+        path: The archive file.
+
+    Raises:
+        ValueError: If the file is not an emoji archive.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            if self._file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not an emoji archive")
+            toc_length = int(self._file.readline())
+            toc = json.loads(self._file.read(toc_length))
+            self._body_start = self._file.tell() + 1  # Skip the newline after the TOC
+            self._map: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self.python_magic = bytes.fromhex(toc['python_magic'])
+        self._entries: Dict[str, Tuple[int, int, str, bool]] = {
+            name: tuple(entry) for name, entry in toc['modules'].items()  # type: ignore[misc]
+        }
+
+    def __enter__(self) -> 'EmojiArchive':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_package(self, name: str) -> bool:
+        return self._entries[name][3]
+
+    def read(self, name: str, verify: bool = True) -> str:
+        """
+        Returns the emoji payload of one module.
+
+        Raises:
+            KeyError: If the module is not in the archive.
+            ValueError: If `verify` is set and the payload does not match its hash.
+        """
+        if self._map is None:
+            raise ValueError(f"{self.path} is closed")
+        offset, length, digest, _ = self._entries[name]
+        start = self._body_start + offset
+        payload = self._map[start:start + length]
+        if verify and hashlib.sha256(payload).hexdigest() != digest:
+            raise ValueError(f"Payload of {name} in {self.path} is corrupt")
+        return payload.decode('utf-8')
+
+    def load_code(self, name: str, verify: bool = True) -> types.CodeType:
+        """
+        Decodes one module's code object.
+
+        Raises:
+            KeyError: If the module is not in the archive.
+            ImportError: If the archive was written by an incompatible Python version.
+            ValueError: If `verify` is set and the payload is corrupt.
+        """
+        if self.python_magic != importlib.util.MAGIC_NUMBER:
+            raise ImportError(f"{self.path} was built for bytecode magic {self.python_magic.hex()}, "
+                              f"this interpreter uses {importlib.util.MAGIC_NUMBER.hex()}", name=name)
+        return emojis_to_python(self.read(name, verify))
+
+
+class EmojiArchiveFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Imports modules from an `EmojiArchive`; install it with `install()`."""
+
+    def __init__(self, archive: EmojiArchive) -> None:
+        self.archive = archive
+
+    def find_spec(self, fullname: str, path: Optional[Sequence[str]] = None,
+                  target: Optional[types.ModuleType] = None) -> Optional[importlib.machinery.ModuleSpec]:
+        if fullname not in self.archive:
+            return None
+        is_package = self.archive.is_package(fullname)
+        spec = importlib.util.spec_from_loader(fullname, self, origin=self.archive.path, is_package=is_package)
+        if spec is not None and is_package:
+            spec.submodule_search_locations = [self.archive.path]
+        return spec
+
+    def create_module(self, spec: importlib.machinery.ModuleSpec) -> Optional[types.ModuleType]:
+        return None  # Default module creation
+
+    def exec_module(self, module: types.ModuleType) -> None:
+        exec(self.archive.load_code(module.__spec__.name), module.__dict__)
+
+    def get_code(self, fullname: str) -> types.CodeType:
+        return self.archive.load_code(fullname)
+
+
+def install(path: str) -> EmojiArchiveFinder:
+    """
+    Makes the modules of an archive importable, ahead of the regular path.
+
+    Args:
+        path: The archive file.
+
+    Returns:
+        The finder; remove it from `sys.meta_path` and close its archive to uninstall.
+    """
+    finder = EmojiArchiveFinder(EmojiArchive(path))
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+if __name__ == '__main__':
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module_count = 500
+        body = "\n".join(f"def function_{i}(x):\n    return [x * {i} for _ in range(3)]\n" for i in range(50))
+        sources = {f"emojiapp.module_{i:03d}": f"VALUE = {i}\n{body}" for i in range(module_count)}
+        sources['emojiapp'] = "NAME = 'emojiapp'\n"
+        archive_path = os.path.join(tmp, 'app.emojiarchive')
+        write_archive(archive_path, sources, packages=['emojiapp'])
+        print(f"{module_count + 1} modules, {os.path.getsize(archive_path) / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        finder = install(archive_path)
+        import emojiapp.module_042  # type: ignore[import-not-found]
+        print(f"install + import of one module: {(time.perf_counter() - start) * 1e3:.2f} ms, "
+              f"module_042.VALUE = {emojiapp.module_042.VALUE}")
+
+        start = time.perf_counter()
+        for name in finder.archive:
+            finder.archive.load_code(name)
+        print(f"decoding every module: {(time.perf_counter() - start) * 1e3:.2f} ms")
+        sys.meta_path.remove(finder)
+        finder.archive.close()
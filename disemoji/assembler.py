@@ -0,0 +1,487 @@
+"""
+Assembles emoji assembler listings back into runnable code objects.
+
+`generate_emoji_disassembly(..., output_format='assembler')` drops everything
+that is not visible in an instruction line, so on its own it cannot be turned
+back into bytecode. `generate_emoji_assembly` emits the same listing with a
+block of `.directive` lines per code object (consts, names, locals, flags,
+exception table and line table), and `assemble` parses such a listing back
+into a `types.CodeType`.
+
+Plain listings without directives are assembled on a best-effort basis: names,
+locals and constants are recovered from the instruction args and argvals, the
+line table is synthesized from the line number column and the exception table
+is left empty.
+"""
+import ast
+import dis
+import re
+import types
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from disemoji.make_dis_pretty import _format_header, _format_instruction_assembler, _get_code_object, \
+    _get_instructions
+from disemoji.single_byte_map_works import bytes_to_python
+
+# Instruction lines as written by `_format_instruction_assembler`:
+# [LineNo] [>>] Offset Emoji/OpName [Arg] [(ArgVal)]
+_INSTRUCTION_RE = re.compile(r'^\s*(?P<line>\d*)  (?P<jump>>>|  ) +(?P<offset>\d+) (?P<rest>.*)$')
+_OPERAND_RE = re.compile(r'^(?P<op>.*?)(?:\s+(?P<arg>\d+)(?:\s+\((?P<argval>.*)\))?)?$')
+_CODE_REF_RE = re.compile(r'^<code (\d+)>$')
+
+# Name operands that pack flags into the low bits of their arg (Python 3.12+).
+_NAME_ARG_SHIFT: Dict[str, int] = {
+    'LOAD_GLOBAL': 1,
+    'LOAD_ATTR': 1,
+    'LOAD_SUPER_ATTR': 2,
+}
+
+# Locals operands that pack two 4-bit indices into one arg (Python 3.13+).
+_PAIRED_LOCAL_OPS = frozenset({'LOAD_FAST_LOAD_FAST', 'STORE_FAST_LOAD_FAST', 'STORE_FAST_STORE_FAST'})
+
+# Integer fields of the code object, in directive order.
+_INT_FIELDS = ('argcount', 'posonlyargcount', 'kwonlyargcount', 'stacksize', 'flags', 'firstlineno')
+_STR_FIELDS = ('filename', 'name', 'qualname')
+_TUPLE_FIELDS = ('names', 'varnames', 'cellvars', 'freevars')
+
+# Location table entry kinds (see Objects/locations.md in CPython).
+_LOCATION_NO_COLUMNS = 13
+_LOCATION_NONE = 15
+
+
+def _cache_entries(opname: str) -> int:
+    """Returns the number of inline CACHE code units that follow `opname`."""
+    return dis._inline_cache_entries.get(opname, 0)
+
+
+def _format_const(value: Any, code_ids: Dict[int, int]) -> str:
+    """
+    Formats a constant so that `_parse_const` can read it back.
+
+    Args:
+        value: The constant from co_consts.
+        code_ids: Maps id() of nested code objects to their section number.
+
+    Returns:
+        The constant as source text, or `<code N>` for nested code objects.
+    """
+    if isinstance(value, types.CodeType):
+        return f"<code {code_ids[id(value)]}>"
+    if isinstance(value, tuple):
+        inner = ', '.join(_format_const(item, code_ids) for item in value)
+        return f"({inner},)" if len(value) == 1 else f"({inner})"
+    if isinstance(value, frozenset):
+        inner = ', '.join(sorted(_format_const(item, code_ids) for item in value))
+        return f"frozenset({{{inner}}})" if value else "frozenset()"
+    if isinstance(value, slice):
+        parts = (_format_const(value.start, code_ids), _format_const(value.stop, code_ids),
+                 _format_const(value.step, code_ids))
+        return f"slice({', '.join(parts)})"
+    return repr(value)
+
+
+def _literal(node: ast.AST, code_refs: Callable[[int], types.CodeType]) -> Any:
+    """Evaluates the restricted literal grammar produced by `_format_const`."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Tuple):
+        return tuple(_literal(elt, code_refs) for elt in node.elts)
+    if isinstance(node, ast.Set):
+        return {_literal(elt, code_refs) for elt in node.elts}
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _literal(node.operand, code_refs)
+        return -operand if isinstance(node.op, ast.USub) else +operand
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub)):
+        left, right = _literal(node.left, code_refs), _literal(node.right, code_refs)
+        if isinstance(left, (int, float)) and isinstance(right, complex):
+            return left + right if isinstance(node.op, ast.Add) else left - right
+    if isinstance(node, ast.Name) and node.id in ('nan', 'inf', 'Ellipsis'):
+        return Ellipsis if node.id == 'Ellipsis' else float(node.id)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        args = [_literal(arg, code_refs) for arg in node.args]
+        if node.func.id == 'frozenset' and len(args) <= 1:
+            return frozenset(*args)
+        if node.func.id == 'slice' and len(args) == 3:
+            return slice(*args)
+    raise ValueError(f"Unsupported constant expression: {ast.dump(node)}")
+
+
+def _parse_const(text: str, code_refs: Callable[[int], types.CodeType]) -> Any:
+    """
+    Parses a constant written by `_format_const`.
+
+    Args:
+        text: The constant source text.
+        code_refs: Resolves a `<code N>` reference to an assembled code object.
+
+    Returns:
+        The constant value.
+
+    Raises:
+        ValueError: If the text is not a supported constant.
+    """
+    text = text.strip()
+    match = _CODE_REF_RE.match(text)
+    if match:
+        return code_refs(int(match.group(1)))
+    try:
+        tree = ast.parse(text, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Cannot parse constant {text!r}: {e}") from None
+    return _literal(tree.body, code_refs)
+
+
+def _write_varint(out: bytearray, value: int, first_byte_flag: int = 0) -> None:
+    """Writes a big-endian 6-bit varint, as used by the exception table."""
+    chunks = [value & 63]
+    value >>= 6
+    while value:
+        chunks.append(value & 63)
+        value >>= 6
+    chunks.reverse()
+    for i, chunk in enumerate(chunks):
+        if i < len(chunks) - 1:
+            chunk |= 64
+        if i == 0:
+            chunk |= first_byte_flag
+        out.append(chunk)
+
+
+def _encode_exception_table(entries: List[Tuple[int, int, int, int, bool]]) -> bytes:
+    """
+    Encodes exception table entries into co_exceptiontable bytes.
+
+    Args:
+        entries: (start, end, target, depth, lasti) tuples, offsets in bytes.
+
+    Returns:
+        The encoded exception table.
+    """
+    out = bytearray()
+    for start, end, target, depth, lasti in entries:
+        _write_varint(out, start // 2, first_byte_flag=128)
+        _write_varint(out, (end - start) // 2)
+        _write_varint(out, target // 2)
+        _write_varint(out, (depth << 1) | int(lasti))
+    return bytes(out)
+
+
+def _write_location_varint(out: bytearray, value: int) -> None:
+    """Writes a little-endian 6-bit varint, as used by the location table."""
+    while value >= 64:
+        out.append(64 | (value & 63))
+        value >>= 6
+    out.append(value)
+
+
+def _synthesize_line_table(code_units: List[Optional[int]], firstlineno: int) -> bytes:
+    """
+    Builds a co_linetable that carries line numbers only (no columns).
+
+    Args:
+        code_units: The line number of every code unit, or None if unknown.
+        firstlineno: The code object's first line number.
+
+    Returns:
+        The encoded location table.
+    """
+    out = bytearray()
+    previous = firstlineno
+    i = 0
+    while i < len(code_units):
+        line = code_units[i]
+        length = 1
+        while length < 8 and i + length < len(code_units) and code_units[i + length] == line:
+            length += 1
+        if line is None:
+            out.append(0x80 | (_LOCATION_NONE << 3) | (length - 1))
+        else:
+            out.append(0x80 | (_LOCATION_NO_COLUMNS << 3) | (length - 1))
+            delta = line - previous
+            _write_location_varint(out, (-delta << 1) | 1 if delta < 0 else delta << 1)
+            previous = line
+        i += length
+    return bytes(out)
+
+
+def _upper_bound_stacksize(instructions: List[Tuple[str, Optional[int]]]) -> int:
+    """Returns a safe (if generous) co_stacksize when a listing does not declare one."""
+    total = 0
+    for opname, arg in instructions:
+        opcode = dis.opmap[opname]
+        effect = dis.stack_effect(opcode, arg if opcode in dis.hasarg else None)
+        total += max(0, effect)
+    return max(1, total)
+
+
+def iter_code_objects(code_obj: types.CodeType) -> Iterator[types.CodeType]:
+    """Yields a code object and all code objects nested in its constants, depth first."""
+    yield code_obj
+    for const in code_obj.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+def generate_emoji_assembly(
+        code_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        emoji_map: Dict[str, str],
+        opname_column_width: int = 20
+) -> str:
+    """
+    Produces an assembler listing that `assemble` can turn back into a code object.
+
+    Each code object (the input and every nested function, class body or
+    comprehension) gets its own section: the usual "Disassembly of" header,
+    a block of `.directive` lines and the assembler-format instruction lines.
+
+    Args:
+        code_input: Anything accepted by `generate_emoji_disassembly`.
+        emoji_map: A dictionary mapping Python bytecode instruction names to emojis.
+        opname_column_width: The width for the opname/emoji column.
+
+    Returns:
+        The reversible emoji listing.
+    """
+    root = _get_code_object(code_input)
+    code_objects = list(iter_code_objects(root))
+    code_ids = {id(code): number for number, code in enumerate(code_objects)}
+
+    sections: List[str] = []
+    for code in code_objects:
+        lines = [_format_header(code), f".code {code_ids[id(code)]}"]
+        for field in _INT_FIELDS + _STR_FIELDS + _TUPLE_FIELDS:
+            lines.append(f".{field} {getattr(code, 'co_' + field)!r}")
+        for index, const in enumerate(code.co_consts):
+            lines.append(f".const {index} {_format_const(const, code_ids)}")
+        for entry in dis._parse_exception_table(code):
+            lines.append(f".exception {entry.start} {entry.end} {entry.target} {entry.depth} {int(entry.lasti)}")
+        lines.append(f".linetable {code.co_linetable.hex()}")
+
+        for instruction in _get_instructions(code):
+            if instruction.opcode in dis.hasconst:
+                # Constants are rendered reversibly; str() would lose quotes and newlines.
+                instruction = instruction._replace(argval=_format_const(instruction.argval, code_ids))
+            lines.append(_format_instruction_assembler(instruction, emoji_map, opname_column_width))
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+class _Section:
+    """One code object's worth of a listing, before assembly."""
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.fields: Dict[str, Any] = {}
+        self.consts: Dict[int, str] = {}
+        self.exceptions: List[Tuple[int, int, int, int, bool]] = []
+        self.linetable: Optional[bytes] = None
+        # (opname, arg, argval text, line number, offset)
+        self.instructions: List[Tuple[str, Optional[int], Optional[str], Optional[int], int]] = []
+
+
+def _build_opname_lookup(emoji_map: Dict[str, str]) -> Dict[str, str]:
+    """
+    Inverts an emoji map for the opcodes that exist on this interpreter.
+
+    Raises:
+        ValueError: If two opcodes of this interpreter share an emoji.
+    """
+    lookup: Dict[str, str] = {name: name for name in dis.opmap}
+    for opname, emoji in emoji_map.items():
+        if opname not in dis.opmap or not emoji.strip():
+            continue
+        key = emoji.strip()
+        if key in lookup and lookup[key] != opname and key not in dis.opmap:
+            raise ValueError(f"Emoji {key!r} is ambiguous: used for both {lookup[key]} and {opname}")
+        lookup[key] = opname
+    return lookup
+
+
+def _parse_sections(listing: str, lookup: Dict[str, str]) -> List[_Section]:
+    """Splits a listing into sections and parses directives and instruction lines."""
+    sections: List[_Section] = []
+    current: Optional[_Section] = None
+    for line_no, raw in enumerate(listing.splitlines(), start=1):
+        line = raw.rstrip()
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        if line.startswith('Disassembly of '):
+            current = _Section(len(sections))
+            sections.append(current)
+            continue
+        if current is None:
+            current = _Section(0)
+            sections.append(current)
+
+        if line.startswith('.'):
+            key, _, value = line[1:].partition(' ')
+            if key == 'code':
+                current.number = int(value)
+            elif key in _INT_FIELDS:
+                current.fields[key] = int(value)
+            elif key in _STR_FIELDS or key in _TUPLE_FIELDS:
+                current.fields[key] = ast.literal_eval(value)
+            elif key == 'const':
+                index, _, text = value.partition(' ')
+                current.consts[int(index)] = text
+            elif key == 'exception':
+                start, end, target, depth, lasti = (int(part) for part in value.split())
+                current.exceptions.append((start, end, target, depth, bool(lasti)))
+            elif key == 'linetable':
+                current.linetable = bytes.fromhex(value)
+            else:
+                raise ValueError(f"Line {line_no}: unknown directive .{key}")
+            continue
+
+        match = _INSTRUCTION_RE.match(line)
+        operands = _OPERAND_RE.match(match.group('rest')) if match else None
+        if not match or not operands:
+            raise ValueError(f"Line {line_no}: cannot parse instruction line {raw!r}")
+        op_text = operands.group('op').strip()
+        opname = lookup.get(op_text)
+        if opname is None:
+            raise ValueError(f"Line {line_no}: unknown emoji or opcode {op_text!r}")
+        arg = int(operands.group('arg')) if operands.group('arg') is not None else None
+        line_number = int(match.group('line')) if match.group('line') else None
+        current.instructions.append((opname, arg, operands.group('argval'), line_number, int(match.group('offset'))))
+    return sections
+
+
+def _infer_tables(section: _Section) -> None:
+    """Recovers names, locals and constants from argvals when directives are missing."""
+    names: Dict[int, str] = {}
+    varnames: Dict[int, str] = {}
+    for opname, arg, argval, _, _ in section.instructions:
+        opcode = dis.opmap[opname]
+        if arg is not None and opcode in dis.hasconst and arg not in section.consts:
+            # Plain listings omit a None argval and print other constants with str().
+            if argval is None:
+                section.consts[arg] = 'None'
+            else:
+                try:
+                    _parse_const(argval, lambda number: None)
+                    section.consts[arg] = argval
+                except ValueError:
+                    section.consts[arg] = repr(argval)
+        if arg is None or argval is None or opcode in dis.hasconst:
+            continue
+        if opcode in dis.hasname:
+            names[arg >> _NAME_ARG_SHIFT.get(opname, 0)] = argval
+        elif opname in _PAIRED_LOCAL_OPS:
+            first, second = ast.literal_eval(argval)
+            varnames[arg >> 4] = first
+            varnames[arg & 15] = second
+        elif opcode in dis.haslocal:
+            varnames[arg] = argval
+
+    for field, table in (('names', names), ('varnames', varnames)):
+        if field not in section.fields:
+            if sorted(table) != list(range(len(table))):
+                raise ValueError(f"Cannot infer co_{field} of code section {section.number}: "
+                                 f"indices are not contiguous, add a .{field} directive")
+            section.fields[field] = tuple(table[i] for i in range(len(table)))
+
+
+def _assemble_section(section: _Section, code_refs: Callable[[int], types.CodeType]) -> types.CodeType:
+    """Builds the code object for one parsed section."""
+    _infer_tables(section)
+
+    bytecode = bytearray()
+    code_unit_lines: List[Optional[int]] = []
+    current_line: Optional[int] = section.fields.get('firstlineno')
+    for opname, arg, _, line_number, offset in section.instructions:
+        if offset != len(bytecode):
+            raise ValueError(f"{opname} is listed at offset {offset} but assembles to offset {len(bytecode)}")
+        if line_number is not None:
+            current_line = line_number
+        units = 1 + _cache_entries(opname)
+        bytecode += bytes((dis.opmap[opname], (arg or 0) & 0xFF))
+        bytecode += bytes(2 * (units - 1))
+        code_unit_lines.extend([current_line] * units)
+
+    if sorted(section.consts) != list(range(len(section.consts))):
+        raise ValueError(f"Constants of code section {section.number} are not contiguous")
+    consts = tuple(_parse_const(section.consts[i], code_refs) for i in range(len(section.consts)))
+
+    fields = section.fields
+    firstlineno = fields.get('firstlineno', 1)
+    linetable = section.linetable
+    if linetable is None:
+        linetable = _synthesize_line_table(code_unit_lines, firstlineno)
+    stacksize = fields.get('stacksize')
+    if stacksize is None:
+        stacksize = _upper_bound_stacksize([(opname, arg) for opname, arg, _, _, _ in section.instructions])
+
+    replacements: Dict[str, Any] = {
+        'co_consts': consts,
+        'co_stacksize': stacksize,
+        'co_firstlineno': firstlineno,
+        'co_linetable': linetable,
+        'co_exceptiontable': _encode_exception_table(section.exceptions),
+    }
+    for field in ('argcount', 'posonlyargcount', 'kwonlyargcount', 'flags') + _STR_FIELDS + _TUPLE_FIELDS:
+        if field in fields:
+            replacements['co_' + field] = fields[field]
+    if 'co_varnames' in replacements:
+        replacements['co_nlocals'] = len(replacements['co_varnames'])
+    return bytes_to_python(bytes(bytecode), **replacements)
+
+
+def assemble(listing: str, emoji_map: Dict[str, str]) -> types.CodeType:
+    """
+    Assembles an emoji assembler listing into a code object.
+
+    Args:
+        listing: Output of `generate_emoji_assembly`, or a plain
+                 `generate_emoji_disassembly(..., output_format='assembler')` listing.
+        emoji_map: The emoji map the listing was written with.
+
+    Returns:
+        The code object of the first section. Nested code objects referenced
+        as `<code N>` constants are assembled along with it.
+
+    Raises:
+        ValueError: If the listing cannot be parsed, references unknown
+                    emojis or sections, or is internally inconsistent.
+    """
+    sections = _parse_sections(listing, _build_opname_lookup(emoji_map))
+    if not sections:
+        raise ValueError("Listing contains no code")
+    by_number = {section.number: section for section in sections}
+    assembled: Dict[int, types.CodeType] = {}
+    in_progress: List[int] = []
+
+    def code_refs(number: int) -> types.CodeType:
+        if number in assembled:
+            return assembled[number]
+        if number not in by_number:
+            raise ValueError(f"Reference to undefined code section {number}")
+        if number in in_progress:
+            raise ValueError(f"Code section {number} references itself")
+        in_progress.append(number)
+        assembled[number] = _assemble_section(by_number[number], code_refs)
+        in_progress.remove(number)
+        return assembled[number]
+
+    return code_refs(sections[0].number)
+
+
+if __name__ == '__main__':
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+
+    python_code = """
+def hello(name):
+    try:
+        print(f"Hello, {name}!")
+    except TypeError:
+        pass
+
+hello("World")
+"""
+    compiled = compile(python_code, '<string>', 'exec')
+    listing = generate_emoji_assembly(compiled, DEFAULT_EMOJI_MAP)
+    print(listing)
+
+    rebuilt = assemble(listing, DEFAULT_EMOJI_MAP)
+    print(f"\nRound trip identical bytecode: {rebuilt.co_code == compiled.co_code}")
+    exec(rebuilt)
@@ -0,0 +1,340 @@
+"""
+Benchmarks for disemoji.
+
+Covers the hot paths: the marshal emoji codec, the emoji disassembler in both
+output formats, `ui.emoji_print` and the slowdown caused by `BytecodeTracer`,
+plus the cold import time of the package.
+
+Run with `python -m disemoji.bench`. Results can be written as JSON
+(`--save results.json`) and compared against a saved baseline
+(`--compare baseline.json`); the exit status is non-zero when the import
+budget is exceeded or a metric regressed by more than `--tolerance`.
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Cold `import disemoji` may take at most this many microseconds more than
+# importing an empty package (cumulative times, as reported by
+# `python -X importtime`). The difference leaves out interpreter and file
+# system costs that any package pays (about 2 ms on a slow disk). Submodules
+# are imported lazily, so this only covers the package __init__, which
+# measures 1.0-1.5 ms.
+IMPORT_BUDGET_US = 2500
+
+# Stdlib module whose source is the "large" corpus entry.
+STDLIB_CORPUS_MODULE = 'argparse'
+
+_SMALL_SOURCE = '''
+def hello(name):
+    print(f"Hello, {name}!")
+
+hello("World")
+'''
+
+
+def measure_import_time(module: str = 'disemoji', repeat: int = 5, path: Optional[str] = None) -> int:
+    """
+    Measures the cold import time of a module in fresh interpreters.
+
+    Args:
+        module: The module to import.
+        repeat: Number of fresh interpreters to start; the fastest run wins.
+        path: A directory to put in front of PYTHONPATH, if any.
+
+    Returns:
+        The cumulative import time of `module` in microseconds.
+
+    Raises:
+        RuntimeError: If the import fails or no timing line is reported.
+    """
+    import os
+
+    env = None
+    if path is not None:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [path, os.environ.get('PYTHONPATH')])))
+    timings: List[int] = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = [part.strip() for part in line.split('|')]
+            if len(parts) == 3 and parts[2] == module:
+                timings.append(int(parts[1]))
+    if not timings:
+        raise RuntimeError(f"No -X importtime line reported for {module}")
+    return min(timings)
+
+
+def measure_import_overhead(module: str = 'disemoji', repeat: int = 5) -> int:
+    """
+    Measures how much longer a cold import of `module` takes than that of an empty package.
+
+    Args:
+        module: The module to import.
+        repeat: Fresh interpreters per measurement; the fastest run wins.
+
+    Returns:
+        The difference in microseconds (0 if the module is faster).
+    """
+    import os
+    import tempfile
+
+    baseline = '_disemoji_empty_package'
+    with tempfile.TemporaryDirectory() as directory:
+        os.mkdir(os.path.join(directory, baseline))
+        open(os.path.join(directory, baseline, '__init__.py'), 'w').close()
+        baseline_us = measure_import_time(baseline, repeat, path=directory)
+    return max(0, measure_import_time(module, repeat) - baseline_us)
+
+
+def check_import_budget(
+        budget_us: int = IMPORT_BUDGET_US,
+        module: str = 'disemoji',
+        elapsed_us: Optional[int] = None
+) -> int:
+    """
+    Asserts that a cold import stays within its startup budget.
+
+    Args:
+        budget_us: The budget in microseconds, over an empty package (see IMPORT_BUDGET_US).
+        module: The module to import.
+        elapsed_us: An already measured `measure_import_overhead(module)`; measured now if None.
+
+    Returns:
+        The import overhead in microseconds.
+
+    Raises:
+        AssertionError: If the import is slower than the budget.
+    """
+    if elapsed_us is None:
+        elapsed_us = measure_import_overhead(module)
+    assert elapsed_us <= budget_us, \
+        f"import {module} took {elapsed_us} us more than an empty package, budget is {budget_us} us"
+    return elapsed_us
+
+
+def build_corpus() -> Dict[str, str]:
+    """
+    Returns the benchmark corpus: name -> Python source.
+
+    - small: a five line script,
+    - medium: the source of `disemoji.codes` (a few hundred lines),
+    - stdlib: the source of `STDLIB_CORPUS_MODULE` (a few thousand lines).
+    """
+    import importlib.util
+    import inspect
+
+    from disemoji import codes
+
+    spec = importlib.util.find_spec(STDLIB_CORPUS_MODULE)
+    if spec is None or spec.origin is None:
+        raise RuntimeError(f"Cannot find the source of {STDLIB_CORPUS_MODULE}")
+    with open(spec.origin, 'r', encoding='utf-8') as f:
+        stdlib_source = f.read()
+    return {
+        'small': _SMALL_SOURCE,
+        'medium': inspect.getsource(codes),
+        'stdlib': stdlib_source,
+    }
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> float:
+    """Returns the fastest of `repeat` timed calls, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_codec(corpus: Dict[str, str], repeat: int) -> Dict[str, Tuple[float, str]]:
+    """Measures python_to_emojis / emojis_to_python throughput in MB of marshal data per second."""
+    import marshal
+
+    from disemoji.single_byte_map_works import emojis_to_python, python_to_emojis
+
+    results: Dict[str, Tuple[float, str]] = {}
+    for name, source in corpus.items():
+        megabytes = len(marshal.dumps(compile(source, '<string>', 'exec'))) / 1e6
+        emojis = python_to_emojis(source)
+        results[f'codec.encode.{name}'] = (megabytes / _best_time(lambda: python_to_emojis(source), repeat), 'MB/s')
+        results[f'codec.decode.{name}'] = (megabytes / _best_time(lambda: emojis_to_python(emojis), repeat), 'MB/s')
+    return results
+
+
+def bench_disassembly(corpus: Dict[str, str], repeat: int) -> Dict[str, Tuple[float, str]]:
+    """
+    Measures generate_emoji_disassembly throughput in instructions per second, per output format.
+
+    `disasm.<format>.<corpus>` starts every run from an empty DISASSEMBLY_CACHE;
+    `.warm` repeats the same calls with the cache filled, as a tracer or a
+    server disassembling the same code again would.
+    """
+    import dis
+    import logging
+
+    from disemoji.assembler import iter_code_objects
+    from disemoji.cache import DISASSEMBLY_CACHE
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.make_dis_pretty import generate_emoji_disassembly
+
+    logging.disable(logging.WARNING)  # Unmapped-opcode warnings would measure logging
+    try:
+        results: Dict[str, Tuple[float, str]] = {}
+        for name, source in corpus.items():
+            code_objects = list(iter_code_objects(compile(source, '<string>', 'exec')))
+            instructions = sum(len(list(dis.get_instructions(code))) for code in code_objects)
+            for output_format in ('assembler', 'stream'):
+                def run() -> None:
+                    for code in code_objects:
+                        generate_emoji_disassembly(code, DEFAULT_EMOJI_MAP, output_format=output_format)
+
+                def run_cold() -> None:
+                    DISASSEMBLY_CACHE.clear()
+                    run()
+
+                results[f'disasm.{output_format}.{name}'] = (instructions / _best_time(run_cold, repeat), 'instr/s')
+                run()
+                results[f'disasm.{output_format}.{name}.warm'] = (instructions / _best_time(run, repeat), 'instr/s')
+        return results
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def bench_emoji_print(corpus: Dict[str, str], repeat: int) -> Dict[str, Tuple[float, str]]:
+    """Measures ui.emoji_print conversion speed in characters per second (no printing)."""
+    from disemoji.ui import emoji_print
+
+    results: Dict[str, Tuple[float, str]] = {}
+    for name, source in corpus.items():
+        elapsed = _best_time(lambda: emoji_print(source, print_result=False), repeat)
+        results[f'emoji_print.{name}'] = (len(source) / elapsed, 'chars/s')
+    return results
+
+
+def _tracer_workload(n: int) -> int:
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def bench_tracer(repeat: int, iterations: int = 2000) -> Dict[str, Tuple[float, str]]:
+    """Measures how much slower a function runs under BytecodeTracer than untraced."""
+    from disemoji.tracerc import BytecodeTracer
+
+    untraced = _best_time(lambda: _tracer_workload(iterations), repeat)
+
+    def traced() -> None:
+        tracer = BytecodeTracer(output=io.StringIO()).trace_function('_tracer_workload')
+        with tracer.activate():
+            _tracer_workload(iterations)
+
+    return {'tracer.slowdown': (_best_time(traced, repeat) / untraced, 'x')}
+
+
+# Units where a smaller number is better; everything else is a throughput.
+_LOWER_IS_BETTER = frozenset({'us', 'x'})
+
+
+def run_benchmarks(repeat: int = 5) -> Dict[str, Any]:
+    """
+    Runs the whole suite.
+
+    Args:
+        repeat: Timed runs per measurement; the fastest one is reported.
+
+    Returns:
+        A JSON-serializable report: interpreter details and a `results`
+        mapping of metric name -> {"value", "unit"}.
+    """
+    corpus = build_corpus()
+    # Overhead over an empty package; see IMPORT_BUDGET_US.
+    results: Dict[str, Tuple[float, str]] = {'import.disemoji': (float(measure_import_overhead()), 'us')}
+    results.update(bench_codec(corpus, repeat))
+    results.update(bench_disassembly(corpus, repeat))
+    results.update(bench_emoji_print(corpus, repeat))
+    results.update(bench_tracer(repeat))
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'results': {name: {'value': value, 'unit': unit} for name, (value, unit) in sorted(results.items())},
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compares a report against a baseline report.
+
+    Args:
+        report: The current `run_benchmarks()` output.
+        baseline: A previously saved report.
+        tolerance: Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        One line per regressed metric; empty if nothing regressed.
+    """
+    regressions: List[str] = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or not previous['value']:
+            continue
+        ratio = current['value'] / previous['value']
+        if current['unit'] in _LOWER_IS_BETTER:
+            regressed = ratio > 1 + tolerance
+        else:
+            regressed = ratio < 1 - tolerance
+        if regressed:
+            regressions.append(f"{name}: {previous['value']:.4g} -> {current['value']:.4g} {current['unit']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m disemoji.bench', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per measurement (default: 5)')
+    parser.add_argument('--save', metavar='FILE', help='write the JSON report to FILE')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a saved JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression for --compare (default: 0.2)')
+    parser.add_argument('--json', action='store_true', help='print the JSON report instead of a table')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report['results'].items():
+            print(f"{name:<32} {result['value']:>14.4g} {result['unit']}")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    try:
+        check_import_budget(elapsed_us=int(report['results']['import.disemoji']['value']))
+    except AssertionError as e:
+        print(f"FAIL: {e}", file=sys.stderr)
+        status = 1
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for regression in compare(report, baseline, args.tolerance):
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Shared cache of decoded instructions and rendered emoji lines per code object.
+
+Code objects compare by value, and `id()` values are reused once an object
+is freed, so neither is a safe key on its own. `CodeCache` keys entries by
+`id(code)` but stores a weak reference to the code object: a lookup only
+hits if the reference still points at the very same object, and an entry is
+dropped as soon as its code object is collected. Entries are evicted least
+recently used beyond `maxsize`, so the cache stays bounded however much code
+is traced or disassembled.
+
+`DISASSEMBLY_CACHE` is the instance shared by `generate_emoji_disassembly`
+and the tracers; `stats()` returns its hit, miss and eviction counters.
+Adaptive (quickened) instructions change while code runs and are never cached.
+"""
+import dis
+import threading
+import types
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MAXSIZE = 1024
+
+
+class _Entry:
+    __slots__ = ('ref', 'instructions', 'by_offset', 'lines')
+
+    def __init__(self, ref: 'weakref.ref[types.CodeType]', instructions: List[dis.Instruction]) -> None:
+        self.ref = ref
+        self.instructions = instructions
+        self.by_offset: Optional[Dict[int, dis.Instruction]] = None
+        # The last rendering only: (emoji map, opname width, rendered lines)
+        self.lines: Optional[Tuple[Dict[str, str], int, List[str]]] = None
+
+
+class CodeCache:
+    """
+    A bounded LRU cache from code objects to their instructions and rendered listing lines.
+
+    Args:
+        maxsize: Code objects kept at most.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[int, _Entry]' = OrderedDict()
+        # Reentrant: a weakref callback can run (from garbage collection) while the lock is held.
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, code: types.CodeType) -> _Entry:
+        key = id(code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.ref() is code:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            self.misses += 1
+        # Decode outside the lock; a concurrent miss on the same code just decodes twice.
+        instructions = list(dis.get_instructions(code))
+        entry = _Entry(weakref.ref(code, lambda ref, key=key: self._discard(key, ref)), instructions)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def _discard(self, key: int, ref: 'weakref.ref[types.CodeType]') -> None:
+        """Drops the entry of a collected code object (unless its id was already reused)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.ref is ref:
+                del self._entries[key]
+
+    def instructions(self, code: types.CodeType) -> List[dis.Instruction]:
+        """Returns the (non-adaptive) instructions of a code object; treat the list as read-only."""
+        return self._entry(code).instructions
+
+    def instruction_at(self, code: types.CodeType, offset: int) -> Optional[dis.Instruction]:
+        """Returns the instruction at a byte offset, or None if no instruction starts there."""
+        entry = self._entry(code)
+        if entry.by_offset is None:
+            entry.by_offset = {instruction.offset: instruction for instruction in entry.instructions}
+        return entry.by_offset.get(offset)
+
+    def assembler_lines(self, code: types.CodeType, emoji_map: Dict[str, str], opname_width: int) -> List[str]:
+        """
+        Returns the assembler listing lines of a code object, one per instruction.
+
+        Only the last (emoji map, width) rendering is kept per code object, so
+        callers that build a new map per call neither grow the entry nor keep
+        old maps alive. The map is matched by identity, so do not mutate a map
+        after using it.
+        """
+        from disemoji.make_dis_pretty import _format_instruction_assembler
+
+        entry = self._entry(code)
+        cached = entry.lines
+        if cached is None or cached[0] is not emoji_map or cached[1] != opname_width:
+            lines = [_format_instruction_assembler(instruction, emoji_map, opname_width)
+                     for instruction in entry.instructions]
+            cached = entry.lines = (emoji_map, opname_width, lines)
+        return cached[2]
+
+    def clear(self) -> None:
+        """Drops all entries; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self) -> None:
+        """Zeroes the hit, miss and eviction counters; the entries are kept."""
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the counters plus the current size and cap."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+DISASSEMBLY_CACHE = CodeCache()
+
+
+def stats() -> Dict[str, int]:
+    """Returns the counters of the shared DISASSEMBLY_CACHE."""
+    return DISASSEMBLY_CACHE.stats()
@@ -0,0 +1,427 @@
+"""
+Control-flow graphs of code objects.
+
+`build_cfg` splits a code object's instructions into basic blocks. A block
+starts at the first instruction, at every jump target, after every jump or
+terminator, and wherever exception-table coverage changes (so each block has
+at most one exception handler). Blocks are linked by fall-through, jump and
+exception edges.
+
+On top of the graph the module computes:
+
+- back-edges and natural loops (`ControlFlowGraph.loops`), from one
+  iterative depth-first search,
+- the stack depth before every instruction (`stack_depths`), by
+  propagating `dis.stack_effect` along the edges.
+
+Everything is linear in the number of instructions, apart from the loop
+bodies, which cost the size of each loop.
+
+`to_dot` and `to_mermaid` render the graph with each block labelled by its
+emoji instruction sequence; back-edges are drawn bold, exception edges
+dashed. Given execution counts from a `BytecodeTracer`, blocks are shaded
+by how often they ran, so hot loops stand out:
+
+    tracer = BytecodeTracer(print_trace=False).trace_function('work')
+    with tracer.activate():
+        work()
+    print(export_cfg(work, DEFAULT_EMOJI_MAP, 'dot', tracer=tracer))
+"""
+import bisect
+import dis
+import math
+import types
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Set, Tuple, Union
+
+# Instructions after which execution never falls through to the next one.
+_TERMINATORS = frozenset({
+    'RETURN_VALUE', 'RETURN_CONST', 'RAISE_VARARGS', 'RERAISE',
+    'JUMP_FORWARD', 'JUMP_BACKWARD', 'JUMP_BACKWARD_NO_INTERRUPT', 'JUMP', 'JUMP_NO_INTERRUPT',
+    'JUMP_ABSOLUTE',  # Python < 3.11
+})
+_JUMP_OPCODES = frozenset(getattr(dis, 'hasjump', dis.hasjrel + dis.hasjabs))
+
+
+def _jump_target(instruction: dis.Instruction) -> Optional[int]:
+    """Returns the offset an instruction may jump to, or None if it does not jump."""
+    if instruction.opcode not in _JUMP_OPCODES:
+        return None
+    target = getattr(instruction, 'jump_target', None)  # Python 3.13+
+    return target if target is not None else instruction.argval
+
+
+@dataclass
+class BasicBlock:
+    """A maximal straight-line run of instructions."""
+    index: int
+    instructions: List[dis.Instruction]
+    # (successor block index, edge kind): kind is 'fall', 'jump' or 'exception'.
+    successors: List[Tuple[int, str]] = field(default_factory=list)
+    predecessors: List[int] = field(default_factory=list)
+    # Exception handler covering this block: (handler block index, stack depth at handler entry).
+    handler: Optional[Tuple[int, int]] = None
+
+    @property
+    def start(self) -> int:
+        """Offset of the first instruction."""
+        return self.instructions[0].offset
+
+    @property
+    def end(self) -> int:
+        """Offset of the last instruction."""
+        return self.instructions[-1].offset
+
+
+@dataclass
+class ControlFlowGraph:
+    """The basic blocks of a code object; block 0 is the entry."""
+    code: types.CodeType
+    blocks: List[BasicBlock]
+    # Offset of the first instruction of each block -> block index.
+    block_at: Dict[int, int]
+    back_edges: List[Tuple[int, int]] = field(default_factory=list)
+
+    def block_of(self, offset: int) -> BasicBlock:
+        """Returns the block containing the instruction at `offset`."""
+        # Blocks are in offset order.
+        return self.blocks[bisect.bisect_right([block.start for block in self.blocks], offset) - 1]
+
+    def loops(self) -> Dict[int, Set[int]]:
+        """
+        Returns the natural loops: loop header block index -> indices of the blocks in its body.
+
+        Loops sharing a header are merged.
+        """
+        loops: Dict[int, Set[int]] = {}
+        for source, header in self.back_edges:
+            body = loops.setdefault(header, {header})
+            stack = [source]
+            while stack:
+                index = stack.pop()
+                if index in body:
+                    continue
+                body.add(index)
+                stack.extend(self.blocks[index].predecessors)
+        return loops
+
+    def loop_depths(self) -> List[int]:
+        """Returns, per block, how many loops contain it."""
+        depths = [0] * len(self.blocks)
+        for body in self.loops().values():
+            for index in body:
+                depths[index] += 1
+        return depths
+
+    def stack_depths(self) -> Dict[int, int]:
+        """
+        Computes the stack depth before each instruction.
+
+        Returns:
+            Instruction offset -> stack depth, for every reachable instruction.
+        """
+        depths: Dict[int, int] = {}
+        entry_depth: Dict[int, int] = {0: 0}
+        worklist = [0]
+        while worklist:
+            block = self.blocks[worklist.pop()]
+            depth = entry_depth[block.index]
+            for instruction in block.instructions:
+                depths[instruction.offset] = depth
+                jump_target = _jump_target(instruction)
+                arg = instruction.arg if instruction.opcode in dis.hasarg else None
+                if jump_target is not None:
+                    self._propagate(self.block_at[jump_target],
+                                    depth + dis.stack_effect(instruction.opcode, arg, jump=True),
+                                    entry_depth, worklist)
+                depth += dis.stack_effect(instruction.opcode, arg, jump=False if jump_target is not None else None)
+            for successor, kind in block.successors:
+                if kind == 'fall':
+                    self._propagate(successor, depth, entry_depth, worklist)
+            if block.handler is not None:
+                self._propagate(block.handler[0], block.handler[1], entry_depth, worklist)
+        return depths
+
+    @staticmethod
+    def _propagate(index: int, depth: int, entry_depth: Dict[int, int], worklist: List[int]) -> None:
+        # Valid bytecode reaches every block with one depth; keep the first one seen.
+        if index not in entry_depth:
+            entry_depth[index] = depth
+            worklist.append(index)
+
+
+def build_cfg(code_obj: types.CodeType) -> ControlFlowGraph:
+    """
+    Splits a code object into basic blocks.
+
+    Args:
+        code_obj: The code object.
+
+    Returns:
+        Its ControlFlowGraph, with back-edges found.
+    """
+    instructions = list(dis.get_instructions(code_obj))
+    exception_entries = dis._parse_exception_table(code_obj) if hasattr(dis, '_parse_exception_table') else []
+
+    leaders: Set[int] = {instructions[0].offset} if instructions else set()
+    for instruction, following in zip(instructions, instructions[1:] + [None]):
+        target = _jump_target(instruction)
+        if target is not None:
+            leaders.add(target)
+        if following is not None and (target is not None or instruction.opname in _TERMINATORS):
+            leaders.add(following.offset)
+    # Handler for each covered offset; coverage changes start a new block.
+    # Exception table entries are disjoint, so this is linear overall.
+    handler_at: Dict[int, Tuple[int, int]] = {}
+    offsets = [instruction.offset for instruction in instructions]
+    position = {offset: index for index, offset in enumerate(offsets)}
+    for entry in exception_entries:
+        index = position.get(entry.start)
+        while index is not None and index < len(offsets) and offsets[index] < entry.end:
+            handler_at[offsets[index]] = (entry.target, entry.depth + entry.lasti + 1)
+            index += 1
+        leaders.update((entry.start, entry.end, entry.target))
+
+    blocks: List[BasicBlock] = []
+    block_at: Dict[int, int] = {}
+    for instruction in instructions:
+        if instruction.offset in leaders or not blocks:
+            block_at[instruction.offset] = len(blocks)
+            blocks.append(BasicBlock(index=len(blocks), instructions=[]))
+        blocks[-1].instructions.append(instruction)
+
+    for block in blocks:
+        last = block.instructions[-1]
+        target = _jump_target(last)
+        if target is not None:
+            block.successors.append((block_at[target], 'jump'))
+        if last.opname not in _TERMINATORS and block.index + 1 < len(blocks):
+            block.successors.append((block.index + 1, 'fall'))
+        handler = handler_at.get(block.start)
+        if handler is not None:
+            block.handler = (block_at[handler[0]], handler[1])
+            block.successors.append((block.handler[0], 'exception'))
+        for successor, _ in block.successors:
+            blocks[successor].predecessors.append(block.index)
+
+    graph = ControlFlowGraph(code=code_obj, blocks=blocks, block_at=block_at)
+    graph.back_edges = _find_back_edges(blocks)
+    return graph
+
+
+def _find_back_edges(blocks: List[BasicBlock]) -> List[Tuple[int, int]]:
+    """Finds edges to a block still on the depth-first search stack, iteratively."""
+    if not blocks:
+        return []
+    back_edges: List[Tuple[int, int]] = []
+    state = [0] * len(blocks)  # 0: unvisited, 1: on the stack, 2: done
+    stack: List[Tuple[int, int]] = [(0, 0)]
+    state[0] = 1
+    while stack:
+        index, next_successor = stack[-1]
+        successors = blocks[index].successors
+        if next_successor == len(successors):
+            state[index] = 2
+            stack.pop()
+            continue
+        stack[-1] = (index, next_successor + 1)
+        successor = successors[next_successor][0]
+        if state[successor] == 1:
+            back_edges.append((index, successor))
+        elif state[successor] == 0:
+            state[successor] = 1
+            stack.append((successor, 0))
+    return back_edges
+
+
+# Fill colours for execution-count shading, coldest first.
+HEAT_COLORS = ['#f7fbff', '#fee391', '#fec44f', '#fe9929', '#ec7014', '#cc4c02']
+# Edge styles: (DOT attributes, Mermaid arrow).
+_EDGE_STYLES = {
+    'fall': ('', '-->'),
+    'jump': ('color="#1f77b4"', '-->'),
+    'exception': ('color="#d62728", style=dashed', '-.->'),
+    'back_edge': ('color="#cc4c02", penwidth=2.5', '==>'),
+}
+
+
+def _block_label(block: BasicBlock, emoji_map: Dict[str, str], per_line: int, max_instructions: int) -> List[str]:
+    """Returns the label lines of a block: its offset range, then its emojis wrapped `per_line` at a time."""
+    emojis = [emoji_map.get(instruction.opname, instruction.opname)
+              for instruction in block.instructions[:max_instructions]]
+    lines = [f"{block.start}-{block.end}"]
+    lines.extend(' '.join(emojis[i:i + per_line]) for i in range(0, len(emojis), per_line))
+    if len(block.instructions) > max_instructions:
+        lines.append(f"… +{len(block.instructions) - max_instructions}")
+    return lines
+
+
+def _block_heat(graph: ControlFlowGraph, counts: Optional[Dict[int, int]]) -> List[Optional[int]]:
+    """
+    Returns, per block, how often it ran, or None without counts.
+
+    That is the largest count of its instructions: some never report one
+    (RESUME, or an END_FOR that FOR_ITER jumps over on exhaustion).
+    """
+    if counts is None:
+        return [None] * len(graph.blocks)
+    return [max(counts.get(instruction.offset, 0) for instruction in block.instructions) for block in graph.blocks]
+
+
+def _heat_level(count: int, hottest: int) -> int:
+    """Maps a count onto HEAT_COLORS on a logarithmic scale; 0 means never executed."""
+    if count <= 0 or hottest <= 0:
+        return 0
+    return 1 + min(len(HEAT_COLORS) - 2, int((len(HEAT_COLORS) - 2) * math.log1p(count) / math.log1p(hottest)))
+
+
+def _edges(graph: ControlFlowGraph) -> Iterator[Tuple[int, int, str]]:
+    back_edges = set(graph.back_edges)
+    for block in graph.blocks:
+        for successor, kind in block.successors:
+            yield block.index, successor, 'back_edge' if (block.index, successor) in back_edges else kind
+
+
+def to_dot(
+        graph: ControlFlowGraph,
+        emoji_map: Dict[str, str],
+        counts: Optional[Dict[int, int]] = None,
+        per_line: int = 8,
+        max_instructions: int = 64
+) -> str:
+    """
+    Renders a control-flow graph as Graphviz DOT.
+
+    Args:
+        graph: The graph from `build_cfg`.
+        emoji_map: A dictionary mapping opcode names to emojis.
+        counts: Optional instruction offset -> execution count (see
+                `BytecodeTracer.execution_counts`); blocks are shaded by how
+                often they were entered and labelled with the count.
+        per_line: Emojis per label line.
+        max_instructions: Instructions shown per block; longer blocks are truncated.
+
+    Returns:
+        The DOT source.
+    """
+    heat = _block_heat(graph, counts)
+    hottest = max((count for count in heat if count is not None), default=0)
+    lines = [
+        f'digraph "{_dot_escape(getattr(graph.code, "co_qualname", graph.code.co_name))}" {{',
+        '    node [shape=box, style="rounded,filled", fillcolor="white", fontname="monospace"];',
+    ]
+    for block, count in zip(graph.blocks, heat):
+        label = _block_label(block, emoji_map, per_line, max_instructions)
+        attributes = ''
+        if count is not None:
+            label[0] += f" ×{count}"
+            attributes = f', fillcolor="{HEAT_COLORS[_heat_level(count, hottest)]}"'
+        text = '\\l'.join(_dot_escape(line) for line in label) + '\\l'
+        lines.append(f'    b{block.index} [label="{text}"{attributes}];')
+    for source, successor, kind in _edges(graph):
+        style = _EDGE_STYLES[kind][0]
+        lines.append(f'    b{source} -> b{successor}' + (f' [{style}];' if style else ';'))
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def to_mermaid(
+        graph: ControlFlowGraph,
+        emoji_map: Dict[str, str],
+        counts: Optional[Dict[int, int]] = None,
+        per_line: int = 8,
+        max_instructions: int = 64
+) -> str:
+    """
+    Renders a control-flow graph as a Mermaid flowchart.
+
+    Takes the same arguments as `to_dot`; shading uses one classDef per heat level.
+    """
+    heat = _block_heat(graph, counts)
+    hottest = max((count for count in heat if count is not None), default=0)
+    lines = ['flowchart TD']
+    classes: Dict[int, List[str]] = {}
+    for block, count in zip(graph.blocks, heat):
+        label = _block_label(block, emoji_map, per_line, max_instructions)
+        if count is not None:
+            label[0] += f" ×{count}"
+            classes.setdefault(_heat_level(count, hottest), []).append(f"b{block.index}")
+        text = '<br/>'.join(line.replace('"', '#quot;') for line in label)
+        lines.append(f'    b{block.index}["{text}"]')
+    for source, successor, kind in _edges(graph):
+        lines.append(f'    b{source} {_EDGE_STYLES[kind][1]} b{successor}')
+    for level, nodes in sorted(classes.items()):
+        lines.append(f'    classDef heat{level} fill:{HEAT_COLORS[level]},stroke:#555')
+        lines.append(f'    class {",".join(nodes)} heat{level}')
+    return '\n'.join(lines)
+
+
+def _dot_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def export_cfg(
+        code_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        emoji_map: Dict[str, str],
+        output_format: Literal['dot', 'mermaid'] = 'dot',
+        tracer: Optional[Any] = None,
+        **options: Any
+) -> str:
+    """
+    Builds and renders the control-flow graph of a code input.
+
+    Args:
+        code_input: Anything accepted by `generate_emoji_disassembly`.
+        emoji_map: A dictionary mapping opcode names to emojis.
+        output_format: 'dot' (Graphviz) or 'mermaid'.
+        tracer: Optional `BytecodeTracer` that traced this code; its execution
+                counts shade the blocks.
+        **options: Passed on to `to_dot` / `to_mermaid` (per_line, max_instructions).
+
+    Returns:
+        The rendered graph.
+
+    Raises:
+        ValueError: If `output_format` is not 'dot' or 'mermaid'.
+    """
+    if output_format not in ('dot', 'mermaid'):
+        raise ValueError("Invalid output_format. Choose 'dot' or 'mermaid'.")
+    from disemoji.make_dis_pretty import _get_code_object
+
+    code_obj = _get_code_object(code_input)
+    graph = build_cfg(code_obj)
+    counts = tracer.execution_counts(code_obj) if tracer is not None else None
+    render = to_dot if output_format == 'dot' else to_mermaid
+    return render(graph, emoji_map, counts, **options)
+
+
+if __name__ == '__main__':
+    import time
+
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.tracerc import BytecodeTracer
+
+    def collatz_steps(limit):
+        longest = 0
+        for start in range(1, limit):
+            n, steps = start, 0
+            while n != 1:
+                n = n // 2 if n % 2 == 0 else 3 * n + 1
+                steps += 1
+            longest = max(longest, steps)
+        return longest
+
+    tracer = BytecodeTracer(print_trace=False).trace_function('collatz_steps')
+    with tracer.activate():
+        collatz_steps(30)
+    print(export_cfg(collatz_steps, DEFAULT_EMOJI_MAP, 'dot', tracer=tracer))
+    print()
+    print(export_cfg(collatz_steps, DEFAULT_EMOJI_MAP, 'mermaid', tracer=tracer))
+
+    source = "def big(x):\n" + "".join(f"    if x > {i}:\n        x -= {i}\n" for i in range(2000)) + "    return x\n"
+    big = compile(source, '<big>', 'exec').co_consts[0]
+    start = time.perf_counter()
+    graph = build_cfg(big)
+    dot = to_dot(graph, DEFAULT_EMOJI_MAP)
+    print(f"\n{len(list(dis.get_instructions(big)))} instructions, {len(graph.blocks)} blocks, "
+          f"DOT in {(time.perf_counter() - start) * 1e3:.1f} ms")
@@ -1,15 +1,15 @@
-import dis
+import logging
+from typing import Any, Dict, List, Optional
 
-# --- Helper to get all opcodes for the current Python version ---
-# This will help us identify any missing opcodes.
-# We'll manually add opcodes from other versions if they are common or important.
-current_opnames = [op for op in dis.opname if '<' not in op and op != 'EXTENDED_ARG']
+# DEFAULT_EMOJI_MAP and current_opnames depend on the running interpreter's
+# `dis` module. They are built on first access (see `__getattr__` below) so
+# that importing this module stays cheap.
 
 # --- Initial Merged and Enhanced Map ---
 # We'll start by merging your two lists, making some choices,
 # and then fill in the rest.
 
-DEFAULT_EMOJI_MAP = {
+_HAND_MAPPED_EMOJIS: Dict[str, str] = {
     # --- Opcodes from your lists (merged and selected) ---
     'NOP': '⚪',  # No operation - a white circle, neutral.
     'POP_TOP': '🔝🗑️',  # Pop top of stack and discard - top arrow with a trash can.
@@ -17,7 +17,7 @@ DEFAULT_EMOJI_MAP = {
     'ROT_THREE': '🔄🥉',  # Rotate top three stack items - rotate with a bronze medal for three.
     'ROT_FOUR': '🔄🏅', # Rotate top four stack items - rotate with a generic medal. (Added)
     'DUP_TOP': '👯',  # Duplicate top of stack - "twins" or dancers.
-    'DUP_TOP_TWO': '👯👯',  # Duplicate top two stack items - two pairs of "twins".
+    'DUP_TOP_TWO': '👯2️⃣',  # Duplicate top two stack items - "twins" times two.
 
     # Unary Operations
     'UNARY_POSITIVE': '➕✨',  # Implements +obj - plus with a sparkle for unary.
@@ -84,7 +84,7 @@ DEFAULT_EMOJI_MAP = {
     'LOAD_DEREF': '🔗🔑📦', # Pushes value from a cell (dereferenced) - link, key, box.
     'LOAD_CLASSDEREF': '🏛️🔑📦', # Like LOAD_DEREF but for class scope - building, key, box.
     'LOAD_ATTR': '🏷️.',  # Implements TOS.namei - name label with a dot for attribute access.
-    'LOAD_METHOD': '📞🏷️.', # Loads a method (Python 3.7+) - phone with attribute access. (Replaced LOAD_ATTR for methods)
+    'LOAD_METHOD': '☎️🏷️.', # Loads a method (Python 3.7+) - desk phone with attribute access. (Replaced LOAD_ATTR for methods)
 
     # Store Operations
     'STORE_NAME': '🏷️💾',  # Stores TOS as namei - name label with a save/disk icon.
@@ -93,7 +93,7 @@ DEFAULT_EMOJI_MAP = {
     'STORE_DEREF': '🔗🔑💾', # Stores TOS into a cell variable - link, key, save.
     'STORE_ATTR': '💾.',  # Implements TOS1.namei = TOS - save icon with a dot.
     'STORE_SUBSCR': '📑✏️', # Implements TOS1[TOS] = TOS2 - document with a pencil for writing to subscript.
-    'STORE_MAP': '🗺️➕', # Store a key-value pair in a map (old, pre 3.5 for **kwargs) - map with plus.
+    'STORE_MAP': '🗺️📎', # Store a key-value pair in a map (old, pre 3.5 for **kwargs) - map with a paperclip.
 
     # Delete Operations
     'DELETE_NAME': '🏷️🗑️',  # Deletes namei - name label with a trash can.
@@ -109,7 +109,7 @@ DEFAULT_EMOJI_MAP = {
     'CALL_FUNCTION_EX': '📞📦🗣️', # Calls function with *args, **kwargs (pre 3.11) - phone, box, speaking head.
     'CALL_METHOD': '📞🏷️🗣️', # Calls a method (pre 3.11) - phone, label, speaking head. (Replaced by CALL for 3.11+)
     'CALL': '📞',          # Calls a callable (Python 3.11+) - simple phone.
-    'PRECALL': '➡️📞',      # Performs pre-call checks (Python 3.11+) - arrow to phone.
+    'PRECALL': '📲',      # Performs pre-call checks (Python 3.11+) - phone with an incoming arrow.
     'KW_NAMES': '🔑🏷️📜',   # Stores keyword argument names (Python 3.6+) - key, label, scroll.
 
     # Making Functions/Classes
@@ -133,10 +133,10 @@ DEFAULT_EMOJI_MAP = {
     # Python 3.11+ introduced FORWARD/BACKWARD variants
     'POP_JUMP_IF_TRUE': '⤵️✅', # Pop, if true, jump - down arrow with checkmark. (Pre 3.11)
     'POP_JUMP_IF_FALSE': '⤵️❌', # Pop, if false, jump - down arrow with cross mark. (Pre 3.11)
-    'POP_JUMP_FORWARD_IF_TRUE': '⤵️✅➡️', # Pop, if true, jump forward (3.11+) - down arrow, check, right arrow.
-    'POP_JUMP_FORWARD_IF_FALSE': '⤵️❌➡️', # Pop, if false, jump forward (3.11+) - down arrow, cross, right arrow.
-    'POP_JUMP_BACKWARD_IF_TRUE': '⤵️✅⬅️', # Pop, if true, jump backward (3.11+) - down arrow, check, left arrow.
-    'POP_JUMP_BACKWARD_IF_FALSE': '⤵️❌⬅️', # Pop, if false, jump backward (3.11+) - down arrow, cross, left arrow.
+    'POP_JUMP_FORWARD_IF_TRUE': '⤵️✅🔜', # Pop, if true, jump forward (3.11+) - down arrow, check, soon.
+    'POP_JUMP_FORWARD_IF_FALSE': '⤵️❌🔜', # Pop, if false, jump forward (3.11+) - down arrow, cross, soon.
+    'POP_JUMP_BACKWARD_IF_TRUE': '⤵️✅🔙', # Pop, if true, jump backward (3.11+) - down arrow, check, back.
+    'POP_JUMP_BACKWARD_IF_FALSE': '⤵️❌🔙', # Pop, if false, jump backward (3.11+) - down arrow, cross, back.
     'POP_JUMP_FORWARD_IF_NONE': '⤵️👻➡️', # Pop, if None, jump forward (3.11. beta) - down, ghost, right.
     'POP_JUMP_BACKWARD_IF_NONE': '⤵️👻⬅️',# Pop, if None, jump backward (3.11. beta) - down, ghost, left.
     'POP_JUMP_FORWARD_IF_NOT_NONE': '⤵️🚫👻➡️', # Pop, if not None, jump forward (3.11. beta) - down, no ghost, right.
@@ -184,14 +184,14 @@ DEFAULT_EMOJI_MAP = {
     'COPY_FREE_VARS': '🔗📝©️', # Copies free variables to closure (3.11+) - link, memo, copyright.
 
     # --- Opcodes that might be less common or very specific versions ---
-    'EXTENDED_ARG': '➕➕', # Prefix for opcodes taking an argument > 65535 (or >255 pre 3.6) - extra pluses.
+    'EXTENDED_ARG': '🔢➕', # Prefix for opcodes taking an argument > 65535 (or >255 pre 3.6) - numbers, plus.
                                # This is technically not an instruction executed on its own.
-    'CACHE': ' C ',          # Placeholder for adaptive specializations (internal, Python 3.11+) - "C" for Cache.
+    'CACHE': '🗄️',          # Placeholder for adaptive specializations (internal, Python 3.11+) - file cabinet.
     'LOAD_ASSERTION_ERROR': '❗😱🧱', # Pushes AssertionError (Python 3.5+) - exclamation, shocked face, brick (for error object).
-    'LIST_TO_TUPLE': '📝➡️📜', # Converts a list to a tuple (Python 3.9+) - memo to scroll.
-    'LIST_EXTEND': '📝➕➕', # Extends a list (Python 3.9+) - memo, double plus.
-    'SET_UPDATE': '🧩➕➕', # Updates a set (Python 3.9+) - puzzle, double plus.
-    'DICT_UPDATE': '🗺️➕➕', # Updates a dict (Python 3.9+) - map, double plus.
+    'LIST_TO_TUPLE': '📝🔀📜', # Converts a list to a tuple (Python 3.9+) - memo, shuffle, scroll.
+    'LIST_EXTEND': '📝📎📎', # Extends a list (Python 3.9+) - memo, two paperclips.
+    'SET_UPDATE': '🧩📎📎', # Updates a set (Python 3.9+) - puzzle, two paperclips.
+    'DICT_UPDATE': '🗺️📎📎', # Updates a dict (Python 3.9+) - map, two paperclips.
     'DICT_MERGE': '🗺️🤝🗺️', # Merges dicts (Python 3.9+, for ** merging) - map, handshake, map.
     'GET_LEN': '📏', # Pushes len(TOS) (Python 3.10+) - ruler.
     'MATCH_MAPPING': '🗺️❓', # Part of match statement (Python 3.10+) - map, question mark.
@@ -199,16 +199,16 @@ DEFAULT_EMOJI_MAP = {
     'MATCH_KEYS': '🔑❓', # Part of match statement (Python 3.10+) - key, question mark.
     'MATCH_CLASS': '🏛️❓', # Part of match statement (Python 3.10+) - building, question mark.
     'PRINT_EXPR': '💬📄', # Prints expression in interactive mode - speech bubble, page.
-    'LOAD_METHOD_CACHED': '📞🏷️. C', # (3.12+ internal) - Call method with cache.
-    'LOAD_ATTR_CACHED': '🏷️. C', # (3.12+ internal) - Load attribute with cache.
-    'SEND_GEN': '📨🎁💨', # (Old, pre 3.11) Send value into generator.
+    'LOAD_METHOD_CACHED': '☎️🏷️.📌', # (3.12+ internal) - Load method with cache (pin).
+    'LOAD_ATTR_CACHED': '🏷️.📌', # (3.12+ internal) - Load attribute with cache (pin).
+    'SEND_GEN': '📨🎁🏭', # (Old, pre 3.11) Send value into generator - envelope, gift, factory.
 
     # Python 3.12 specific experimental opcodes (may change/disappear)
     # Generally, these are for specialization/inlining
-    'LOAD_FAST_LOAD_FAST': '💨📦💨📦', # Load two fast locals
-    'STORE_FAST_LOAD_FAST': '💨💾💨📦',# Store then load fast local
-    'STORE_FAST_STORE_FAST': '💨💾💨💾',# Store two fast locals
-    'LOAD_FAST_AND_CLEAR': '💨📦🧹', # Load local and clear it from stack (for list comps)
+    'LOAD_FAST_LOAD_FAST': '💨📦✌️', # Load two fast locals - fast box, times two
+    'STORE_FAST_LOAD_FAST': '💨💾🔃📦',# Store then load fast local - fast save, round trip, box
+    'STORE_FAST_STORE_FAST': '💨💾✌️',# Store two fast locals - fast save, times two
+    'LOAD_FAST_AND_CLEAR': '💨📦🧽', # Load local and clear it from stack (for list comps) - fast box, sponge
     'LOAD_SUPER_ATTR': '🦸‍♂️🏷️.', # Load attribute from super() (3.12+)
 
     # Python 3.13+ (Speculative based on trends or very new features)
@@ -227,11 +227,11 @@ DEFAULT_EMOJI_MAP = {
     'EXIT_INIT_CHECK': '🚪✅❓',
     # Check after __init__ if an exception occurred (Python 3.13, for `defer`) - door, check, question.
     'FORMAT_SIMPLE': '✍️📄',  # Simple f-string formatting (no spec) (Python 3.12+) - writing, page.
-    'FORMAT_WITH_SPEC': '✍️📄⚙️',
-    # F-string formatting with a format spec (Python 3.12+) - writing, page, gear (for spec processing).
+    'FORMAT_WITH_SPEC': '✍️📄📐',
+    # F-string formatting with a format spec (Python 3.12+) - writing, page, set square (for spec processing).
     'RESERVED': '🔒🚫',  # Reserved for internal use, should not be encountered - lock, prohibition sign.
-    'GET_YIELD_FROM_ITER': '🚶🔄🎁',
-    # Implements `iter(TOS)` for `yield from` (pre 3.5, now usually GET_ITER) - walk, loop, gift.
+    'GET_YIELD_FROM_ITER': '🚶🔄🎀',
+    # Implements `iter(TOS)` for `yield from` (pre 3.5, now usually GET_ITER) - walk, loop, ribbon.
     'INTERPRETER_EXIT': '🚪🛑',  # Signals the interpreter to exit (Python 3.13+) - door, stop sign.
     'LOAD_LOCALS': '🏠📦',  # Pushes the `locals()` dictionary (Python 3.12+) - house (local scope), box.
     'STORE_SLICE': '💾[::]',
@@ -248,7 +248,7 @@ DEFAULT_EMOJI_MAP = {
     'COPY': '©️➡️',  # Copies the Nth item from top of stack to top (Python 3.11+) - copyright (copy), arrow.
     'ENTER_EXECUTOR': '⚡🏃💨',
     # Enters an executor (for JIT compilation, Python 3.13+) - lightning, running person, dash.
-    'LIST_APPEND': '📝➕',  # Appends TOS to list at TOS1 (Python 3.9+) - memo (list), plus.
+    'LIST_APPEND': '📝📎',  # Appends TOS to list at TOS1 (Python 3.9+) - memo (list), paperclip.
     'LOAD_FAST_CHECK': '💨📦✅',  # Loads a local variable, checking it's initialized (Python 3.6+) - fast, box, check.
     'LOAD_FROM_DICT_OR_DEREF': '🗺️/🔗📦',  # Load from locals dict or dereference cell (Python 3.11+) - map or link, box.
     'LOAD_FROM_DICT_OR_GLOBALS': '🗺️/🌍📦',  # Load from locals dict or globals (Python 3.11+) - map or globe, box.
@@ -258,7 +258,7 @@ DEFAULT_EMOJI_MAP = {
     # Pop, if None, jump (Python 3.11+) - down arrow, ghost (None), question. (Supersedes POP_JUMP_FORWARD/BACKWARD_IF_NONE)
     'POP_JUMP_IF_NOT_NONE': '⤵️🚫👻❓',
     # Pop, if not None, jump (Python 3.11+) - down arrow, no ghost, question. (Supersedes POP_JUMP_FORWARD/BACKWARD_IF_NOT_NONE)
-    'SET_ADD': '🧩➕',  # Adds TOS to set at TOS1 (Python 3.8+) - puzzle (set), plus.
+    'SET_ADD': '🧩📎',  # Adds TOS to set at TOS1 (Python 3.8+) - puzzle (set), paperclip.
     'SET_FUNCTION_ATTRIBUTE': '🧑‍🍳🏷️✏️',
     # Set an attribute on a function object (e.g. __defaults__, __kwdefaults__) (Python 3.x) - chef, label, pencil.
     'SWAP': '↔️',  # Swaps the Nth item with TOS (Python 3.11+) - left-right arrow.
@@ -297,48 +297,188 @@ DEFAULT_EMOJI_MAP = {
     'STORE_FAST_MAYBE_NULL': '💨💾👻❓',
     # Store to a fast local that might not be initialized (internal, Python 3.13+) - fast, save, ghost, question.
 
-
-
+    # Python 3.14
+    'LOAD_SMALL_INT': '🧱🤏',  # Pushes a small int encoded in the oparg - brick, pinch (small).
+    'LOAD_COMMON_CONSTANT': '🧱🌐',  # Pushes a well-known constant such as AssertionError - brick, globe with meridians.
+    'LOAD_FAST_BORROW': '💨📦🫴',  # Pushes a borrowed reference to a local - fast box, open palm.
+    'LOAD_FAST_BORROW_LOAD_FAST_BORROW': '💨📦🫴✌️',  # Two borrowed locals - fast box, open palm, times two.
+    'LOAD_SPECIAL': '🏷️🪄',  # Loads a special method such as __enter__ - label, magic wand (dunder).
+    'NOT_TAKEN': '🚧',  # Marks the fall-through of a branch for monitoring - roadblock.
+    'POP_ITER': '🔝🔁',  # Pops the iterator after a loop - top, loop.
+    'BUILD_TEMPLATE': '🧾',  # Builds a t-string Template - receipt.
+    'BUILD_INTERPOLATION': '🧾✨',  # Builds a t-string Interpolation - receipt with a sparkle.
+    'JUMP_IF_FALSE': '↪️❌',  # Jump if false without popping (pseudo) - jump arrow, cross.
+    'JUMP_IF_TRUE': '↪️✅',  # Jump if true without popping (pseudo) - jump arrow, check.
+    'ANNOTATIONS_PLACEHOLDER': '📝🕳️',  # Placeholder for deferred annotations (pseudo) - memo, hole.
+    'INSTRUMENTED_NOT_TAKEN': '🩺🚧',  # Instrumented version of NOT_TAKEN.
+    'INSTRUMENTED_POP_ITER': '🩺🔝🔁',  # Instrumented version of POP_ITER.
+    'INSTRUMENTED_END_ASYNC_FOR': '🩺🏁🔚⏳',  # Instrumented version of END_ASYNC_FOR.
 }
 
 # --- Fill in any missing opcodes from the current Python version ---
-# This is more for completeness if running this script, the above list should be fairly comprehensive
-# for common Python versions (3.8-3.12).
-# For opcodes that are purely internal or pseudo-instructions like CACHE or EXTENDED_ARG,
-# a simple representation is usually fine.
+# `generate_emoji_map` derives emojis for instrumented and specialized opcodes;
+# hand-picked emojis for anything new can go here and take precedence.
 
-missing_opcodes_emojis = {
+missing_opcodes_emojis: Dict[str, str] = {
     # Example of how you might add one if `current_opnames` found something new:
     # 'A_NEW_OPCODE': '✨🆕✨', # A newly discovered opcode - sparkles, new, sparkles.
 }
 
-# Add any opcodes specific to the current Python version that aren't in the main map
-for op_name in current_opnames:
-    if op_name not in DEFAULT_EMOJI_MAP and op_name not in ['EXTENDED_ARG', 'CACHE']: # We handle these separately
-        if op_name in missing_opcodes_emojis:
-            DEFAULT_EMOJI_MAP[op_name] = missing_opcodes_emojis[op_name]
-        else:
-            # A generic placeholder if we encounter something truly unexpected
-            DEFAULT_EMOJI_MAP[op_name] = '❓🔧' # Question mark and wrench for "unknown/needs work"
-            print(f"Warning: Opcode '{op_name}' is in current Python version but not in the emoji map. Added generic emoji.")
 
-# Ensure EXTENDED_ARG and CACHE are present if in opmap, as they are special
-if 'EXTENDED_ARG' in dis.opmap and 'EXTENDED_ARG' not in DEFAULT_EMOJI_MAP:
-    DEFAULT_EMOJI_MAP['EXTENDED_ARG'] = '➕➕'
-if 'CACHE' in dis.opmap and 'CACHE' not in DEFAULT_EMOJI_MAP:
-    DEFAULT_EMOJI_MAP['CACHE'] = ' C '
+def _current_opnames() -> List[str]:
+    """
+    Lists the opcodes of the current Python version.
+
+    This will help us identify any missing opcodes.
+    We'll manually add opcodes from other versions if they are common or important.
+    """
+    import dis
+    return [op for op in dis.opname if '<' not in op and op != 'EXTENDED_ARG']
+
+
+def _keycaps(number: int, width: int) -> str:
+    """Spells a number as keycap emojis, zero padded to a fixed width."""
+    return ''.join(digit + '\ufe0f\u20e3' for digit in f"{number:0{width}d}")
+
+
+def generate_emoji_map() -> Dict[str, str]:
+    """
+    Generates a complete emoji map for the running interpreter.
+
+    Every name in `dis.opmap` (including instrumented and pseudo opcodes) and
+    every specialized form from `dis._specializations` gets an emoji:
+
+    - the hand-mapped emoji if there is one (or one in `missing_opcodes_emojis`),
+    - INSTRUMENTED_X: 🩺 (stethoscope) + the emoji of X,
+    - specialized forms: the base emoji + 🏎️ (racing car, "fast path") + the
+      position of the form in its family as two keycaps,
+    - anything else: ❓🔧 + the opcode number as three keycaps.
+
+    Returns:
+        The map, checked to be collision free.
+
+    Raises:
+        RuntimeError: If the generated map cannot be decoded unambiguously.
+    """
+    import dis
+    from disemoji.tokenizer import find_collisions
+
+    emoji_map: Dict[str, str] = {}
+    for op_name in dis.opmap:
+        if op_name in _HAND_MAPPED_EMOJIS:
+            emoji_map[op_name] = _HAND_MAPPED_EMOJIS[op_name]
+        elif op_name in missing_opcodes_emojis:
+            emoji_map[op_name] = missing_opcodes_emojis[op_name]
+    for op_name in dis.opmap:
+        if op_name in emoji_map:
+            continue
+        base = op_name[len('INSTRUMENTED_'):] if op_name.startswith('INSTRUMENTED_') else None
+        if base in emoji_map:
+            emoji_map[op_name] = '🩺' + emoji_map[base]
+        else:
+            emoji_map[op_name] = '❓🔧' + _keycaps(dis.opmap[op_name], 3)
+
+    for base, specialized_names in getattr(dis, '_specializations', {}).items():
+        base_emoji = emoji_map.get(base, '❓🔧' + _keycaps(dis.opmap.get(base, 0), 3))
+        for position, op_name in enumerate(specialized_names, start=1):
+            emoji_map.setdefault(op_name, base_emoji + '🏎️' + _keycaps(position, 2))
+
+    problems = find_collisions(emoji_map)
+    if problems:
+        raise RuntimeError("Generated emoji map is ambiguous:\n  " + "\n  ".join(problems))
+    return emoji_map
+
+
+def _code_fingerprint(code: Any) -> List[Any]:
+    """The bytecode, names and constants (nested code objects included) of a code object, as JSON data."""
+    return [code.co_code.hex(), code.co_names,
+            [_code_fingerprint(const) if hasattr(const, 'co_code') else repr(const) for const in code.co_consts]]
+
+
+def _cache_dir() -> str:
+    """Directory for generated maps: $DISEMOJI_CACHE_DIR, else $XDG_CACHE_HOME/disemoji."""
+    import os
+    if os.environ.get('DISEMOJI_CACHE_DIR'):
+        return os.environ['DISEMOJI_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'disemoji')
+
+
+def load_emoji_map(cache_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    Returns `generate_emoji_map()`, cached on disk per bytecode magic number.
+
+    The cache file name includes the interpreter's `importlib.util.MAGIC_NUMBER`
+    (which changes whenever the opcode set does) and a digest of the hand-mapped
+    emojis and of the generator's own code (`generate_emoji_map`, `_keycaps`),
+    so editing this module or switching interpreters regenerates it.
+    An unwritable cache directory is not an error.
+
+    Args:
+        cache_dir: Where to keep the cache. Defaults to `_cache_dir()`.
+
+    Returns:
+        The complete emoji map for the running interpreter.
+    """
+    import hashlib
+    import importlib.util
+    import json
+    import os
+    import tempfile
+
+    cache_dir = cache_dir or _cache_dir()
+    generator = [_code_fingerprint(function.__code__) for function in (generate_emoji_map, _keycaps)]
+    digest = hashlib.sha256(json.dumps([_HAND_MAPPED_EMOJIS, missing_opcodes_emojis, generator],
+                                       sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    path = os.path.join(cache_dir, f"emoji-map-{importlib.util.MAGIC_NUMBER.hex()}-{digest}.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    emoji_map = generate_emoji_map()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(emoji_map, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Atomic, concurrent writers are harmless
+    except OSError as e:
+        logging.debug(f"Could not cache emoji map in {cache_dir}: {e}")
+    return emoji_map
+
+
+def _build_default_emoji_map() -> Dict[str, str]:
+    """
+    Builds DEFAULT_EMOJI_MAP: the hand-mapped emojis of all Python versions,
+    completed with `load_emoji_map()` for the running interpreter.
+    """
+    emoji_map = dict(_HAND_MAPPED_EMOJIS)
+    emoji_map.update(load_emoji_map())
+    return emoji_map
+
+
+def __getattr__(name: str) -> Any:
+    # Lazily build the interpreter-dependent tables (PEP 562).
+    if name == 'DEFAULT_EMOJI_MAP':
+        value: Any = _build_default_emoji_map()
+    elif name == 'current_opnames':
+        value = _current_opnames()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 
 # --- You can then use this map ---
 if __name__ == '__main__':
-    # please find the dupe values in DEFAULT_EMOJI_MAP and print them
-    for key, value in DEFAULT_EMOJI_MAP.items():
-        if list(DEFAULT_EMOJI_MAP.values()).count(value) > 1:
-            for k, v in DEFAULT_EMOJI_MAP.items():
-                if v == value and k != key:
-                    print(f"Duplicate emoji '{value}' for opcodes '{key}' and '{k}'")
-                    break
-            print(f"Missing emoji for opcode '{key}'")
+    DEFAULT_EMOJI_MAP = _build_default_emoji_map()
+
+    # Report duplicate, empty or ambiguous emojis in DEFAULT_EMOJI_MAP
+    from disemoji.tokenizer import find_collisions
+    for problem in find_collisions(DEFAULT_EMOJI_MAP):
+        print(problem)
 
     # Example:
     import dis
@@ -0,0 +1,351 @@
+"""
+Compact emoji streams with superinstructions.
+
+A few opcode sequences (LOAD_FAST LOAD_ATTR, LOAD_CONST MAKE_FUNCTION
+STORE_NAME, TO_BOOL POP_JUMP_IF_FALSE, ...) make up most of any stream.
+A `SuperinstructionDictionary` gives each of them a single-character emoji
+from SUPERINSTRUCTION_EMOJIS (playing cards and mahjong tiles, which no
+opcode emoji uses, so the combined code stays uniquely decodable). The
+encoder picks the split with the fewest characters (dynamic programming
+over the opcode sequence); the decoder is an `EmojiTokenizer` over opcode
+and superinstruction emojis, expanding superinstructions as it goes.
+
+The built-in dictionary is trained with `SuperinstructionDictionary.train`
+on part of the running interpreter's standard library the first time it is
+needed, and cached per bytecode magic number like the emoji map (see
+`load_builtin_dictionary`). Compact streams therefore decode with the
+dictionary of the interpreter version that wrote them; `save` a dictionary
+to exchange streams between versions. Train your own on a corpus with
+
+    counter = NGramCounter().add_tree('src')
+    SuperinstructionDictionary.train(counter.opcodes(), DEFAULT_EMOJI_MAP).save('dictionary.json')
+"""
+import dis
+import json
+import logging
+import types
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from disemoji.tokenizer import EmojiTokenizer, _normalize
+
+# Single code point emojis for superinstructions, in assignment order.
+SUPERINSTRUCTION_EMOJIS: Tuple[str, ...] = tuple(
+    chr(code_point) for code_point in (*range(0x1F0A1, 0x1F0AF), *range(0x1F0B1, 0x1F0C0),
+                                       *range(0x1F0C1, 0x1F0D0), *range(0x1F0D1, 0x1F0F6),
+                                       *range(0x1F000, 0x1F02C))
+)
+
+# Standard library files (relative to the stdlib directory) the built-in
+# dictionary is trained on. Bytecode differs between interpreter versions,
+# so the dictionary is trained for each one on first use and cached on disk
+# (see load_builtin_dictionary); files missing from a version are skipped.
+BUILTIN_TRAINING_FILES: Tuple[str, ...] = (
+    'argparse.py', 'collections/__init__.py', 'dataclasses.py', 'email/message.py', 'enum.py',
+    'functools.py', 'inspect.py', 'json/encoder.py', 'logging/__init__.py', 'subprocess.py',
+    'tarfile.py', 'typing.py',
+)
+BUILTIN_SIZE = 128
+BUILTIN_MAX_LENGTH = 6
+
+# Separates the opcode strings of different code objects in training input.
+_SEPARATOR = 0
+
+
+class SuperinstructionDictionary:
+    """
+    Maps single-character emojis to the opcode sequences they stand for.
+
+    Args:
+        entries: Superinstruction emoji -> sequence of two or more opcode names.
+
+    Raises:
+        ValueError: If an emoji is not a single character or a sequence is shorter than two.
+    """
+
+    def __init__(self, entries: Dict[str, Sequence[str]]) -> None:
+        self.entries: Dict[str, Tuple[str, ...]] = {}
+        for emoji, opnames in entries.items():
+            if len(emoji) != 1 or len(opnames) < 2:
+                raise ValueError(f"Superinstruction {emoji!r} -> {opnames!r} must be one character "
+                                 f"for two or more opcodes")
+            self.entries[emoji] = tuple(opnames)
+        self.max_length = max(map(len, self.entries.values()), default=0)
+        self._by_sequence = {opnames: emoji for emoji, opnames in self.entries.items()}
+        self._tokenizers: Dict[int, Tuple[Dict[str, str], EmojiTokenizer]] = {}
+
+    @classmethod
+    def builtin(cls) -> 'SuperinstructionDictionary':
+        """Returns the built-in dictionary of the running interpreter (see `load_builtin_dictionary`)."""
+        return load_builtin_dictionary()
+
+    @classmethod
+    def train(
+            cls,
+            opcodes: bytes,
+            emoji_map: Dict[str, str],
+            size: int = 64,
+            max_length: int = 6
+    ) -> 'SuperinstructionDictionary':
+        """
+        Learns superinstructions from a corpus by byte-pair merging.
+
+        Repeatedly merges the adjacent token pair that saves the most
+        characters (occurrences times the characters the pair spans in the
+        emoji stream, minus one), like byte-pair encoding.
+
+        Args:
+            opcodes: Opcode strings joined with a zero byte, e.g. `NGramCounter.opcodes()`.
+            emoji_map: The map whose emoji lengths determine the savings.
+            size: Number of superinstructions to learn (at most len(SUPERINSTRUCTION_EMOJIS)).
+            max_length: Longest opcode sequence a superinstruction may stand for.
+
+        Returns:
+            The trained dictionary.
+        """
+        size = min(size, len(SUPERINSTRUCTION_EMOJIS))
+        # Tokens are opcodes (< 256) or 256 + index of a learned sequence.
+        sequences: List[Tuple[int, ...]] = []
+        corpus: List[List[int]] = [list(part) for part in opcodes.split(bytes([_SEPARATOR])) if len(part) > 1]
+
+        def expand(token: int) -> Tuple[int, ...]:
+            return (token,) if token < 256 else sequences[token - 256]
+
+        def cost(token: int) -> int:
+            return 1 if token >= 256 else len(_normalize(emoji_map.get(dis.opname[token], dis.opname[token])))
+
+        while len(sequences) < size:
+            pairs: Counter = Counter()
+            for tokens in corpus:
+                pairs.update(zip(tokens, tokens[1:]))
+            best, best_saving = None, 0
+            for (first, second), count in pairs.items():
+                if len(expand(first)) + len(expand(second)) > max_length:
+                    continue
+                saving = count * (cost(first) + cost(second) - 1)
+                if saving > best_saving:
+                    best, best_saving = (first, second), saving
+            if best is None:
+                break
+            sequences.append(expand(best[0]) + expand(best[1]))
+            merged = 255 + len(sequences)
+            for index, tokens in enumerate(corpus):
+                corpus[index] = _merge_pair(tokens, best, merged)
+
+        return cls({emoji: tuple(dis.opname[opcode] for opcode in sequence)
+                    for emoji, sequence in zip(SUPERINSTRUCTION_EMOJIS, sequences)})
+
+    def save(self, path: str) -> None:
+        """Writes the dictionary as JSON (emoji -> list of opcode names)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({emoji: list(opnames) for emoji, opnames in self.entries.items()}, f,
+                      ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> 'SuperinstructionDictionary':
+        """Reads a dictionary written by `save`."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _tokenizer(self, emoji_map: Dict[str, str]) -> Tuple[Dict[str, str], EmojiTokenizer]:
+        """Returns (the map it was built for, tokenizer over opcode and superinstruction emojis), built once per map."""
+        cached = self._tokenizers.get(id(emoji_map))
+        if cached is None or cached[0] is not emoji_map:
+            # Superinstruction keys join opnames with '+', which no opname contains.
+            combined = dict(emoji_map)
+            combined.update({'+'.join(opnames): emoji for emoji, opnames in self.entries.items()})
+            cached = (emoji_map, EmojiTokenizer(combined))
+            self._tokenizers[id(emoji_map)] = cached
+        return cached
+
+    def encode(self, opnames: Sequence[str], emoji_map: Dict[str, str]) -> str:
+        """
+        Encodes opcode names as the shortest compact stream.
+
+        Args:
+            opnames: The opcode names, in order.
+            emoji_map: A dictionary mapping opcode names to emojis.
+
+        Returns:
+            The space-free compact stream.
+
+        Raises:
+            ValueError: If an opcode is not in `emoji_map` and not covered by a superinstruction.
+        """
+        count = len(opnames)
+        # best[i]: (characters needed for opnames[i:], token at i, its length in opcodes)
+        best: List[Tuple[float, str, int]] = [(0, '', 0)] * (count + 1)
+        for start in range(count - 1, -1, -1):
+            emoji = emoji_map.get(opnames[start])
+            token = _normalize(emoji) if emoji is not None else ''
+            choice = (len(token) + best[start + 1][0], token, 1) if token else (float('inf'), '', 1)
+            for length in range(2, min(self.max_length, count - start) + 1):
+                superinstruction = self._by_sequence.get(tuple(opnames[start:start + length]))
+                if superinstruction is not None and 1 + best[start + length][0] < choice[0]:
+                    choice = (1 + best[start + length][0], superinstruction, length)
+            best[start] = choice
+        if best[0][0] == float('inf'):
+            missing = next(opname for opname in opnames if opname not in emoji_map)
+            raise ValueError(f"Opcode {missing} not mapped to emoji!")
+
+        parts: List[str] = []
+        position = 0
+        while position < count:
+            _, token, length = best[position]
+            parts.append(token)
+            position += length
+        return ''.join(parts)
+
+    def decode(self, stream: str, emoji_map: Dict[str, str]) -> List[str]:
+        """
+        Decodes a compact (or plain) stream back into opcode names.
+
+        Raises:
+            ValueError: If the stream cannot be split into known emojis.
+        """
+        _, tokenizer = self._tokenizer(emoji_map)
+        opnames: List[str] = []
+        for key in tokenizer.tokenize(stream):
+            opnames.extend(key.split('+'))
+        return opnames
+
+
+def _merge_pair(tokens: List[int], pair: Tuple[int, int], merged: int) -> List[int]:
+    """Replaces non-overlapping occurrences of `pair`, left to right."""
+    first, second = pair
+    if first not in tokens:
+        return tokens
+    result: List[int] = []
+    index, length = 0, len(tokens)
+    while index < length:
+        if index + 1 < length and tokens[index] == first and tokens[index + 1] == second:
+            result.append(merged)
+            index += 2
+        else:
+            result.append(tokens[index])
+            index += 1
+    return result
+
+
+def compact_stream(
+        code_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        emoji_map: Dict[str, str],
+        dictionary: Optional[SuperinstructionDictionary] = None
+) -> str:
+    """
+    Disassembles a code input into a compact emoji stream.
+
+    Args:
+        code_input: Anything accepted by `generate_emoji_disassembly`.
+        emoji_map: A dictionary mapping opcode names to emojis.
+        dictionary: The superinstructions to use (default: the built-in dictionary).
+
+    Returns:
+        The space-free compact stream of the code object's instructions.
+    """
+    from disemoji.make_dis_pretty import _get_code_object
+
+    dictionary = dictionary or _builtin_dictionary()
+    opnames = [instruction.opname for instruction in dis.get_instructions(_get_code_object(code_input))]
+    return dictionary.encode(opnames, emoji_map)
+
+
+def expand_stream(
+        stream: str,
+        emoji_map: Dict[str, str],
+        dictionary: Optional[SuperinstructionDictionary] = None
+) -> List[str]:
+    """
+    Decodes a compact stream into opcode names.
+
+    Args:
+        stream: A stream from `compact_stream` (plain space-free streams decode too).
+        emoji_map: The map the stream was encoded with.
+        dictionary: The dictionary the stream was encoded with (default: built-in).
+
+    Returns:
+        The opcode names, in order.
+    """
+    return (dictionary or _builtin_dictionary()).decode(stream, emoji_map)
+
+
+def _train_builtin(emoji_map: Dict[str, str]) -> SuperinstructionDictionary:
+    """Trains the built-in dictionary on BUILTIN_TRAINING_FILES of the running interpreter's stdlib."""
+    import os
+    import sysconfig
+
+    from disemoji.ngrams import NGramCounter
+
+    stdlib = sysconfig.get_paths()['stdlib']
+    counter = NGramCounter()
+    for name in BUILTIN_TRAINING_FILES:
+        path = os.path.join(stdlib, *name.split('/'))
+        if os.path.exists(path):
+            counter.add_file(path)
+    return SuperinstructionDictionary.train(counter.opcodes(), emoji_map, BUILTIN_SIZE, BUILTIN_MAX_LENGTH)
+
+
+def load_builtin_dictionary(cache_dir: Optional[str] = None) -> SuperinstructionDictionary:
+    """
+    Returns the built-in dictionary, trained for the running interpreter and cached on disk.
+
+    As with `disemoji.codes.load_emoji_map`, the cache file name includes
+    `importlib.util.MAGIC_NUMBER` and a digest of the training inputs (the
+    emoji map and the training settings), so a new interpreter version or
+    emoji map retrains it. An unwritable cache directory is not an error.
+
+    Args:
+        cache_dir: Where to keep the cache. Defaults to the emoji map's cache directory.
+    """
+    import hashlib
+    import importlib.util
+    import os
+    import tempfile
+
+    from disemoji.codes import DEFAULT_EMOJI_MAP, _cache_dir
+
+    cache_dir = cache_dir or _cache_dir()
+    digest = hashlib.sha256(json.dumps([DEFAULT_EMOJI_MAP, BUILTIN_TRAINING_FILES, BUILTIN_SIZE, BUILTIN_MAX_LENGTH],
+                                       sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    path = os.path.join(cache_dir, f"superinstructions-{importlib.util.MAGIC_NUMBER.hex()}-{digest}.json")
+    try:
+        return SuperinstructionDictionary.load(path)
+    except (OSError, ValueError):
+        pass
+
+    dictionary = _train_builtin(DEFAULT_EMOJI_MAP)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        os.close(fd)
+        dictionary.save(tmp_path)
+        os.replace(tmp_path, path)  # Atomic, concurrent writers are harmless
+    except OSError as e:
+        logging.debug(f"Could not cache the superinstruction dictionary in {cache_dir}: {e}")
+    return dictionary
+
+
+_BUILTIN: List[SuperinstructionDictionary] = []
+
+
+def _builtin_dictionary() -> SuperinstructionDictionary:
+    """The built-in dictionary, built on first use and shared (it caches its tokenizers)."""
+    if not _BUILTIN:
+        _BUILTIN.append(load_builtin_dictionary())
+    return _BUILTIN[0]
+
+
+if __name__ == '__main__':
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.make_dis_pretty import generate_emoji_disassembly
+
+    import argparse as sample_module
+
+    with open(sample_module.__file__, 'r', encoding='utf-8') as f:
+        sample = compile(f.read(), sample_module.__file__, 'exec')
+    plain = generate_emoji_disassembly(sample, DEFAULT_EMOJI_MAP, output_format='stream')
+    compact = compact_stream(sample, DEFAULT_EMOJI_MAP)
+    print(compact[:200])
+    print(f"stream: {len(plain)} characters, compact: {len(compact)} characters "
+          f"({len(plain) / len(compact):.1f}x smaller)")
+    assert expand_stream(compact, DEFAULT_EMOJI_MAP) == [i.opname for i in dis.get_instructions(sample)]
@@ -0,0 +1,147 @@
+"""
+Static cost estimates for code objects.
+
+`analyze_costs` combines the control-flow graph of `disemoji.cfg` with a
+per-opcode weight table: every instruction costs its weight, multiplied by
+`loop_multiplier` for each loop around it, as a rough guess of how often it
+runs. The result also records the stack depth before every instruction and
+which instructions head a loop or close one with a back-edge.
+
+Weights are looked up by opcode name first, then by `disemoji.diff`
+opcode class, so both can be tuned:
+
+    analyze_costs(func, weights={'call': 20, 'LOAD_ATTR': 4})
+
+`generate_emoji_disassembly(..., annotate_costs=True)` renders the analysis
+as extra columns and a per-function summary.
+"""
+import dis
+import types
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from disemoji.cfg import build_cfg
+from disemoji.diff import opcode_class
+
+# Weight per opcode class (see disemoji.diff.OPCODE_CLASSES), in rough units of a LOAD_FAST.
+DEFAULT_COST_WEIGHTS: Dict[str, float] = {
+    'call': 10.0,
+    'allocation': 5.0,
+    'attribute': 3.0,
+    'subscript': 3.0,
+    'arithmetic': 2.0,
+    'global': 2.0,
+    'load': 1.0,
+    'store': 1.0,
+    'jump': 1.0,
+    'stack': 0.5,
+    'other': 1.0,
+}
+# Assumed iterations per loop nesting level.
+DEFAULT_LOOP_MULTIPLIER = 10.0
+
+# Markers for the loop column of an annotated listing.
+LOOP_MARKERS = {
+    'header': '🔁',  # First instruction of a loop
+    'back_edge': '🔙',  # Jumps back to a loop header
+    'body': '➰',  # Anywhere else inside a loop
+}
+
+
+@dataclass
+class InstructionCost:
+    """The analysis of one instruction."""
+    instruction: dis.Instruction
+    # Stack depth before the instruction; None if it is unreachable.
+    stack_depth: Optional[int]
+    # Number of loops around the instruction.
+    loop_depth: int
+    # 'header', 'back_edge', 'body' or None, see LOOP_MARKERS.
+    loop_role: Optional[str]
+    weight: float
+    cost: float
+
+
+@dataclass
+class CostAnalysis:
+    """Per-instruction costs and totals for one code object."""
+    code: types.CodeType
+    instructions: List[InstructionCost] = field(default_factory=list)
+    loops: int = 0
+
+    @property
+    def total_cost(self) -> float:
+        return sum(item.cost for item in self.instructions)
+
+    @property
+    def loop_cost(self) -> float:
+        """The part of the total spent inside loops."""
+        return sum(item.cost for item in self.instructions if item.loop_depth)
+
+    @property
+    def max_stack_depth(self) -> int:
+        return max((item.stack_depth for item in self.instructions if item.stack_depth is not None), default=0)
+
+
+def analyze_costs(
+        code_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        weights: Optional[Dict[str, float]] = None,
+        loop_multiplier: float = DEFAULT_LOOP_MULTIPLIER
+) -> CostAnalysis:
+    """
+    Estimates the cost of every instruction of a code object.
+
+    Args:
+        code_input: Anything accepted by `generate_emoji_disassembly`.
+        weights: Opcode name or opcode class -> weight, overriding DEFAULT_COST_WEIGHTS.
+        loop_multiplier: Factor applied per enclosing loop.
+
+    Returns:
+        The CostAnalysis, in instruction order.
+    """
+    from disemoji.make_dis_pretty import _get_code_object
+
+    code_obj = _get_code_object(code_input)
+    table = {**DEFAULT_COST_WEIGHTS, **(weights or {})}
+    graph = build_cfg(code_obj)
+    stack_depths = graph.stack_depths()
+    loops = graph.loops()
+    loop_depths = graph.loop_depths()
+    back_edge_sources = {source for source, _ in graph.back_edges}
+
+    analysis = CostAnalysis(code=code_obj, loops=len(loops))
+    for block in graph.blocks:
+        loop_depth = loop_depths[block.index]
+        for position, instruction in enumerate(block.instructions):
+            if position == 0 and block.index in loops:
+                role: Optional[str] = 'header'
+            elif position == len(block.instructions) - 1 and block.index in back_edge_sources:
+                role = 'back_edge'
+            else:
+                role = 'body' if loop_depth else None
+            weight = table.get(instruction.opname, table.get(opcode_class(instruction.opname), 1.0))
+            analysis.instructions.append(InstructionCost(
+                instruction=instruction,
+                stack_depth=stack_depths.get(instruction.offset),
+                loop_depth=loop_depth,
+                loop_role=role,
+                weight=weight,
+                cost=weight * loop_multiplier ** loop_depth,
+            ))
+    return analysis
+
+
+def format_cost_columns(item: InstructionCost) -> str:
+    """Formats the stack depth, loop marker and cost columns put in front of a listing line."""
+    depth = '?' if item.stack_depth is None else str(item.stack_depth)
+    marker = LOOP_MARKERS.get(item.loop_role, '') if item.loop_role else ''
+    return f"{depth:>3} {marker:<2} {item.cost:>8g}"
+
+
+def format_cost_summary(analysis: CostAnalysis) -> str:
+    """Formats the one-line per-function estimate printed under an annotated listing."""
+    total = analysis.total_cost
+    share = analysis.loop_cost / total if total else 0.0
+    return (f"Estimated cost of {getattr(analysis.code, 'co_qualname', analysis.code.co_name)}: {total:g} "
+            f"({share:.0%} in {analysis.loops} loop{'s' if analysis.loops != 1 else ''}), "
+            f"max stack depth {analysis.max_stack_depth} (co_stacksize {analysis.code.co_stacksize})")
@@ -0,0 +1,275 @@
+"""
+Emoji diffs of bytecode between two versions of a function or module.
+
+Both sides are reduced to opcode strings first: one byte per instruction,
+taken straight from `co_code` with the inline CACHE entries removed. Pairing
+code objects, spotting unchanged ones and computing the alignment with
+`difflib.SequenceMatcher` all work on those byte strings, so even large
+modules diff in milliseconds. `dis` instructions are only produced for the
+code objects that actually changed, to render their hunks.
+
+Besides the aligned emoji diff there is a per opcode class summary
+(calls, attribute access, allocations, ...), which is what a performance
+review of a refactor usually wants to know.
+"""
+import dis
+import difflib
+import types
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from disemoji.assembler import iter_code_objects
+from disemoji.make_dis_pretty import _format_instruction_assembler, _get_code_object
+
+_CACHE = dis.opmap.get('CACHE', 0)
+
+# Opcode classes, checked in order; the first matching prefix wins.
+OPCODE_CLASSES: List[Tuple[str, Tuple[str, ...]]] = [
+    ('call', ('CALL', 'PRECALL', 'KW_NAMES')),
+    ('attribute', ('LOAD_ATTR', 'STORE_ATTR', 'DELETE_ATTR', 'LOAD_METHOD', 'LOAD_SUPER_ATTR', 'LOAD_SPECIAL')),
+    ('allocation', ('BUILD_', 'MAKE_FUNCTION', 'MAKE_CELL', 'LIST_', 'SET_ADD', 'SET_UPDATE', 'DICT_',
+                    'MAP_ADD', 'FORMAT_', 'CONVERT_VALUE')),
+    ('subscript', ('BINARY_SUBSCR', 'STORE_SUBSCR', 'DELETE_SUBSCR', 'BINARY_SLICE', 'STORE_SLICE')),
+    ('arithmetic', ('BINARY_', 'UNARY_', 'INPLACE_', 'COMPARE_OP', 'IS_OP', 'CONTAINS_OP', 'TO_BOOL')),
+    ('global', ('LOAD_GLOBAL', 'STORE_GLOBAL', 'DELETE_GLOBAL', 'LOAD_NAME', 'STORE_NAME', 'DELETE_NAME')),
+    ('load', ('LOAD_',)),
+    ('store', ('STORE_', 'DELETE_')),
+    ('jump', ('JUMP', 'POP_JUMP', 'FOR_ITER', 'SEND', 'END_FOR', 'END_SEND', 'GET_ITER', 'NOT_TAKEN')),
+    ('stack', ('POP_TOP', 'PUSH_NULL', 'COPY', 'SWAP', 'NOP', 'EXTENDED_ARG', 'RESUME')),
+]
+
+_DIFF_MARKS = {'equal': ' ', 'delete': '-', 'insert': '+'}
+
+
+def opcode_class(opname: str) -> str:
+    """
+    Returns the OPCODE_CLASSES name for an opcode, or 'other'.
+
+    Args:
+        opname: The opcode name, e.g. 'LOAD_ATTR'.
+    """
+    for name, prefixes in OPCODE_CLASSES:
+        if opname.startswith(prefixes):
+            return name
+    return 'other'
+
+
+def opcode_sequence(code_obj: types.CodeType) -> bytes:
+    """
+    Returns the opcodes of a code object, one byte per instruction.
+
+    The result lines up with `dis.get_instructions(code_obj)`: the n-th byte
+    is the opcode of the n-th instruction.
+    """
+    return code_obj.co_code[::2].translate(None, bytes([_CACHE]))
+
+
+def _qualname(code_obj: types.CodeType) -> str:
+    return getattr(code_obj, 'co_qualname', code_obj.co_name)
+
+
+def _keyed_code_objects(code_obj: types.CodeType) -> Dict[Tuple[str, int], types.CodeType]:
+    """
+    Keys every code object so both sides can be paired.
+
+    The root is keyed ('', 0), so two roots always pair up whatever their
+    names. Nested code objects are keyed by (qualname, occurrence), with the
+    root's qualname stripped, so `a.<locals>.inner` pairs with `b.<locals>.inner`.
+    """
+    keyed: Dict[Tuple[str, int], types.CodeType] = {('', 0): code_obj}
+    prefix = _qualname(code_obj) + '.'
+    seen: Counter = Counter()
+    for code in iter_code_objects(code_obj):
+        if code is code_obj:
+            continue
+        qualname = _qualname(code)
+        if qualname.startswith(prefix):
+            qualname = qualname[len(prefix):]
+        keyed[(qualname, seen[qualname])] = code
+        seen[qualname] += 1
+    return keyed
+
+
+@dataclass
+class CodeDiff:
+    """
+    The difference between one pair of code objects.
+
+    `old` or `new` is None when the code object only exists on one side
+    (a function was added or removed). `qualname` is the new side's name,
+    or the old side's if it was removed.
+    """
+    qualname: str
+    old: Optional[types.CodeType]
+    new: Optional[types.CodeType]
+    old_opcodes: bytes = b''
+    new_opcodes: bytes = b''
+
+    @property
+    def changed(self) -> bool:
+        return self.old_opcodes != self.new_opcodes
+
+    def opcodes(self) -> List[Tuple[str, int, int, int, int]]:
+        """Returns `SequenceMatcher.get_opcodes()` for the two opcode strings."""
+        return difflib.SequenceMatcher(None, self.old_opcodes, self.new_opcodes, autojunk=False).get_opcodes()
+
+    def class_deltas(self) -> Dict[str, Tuple[int, int]]:
+        """Returns opcode class -> (old count, new count), for classes that occur on either side."""
+        return _class_counts(self.old_opcodes, self.new_opcodes)
+
+
+@dataclass
+class BytecodeDiff:
+    """The difference between two code inputs, one CodeDiff per code object."""
+    entries: List[CodeDiff] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[CodeDiff]:
+        return [entry for entry in self.entries if entry.changed]
+
+    def class_deltas(self) -> Dict[str, Tuple[int, int]]:
+        """Returns opcode class -> (old count, new count) over all code objects."""
+        return _class_counts(b''.join(entry.old_opcodes for entry in self.entries),
+                             b''.join(entry.new_opcodes for entry in self.entries))
+
+
+def _class_counts(old_opcodes: bytes, new_opcodes: bytes) -> Dict[str, Tuple[int, int]]:
+    counts: Dict[str, List[int]] = {}
+    for side, opcodes in enumerate((old_opcodes, new_opcodes)):
+        for opcode, count in Counter(opcodes).items():
+            counts.setdefault(opcode_class(dis.opname[opcode]), [0, 0])[side] += count
+    order = [name for name, _ in OPCODE_CLASSES] + ['other']
+    return {name: (counts[name][0], counts[name][1]) for name in order if name in counts}
+
+
+def diff_code(
+        old_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        new_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any]
+) -> BytecodeDiff:
+    """
+    Compares two code inputs at the opcode level, including nested code objects.
+
+    The two top-level code objects are always paired with each other, so two
+    differently named functions are compared opcode by opcode. Nested code
+    objects are paired by qualified name relative to their top-level code
+    object (and order of appearance, for repeated names such as lambdas).
+
+    Args:
+        old_input: The old version; anything accepted by `generate_emoji_disassembly`.
+        new_input: The new version.
+
+    Returns:
+        A BytecodeDiff covering every code object on either side.
+
+    Raises:
+        TypeError: If a code object cannot be extracted from an input.
+        SyntaxError: If a string input contains invalid Python syntax.
+    """
+    old_codes = _keyed_code_objects(_get_code_object(old_input))
+    new_codes = _keyed_code_objects(_get_code_object(new_input))
+    result = BytecodeDiff()
+    for key in list(old_codes) + [key for key in new_codes if key not in old_codes]:
+        old, new = old_codes.get(key), new_codes.get(key)
+        result.entries.append(CodeDiff(
+            qualname=_qualname(new if new is not None else old), old=old, new=new,
+            old_opcodes=opcode_sequence(old) if old is not None else b'',
+            new_opcodes=opcode_sequence(new) if new is not None else b'',
+        ))
+    return result
+
+
+def _format_hunks(entry: CodeDiff, emoji_map: Dict[str, str], context: int, opname_width: int) -> Iterator[str]:
+    old_instructions = list(dis.get_instructions(entry.old)) if entry.old is not None else []
+    new_instructions = list(dis.get_instructions(entry.new)) if entry.new is not None else []
+    matcher = difflib.SequenceMatcher(None, entry.old_opcodes, entry.new_opcodes, autojunk=False)
+    for group in matcher.get_grouped_opcodes(context):
+        first, last = group[0], group[-1]
+        yield f"@@ -{first[1]},{last[2] - first[1]} +{first[3]},{last[4] - first[3]} @@"
+        for tag, i1, i2, j1, j2 in group:
+            if tag in ('equal', 'delete', 'replace'):
+                # Unchanged lines are shown as they are in the new version.
+                source = new_instructions[j1:j2] if tag == 'equal' else old_instructions[i1:i2]
+                mark = _DIFF_MARKS['equal' if tag == 'equal' else 'delete']
+                for instruction in source:
+                    yield mark + _format_instruction_assembler(instruction, emoji_map, opname_width)
+            if tag in ('insert', 'replace'):
+                for instruction in new_instructions[j1:j2]:
+                    yield _DIFF_MARKS['insert'] + _format_instruction_assembler(instruction, emoji_map, opname_width)
+
+
+def format_class_summary(class_deltas: Dict[str, Tuple[int, int]]) -> str:
+    """
+    Formats opcode class counts as a table of old, new and delta per class.
+
+    Args:
+        class_deltas: The output of `BytecodeDiff.class_deltas()` or `CodeDiff.class_deltas()`.
+    """
+    lines = [f"{'class':<12} {'old':>7} {'new':>7} {'delta':>7}"]
+    total_old = total_new = 0
+    for name, (old, new) in class_deltas.items():
+        lines.append(f"{name:<12} {old:>7} {new:>7} {new - old:>+7}")
+        total_old += old
+        total_new += new
+    lines.append(f"{'total':<12} {total_old:>7} {total_new:>7} {total_new - total_old:>+7}")
+    return "\n".join(lines)
+
+
+def generate_emoji_diff(
+        old_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        new_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
+        emoji_map: Dict[str, str],
+        context: int = 3,
+        opname_column_width: int = 20
+) -> str:
+    """
+    Renders a unified-style emoji diff of two code inputs plus a class summary.
+
+    Args:
+        old_input: The old version; anything accepted by `generate_emoji_disassembly`.
+        new_input: The new version.
+        emoji_map: A dictionary mapping opcode names to emojis.
+        context: Unchanged instructions shown around each change.
+        opname_column_width: Width of the emoji column, as in `generate_emoji_disassembly`.
+
+    Returns:
+        The diff: one section per changed code object, followed by the
+        per opcode class instruction counts. Unchanged inputs produce only the summary.
+    """
+    result = diff_code(old_input, new_input)
+    lines: List[str] = []
+    for entry in result.changed:
+        lines.append(f"--- {entry.qualname if entry.old is None else _qualname(entry.old)}"
+                     + ('' if entry.old is not None else ' (added)'))
+        lines.append(f"+++ {entry.qualname}" + ('' if entry.new is not None else ' (removed)'))
+        lines.extend(_format_hunks(entry, emoji_map, context, opname_column_width))
+    if not lines:
+        lines.append("No bytecode changes.")
+    lines.append("")
+    lines.append(format_class_summary(result.class_deltas()))
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[1], 'r', encoding='utf-8') as old_file, open(sys.argv[2], 'r', encoding='utf-8') as new_file:
+            print(generate_emoji_diff(compile(old_file.read(), sys.argv[1], 'exec'),
+                                      compile(new_file.read(), sys.argv[2], 'exec'), DEFAULT_EMOJI_MAP))
+        sys.exit(0)
+
+    old_source = '''
+def total_price(items):
+    total = 0
+    for item in items:
+        total += item.price * item.quantity
+    return total
+'''
+    new_source = '''
+def total_price(items):
+    return sum([item.price * item.quantity for item in items])
+'''
+    print(generate_emoji_diff(old_source, new_source, DEFAULT_EMOJI_MAP))
@@ -4,17 +4,10 @@ import logging
 import sys
 import types
 import inspect  # Moved import here
-from typing import Callable, Dict, Union, Literal, Iterator, List, Any
-
-from disemoji.codes import DEFAULT_EMOJI_MAP
-
-# Configure basic logging for warnings
-# Ensures warnings are visible when opcodes are missing from the map
-if not logging.getLogger().hasHandlers():  # Avoid adding multiple handlers if already configured
-    logging.basicConfig(level=logging.WARNING, stream=sys.stderr,
-                        format='%(levelname)s (emoji_disassembler): %(message)s')
-
+from typing import Callable, Dict, Union, Literal, Iterator, List, Any, Optional
 
+from disemoji import metrics
+from disemoji.cache import DISASSEMBLY_CACHE
 
 
 def _get_code_object(code_input: Union[
@@ -42,7 +35,8 @@ def _get_code_object(code_input: Union[
         try:
             # Using 'single' for simple expressions, 'exec' for statements/modules
             # 'exec' is generally safer for arbitrary code blocks.
-            return compile(code_input, '<string>', 'exec')
+            with metrics.timed('compile'):
+                return compile(code_input, '<string>', 'exec')
         except SyntaxError as e:
             logging.error(f"Syntax error compiling string input: {e}")
             raise
@@ -90,23 +84,123 @@ def _get_code_object(code_input: Union[
                     "Expected string, code object, function, method, frame, class, or module.")
 
 
-def _get_instructions(code_obj: types.CodeType) -> Iterator[dis.Instruction]:
+def _get_instructions(code_obj: types.CodeType, adaptive: bool = False) -> Iterator[dis.Instruction]:
     """
     Yields disassembled instructions from a code object.
 
     Args:
         code_obj: The code object to disassemble.
+        adaptive: Show the quickened (specialized) instructions the
+                  interpreter is currently running instead of the static bytecode.
 
     Yields:
-        dis.Instruction objects.
+        dis.Instruction objects. Static instructions come from the shared
+        DISASSEMBLY_CACHE; quickened ones change as code runs and are never cached.
+    """
+    if adaptive:
+        return dis.get_instructions(code_obj, adaptive=True)
+    return iter(DISASSEMBLY_CACHE.instructions(code_obj))
+
+
+# Emoji badges for the specialization state of an instruction in adaptive mode.
+ADAPTIVE_BADGES: Dict[str, str] = {
+    'specialized': '⚡',  # Running a specialized form, e.g. BINARY_OP_ADD_INT.
+    'deoptimized': '🐢',  # Specialization failed or was undone; the counter is backing off.
+    'unspecialized': '💤',  # Specializable, but not (yet) warmed up.
+}
+
+# Adaptive counters are 16 bits: a 12-bit value and a 4-bit backoff exponent.
+# Cold instructions start at value 1, backoff 1 (see Include/internal/pycore_backoff.h).
+_WARMUP_BACKOFF = 1
+
+
+def _specialization_state(instruction: dis.Instruction) -> Optional[str]:
+    """
+    Classifies a quickened instruction for the adaptive view.
+
+    Args:
+        instruction: An instruction from `dis.get_instructions(..., adaptive=True)`.
+
+    Returns:
+        'specialized', 'deoptimized' or 'unspecialized' (keys of ADAPTIVE_BADGES),
+        or None for instructions that have no specialized forms at all.
+    """
+    if instruction.opname in getattr(dis, '_specialized_opmap', {}):
+        return 'specialized'
+    if not getattr(dis, '_specializations', {}).get(instruction.opname):
+        return None
+    for name, _, data in instruction.cache_info or ():
+        if name == 'counter':
+            counter = int.from_bytes(data, 'little')
+            value, backoff = counter >> 4, counter & 0xF
+            # Failed attempts raise the backoff exponent; a deoptimized
+            # instruction restarts with backoff 0 and a long cooldown value.
+            if backoff > _WARMUP_BACKOFF or (backoff == 0 and value > 1):
+                return 'deoptimized'
+    return 'unspecialized'
+
+
+def _with_specialized_fallbacks(emoji_map: Dict[str, str]) -> Dict[str, str]:
+    """Adds the base opcode's emoji for specialized forms the map does not cover."""
+    completed = dict(emoji_map)
+    for base, specialized_names in getattr(dis, '_specializations', {}).items():
+        if base in emoji_map:
+            for name in specialized_names:
+                completed.setdefault(name, emoji_map[base])
+    return completed
+
+
+def _format_cache_entries(instruction: dis.Instruction, emoji_map: Dict[str, str]) -> List[str]:
+    """Formats the inline cache entries of a quickened instruction, one line each."""
+    cache_emoji = emoji_map.get('CACHE', 'CACHE')
+    lines = []
+    for name, size, data in instruction.cache_info or ():
+        value = int.from_bytes(data, 'little')
+        detail = f"(value {value >> 4}, backoff {value & 0xF})" if name == 'counter' else ''
+        lines.append(f"{'':13}{cache_emoji} {name}[{size}] = {value:#0{2 + 4 * size}x} {detail}".rstrip())
+    return lines
+
+
+def specialization_summary(
+        code_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any]
+) -> Dict[str, Any]:
+    """
+    Counts how many specializable instructions the interpreter has specialized.
+
+    Only meaningful for code that has already run; a string is compiled fresh
+    and therefore reports everything as unspecialized.
+
+    Args:
+        code_input: Anything accepted by `generate_emoji_disassembly`.
+
+    Returns:
+        A dict with the counts for each key of ADAPTIVE_BADGES, 'total'
+        (specializable instructions) and 'rate' (specialized / total, 0.0 if none).
     """
-    return dis.get_instructions(code_obj)
+    code_obj = _get_code_object(code_input)
+    counts: Dict[str, Any] = {state: 0 for state in ADAPTIVE_BADGES}
+    for instruction in _get_instructions(code_obj, adaptive=True):
+        state = _specialization_state(instruction)
+        if state is not None:
+            counts[state] += 1
+    counts['total'] = sum(counts[state] for state in ADAPTIVE_BADGES)
+    counts['rate'] = counts['specialized'] / counts['total'] if counts['total'] else 0.0
+    return counts
+
+
+def _format_specialization_summary(code_obj: types.CodeType, counts: Dict[str, Any]) -> str:
+    """Formats the one-line summary printed under an adaptive listing."""
+    return (f"Specialization of {code_obj.co_qualname}: {counts['specialized']}/{counts['total']} "
+            f"{ADAPTIVE_BADGES['specialized']} specialized ({counts['rate']:.0%}), "
+            f"{counts['deoptimized']} {ADAPTIVE_BADGES['deoptimized']} deoptimized, "
+            f"{counts['unspecialized']} {ADAPTIVE_BADGES['unspecialized']} unspecialized")
 
 
 def _format_instruction_assembler(
         instruction: dis.Instruction,
         emoji_map: Dict[str, str],
-        opname_width: int
+        opname_width: int,
+        badge: str = ''
 ) -> str:
     """
     Formats a single instruction in an assembler-like layout with an emoji.
@@ -116,15 +210,17 @@ def _format_instruction_assembler(
         emoji_map: The map of opcode names to emojis.
         opname_width: The target width for the opcode/emoji column. Actual display
                       width of emojis can vary.
+        badge: Optional marker placed right after the emoji (see ADAPTIVE_BADGES).
 
     Returns:
         A string representing the formatted instruction.
     """
-    emoji_or_opname = emoji_map.get(instruction.opname, instruction.opname)
+    emoji_or_opname = emoji_map.get(instruction.opname, instruction.opname) + badge
     if instruction.opname not in emoji_map:
         logging.warning(f"Opcode '{instruction.opname}' not found in emoji_map. Using original name.")
 
-    line_num_str = str(instruction.starts_line) if instruction.starts_line is not None else ''
+    # Since Python 3.13 `starts_line` is a bool and the number lives in `line_number`.
+    line_num_str = str(instruction.line_number) if instruction.starts_line and instruction.line_number is not None else ''
     offset_str = str(instruction.offset).rjust(4)  # dis.dis() uses 4 for offset
 
     # Pad the emoji or opname. This is tricky with variable-width emoji characters.
@@ -170,11 +266,40 @@ def _format_instruction_assembler(
     return final_line
 
 
+def _format_header(code_obj: types.CodeType) -> str:
+    """
+    Formats the "Disassembly of ..." header line for a code object.
+
+    Args:
+        code_obj: The code object being listed.
+
+    Returns:
+        The header line, without a trailing newline.
+    """
+    header_parts = []
+    if code_obj.co_name and code_obj.co_name != "<module>":  # Default name for top-level script
+        header_parts.append(f"{code_obj.co_name}")
+    else:
+        header_parts.append("<anonymous>")
+
+    if code_obj.co_filename and code_obj.co_filename != "<string>":
+        header_parts.append(f"from file {code_obj.co_filename}")
+    elif not code_obj.co_filename:  # if co_filename is None or ""
+        header_parts.append("from <unknown source>")
+    else:  # It is "<string>"
+        header_parts.append(f"from {code_obj.co_filename}")
+
+    header_parts.append(f"line {code_obj.co_firstlineno}")
+    return f"Disassembly of {', '.join(filter(None, header_parts))}:"
+
+
 def generate_emoji_disassembly(
         code_input: Union[str, types.CodeType, Callable, types.FrameType, type, types.ModuleType, Any],
         emoji_map: Dict[str, str],
-        output_format: Literal['assembler', 'stream'] = 'assembler',
-        opname_column_width: int = 20  # Default inspired by Python 3.11 dis output for opname
+        output_format: Literal['assembler', 'stream', 'compact'] = 'assembler',
+        opname_column_width: int = 20,  # Default inspired by Python 3.11 dis output for opname
+        adaptive: bool = False,
+        annotate_costs: bool = False
 ) -> str:
     """
     Disassembles Python code and replaces instruction names with emojis.
@@ -188,10 +313,21 @@ def generate_emoji_disassembly(
         output_format: The desired output format.
                        'assembler': An assembler-like listing.
                        'stream': A space-separated stream of emojis/opnames.
+                       'compact': A space-free stream in which frequent opcode sequences
+                                  are single superinstruction emojis (see disemoji.compact);
+                                  decode it with `disemoji.compact.expand_stream`.
                        Defaults to 'assembler'.
         opname_column_width: The width for the opname/emoji column in 'assembler' mode.
                              Emojis have variable display widths; this value helps guide
                              alignment but may not be perfect for all emojis/terminals.
+        adaptive: Render the quickened bytecode the specializing interpreter is
+                  running. Each specializable instruction gets a badge from
+                  ADAPTIVE_BADGES; the 'assembler' format also lists the inline
+                  cache entries and ends with a specialization summary.
+                  Specialized forms missing from `emoji_map` use their base opcode's emoji.
+        annotate_costs: In 'assembler' format, prefix every instruction with its
+                        static stack depth, a loop marker (see disemoji.costs.LOOP_MARKERS)
+                        and its estimated cost, and end with the function's cost summary.
 
     Returns:
         A string containing the emoji-fied disassembly.
@@ -200,10 +336,11 @@ def generate_emoji_disassembly(
         TypeError: If the `code_input` is of an unsupported type, a code
                    object cannot be derived, or if a module's source cannot be retrieved.
         SyntaxError: If `code_input` is a string and contains invalid Python syntax.
-        ValueError: If an invalid `output_format` is specified.
+        ValueError: If an invalid `output_format` is specified, or for 'compact'
+                    if an opcode is missing from `emoji_map`.
     """
-    if output_format not in ['assembler', 'stream']:
-        raise ValueError("Invalid output_format. Choose 'assembler' or 'stream'.")
+    if output_format not in ['assembler', 'stream', 'compact']:
+        raise ValueError("Invalid output_format. Choose 'assembler', 'stream' or 'compact'.")
 
     try:
         code_obj = _get_code_object(code_input)
@@ -211,7 +348,25 @@ def generate_emoji_disassembly(
         # Errors are logged by _get_code_object or propagate from compile()
         raise  # Re-raise the caught exception
 
-    instructions = list(_get_instructions(code_obj))  # Convert to list to check if empty
+    with metrics.timed('format'):
+        return _render_disassembly(code_input, code_obj, emoji_map, output_format, opname_column_width, adaptive,
+                                   annotate_costs)
+
+
+def _render_disassembly(
+        code_input: Any,
+        code_obj: types.CodeType,
+        emoji_map: Dict[str, str],
+        output_format: str,
+        opname_column_width: int,
+        adaptive: bool,
+        annotate_costs: bool
+) -> str:
+    """Renders the listing of `generate_emoji_disassembly` once the code object is known."""
+    instructions = list(_get_instructions(code_obj, adaptive))  # Convert to list to check if empty
+    metrics.count('instructions_rendered', len(instructions))
+    if adaptive:
+        emoji_map = _with_specialized_fallbacks(emoji_map)
     output_lines: List[str] = []
 
     if not instructions and isinstance(code_input, str) and not code_input.strip():
@@ -220,6 +375,10 @@ def generate_emoji_disassembly(
             return f"Disassembly of <anonymous> from <string>, line 1:\n(No instructions)"
         return ""  # Empty stream for empty input
 
+    if output_format == 'compact':
+        from disemoji.compact import _builtin_dictionary
+        return _builtin_dictionary().encode([instruction.opname for instruction in instructions], emoji_map)
+
     if output_format == 'stream':
         emoji_stream_parts: List[str] = []
         for instruction in instructions:
@@ -232,45 +391,60 @@ def generate_emoji_disassembly(
                 # The _format_instruction_assembler logs, so stream should too.
                 logging.warning(
                     f"Opcode '{instruction.opname}' not found in emoji_map. Using original name for stream.")
+            if adaptive:
+                emoji_or_opname += ADAPTIVE_BADGES.get(_specialization_state(instruction), '')
             emoji_stream_parts.append(emoji_or_opname)
         return " ".join(emoji_stream_parts)
 
     elif output_format == 'assembler':
-        header_parts = []
-        if code_obj.co_name and code_obj.co_name != "<module>":  # Default name for top-level script
-            header_parts.append(f"{code_obj.co_name}")
-        else:
-            header_parts.append("<anonymous>")
-
-        if code_obj.co_filename and code_obj.co_filename != "<string>":
-            header_parts.append(f"from file {code_obj.co_filename}")
-        elif not code_obj.co_filename:  # if co_filename is None or ""
-            header_parts.append("from <unknown source>")
-        else:  # It is "<string>"
-            header_parts.append(f"from {code_obj.co_filename}")
-
-        header_parts.append(f"line {code_obj.co_firstlineno}")
-        output_lines.append(f"Disassembly of {', '.join(filter(None, header_parts))}:")
+        output_lines.append(_format_header(code_obj))
+        costs: Dict[int, str] = {}
+        if annotate_costs:
+            from disemoji.costs import analyze_costs, format_cost_columns, format_cost_summary
+            analysis = analyze_costs(code_obj)
+            costs = {item.instruction.offset: format_cost_columns(item) for item in analysis.instructions}
+            output_lines.append(f"{'stk':>3} {'':<2} {'cost':>8}")
 
         # Determine max line number width for better alignment if there are line numbers
         max_line_num_width = 3  # Default
-        if any(instr.starts_line is not None for instr in instructions):
+        if any(instr.starts_line and instr.line_number is not None for instr in instructions):
             max_line_num_width = max(
-                len(str(instr.starts_line)) for instr in instructions if instr.starts_line is not None)
+                len(str(instr.line_number)) for instr in instructions
+                if instr.starts_line and instr.line_number is not None)
             max_line_num_width = max(3, max_line_num_width)  # Ensure at least 3
 
-        for instruction in instructions:
+        # Static listings are rendered once per code object, map and width.
+        rendered = None if adaptive else DISASSEMBLY_CACHE.assembler_lines(code_obj, emoji_map, opname_column_width)
+        for position, instruction in enumerate(instructions):
             # Update _format_instruction_assembler to accept max_line_num_width if dynamic width is desired.
             # For now, it uses a fixed rjust(3) or rjust(5). We'll stick to the fixed one in the helper.
-            output_lines.append(
-                _format_instruction_assembler(instruction, emoji_map, opname_column_width)
-            )
+            if rendered is not None:
+                line = rendered[position]
+            else:
+                badge = ADAPTIVE_BADGES.get(_specialization_state(instruction), '')
+                line = _format_instruction_assembler(instruction, emoji_map, opname_column_width, badge)
+            output_lines.append(f"{costs.get(instruction.offset, '')} {line}" if annotate_costs else line)
+            if adaptive:
+                output_lines.extend(_format_cache_entries(instruction, emoji_map))
+        if adaptive:
+            output_lines.append(_format_specialization_summary(code_obj, specialization_summary(code_obj)))
+        if annotate_costs:
+            output_lines.append(format_cost_summary(analysis))
         return "\n".join(output_lines)
 
     return ""  # Should be unreachable
 
 
 if __name__ == '__main__':
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+
+    # Configure basic logging for warnings
+    # Ensures warnings are visible when opcodes are missing from the map.
+    # Only done when run as a script; importing the module leaves logging alone.
+    if not logging.getLogger().hasHandlers():  # Avoid adding multiple handlers if already configured
+        logging.basicConfig(level=logging.WARNING, stream=sys.stderr,
+                            format='%(levelname)s (emoji_disassembler): %(message)s')
+
     print(f"--- Running on Python {sys.version_info.major}.{sys.version_info.minor} ---")
 
     print("\n--- Example 1: Simple function ---")
@@ -379,6 +553,24 @@ print(f"Result: {z}")
     print("\nAssembler output for lambda function:")
     print(generate_emoji_disassembly(my_lambda, DEFAULT_EMOJI_MAP, output_format='assembler'))
 
+    print("\n--- Example 9: Adaptive (specialized) bytecode after warming up ---")
+
+
+    def hot_loop(values):
+        total = 0.0
+        for value in values:
+            total = total + value * 2.0
+        return total
+
+
+    for _ in range(100):
+        hot_loop([1.0, 2.0, 3.0])
+    print(generate_emoji_disassembly(hot_loop, DEFAULT_EMOJI_MAP, output_format='assembler', adaptive=True))
+    print(specialization_summary(hot_loop))
+
+    print("\n--- Example 10: Stack depth and estimated cost ---")
+    print(generate_emoji_disassembly(complex_function_example, DEFAULT_EMOJI_MAP, annotate_costs=True))
+
     # print("\n--- Example 9: Module input (math module) ---")
     # import math
     # print("\nAssembler output for math module (top-level, may be limited):")
@@ -0,0 +1,213 @@
+"""
+Counters and per-stage timing histograms for the codec, disassembler and tracers.
+
+Metrics are off by default. While off, every hook is a check of the module
+flag `ENABLED` (and, for timed stages, entering a shared no-op context
+manager), so instrumented code pays next to nothing. Turn them on with
+`enable()` or by setting DISEMOJI_METRICS=1 in the environment:
+
+    from disemoji import metrics
+    metrics.enable()
+    python_to_emojis(source)
+    print(metrics.to_prometheus())
+
+Counters (see COUNTERS):
+
+- bytes_encoded / bytes_decoded: marshal bytes turned into emojis and back;
+- instructions_rendered: instructions in `generate_emoji_disassembly` output;
+- trace_events_handled / trace_events_ignored: tracer events acted on, and
+  events received for code that is not traced (which tracers cannot avoid
+  under sys.settrace);
+- trace_events_dropped: traced events whose work was skipped, i.e. live view
+  redraws that `LiveTracer` leaves out to stay within `refresh_hz`.
+
+`snapshot()` adds the hit, miss and eviction counters of the shared
+disassembly cache (`disemoji.cache`), which that cache always keeps.
+
+Stages (see STAGES) each have a histogram of durations in seconds, with
+the upper bounds in BUCKETS: compile (source to code object), marshal
+(dumps and loads), translate (bytes to emojis and back), format (rendering
+a disassembly) and print (writing emoji output).
+"""
+import bisect
+import contextlib
+import os
+import sys
+import threading
+import time
+from typing import Any, ContextManager, Dict, List, Optional
+
+ENABLED = os.environ.get('DISEMOJI_METRICS', '') not in ('', '0')
+
+COUNTERS = {
+    'bytes_encoded': 'Marshal bytes encoded as emojis.',
+    'bytes_decoded': 'Marshal bytes decoded from emojis.',
+    'instructions_rendered': 'Instructions rendered by generate_emoji_disassembly.',
+    'trace_events_handled': 'Tracer events for traced code.',
+    'trace_events_ignored': 'Tracer events received for code that is not traced.',
+    'trace_events_dropped': 'Live view redraws skipped to stay within the refresh rate.',
+}
+CACHE_COUNTERS = {
+    'cache_hits': 'Disassembly cache lookups that found the code object.',
+    'cache_misses': 'Disassembly cache lookups that decoded the code object.',
+    'cache_evictions': 'Disassembly cache entries evicted to stay within maxsize.',
+}
+STAGES = ('compile', 'marshal', 'translate', 'format', 'print')
+# Histogram bucket upper bounds, in seconds; durations above the last one only count towards +Inf.
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+# Stage -> observations per bucket (not cumulative), the last one for +Inf.
+_buckets: Dict[str, List[int]] = {stage: [0] * (len(BUCKETS) + 1) for stage in STAGES}
+_sums: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+_NO_TIMER: ContextManager[None] = contextlib.nullcontext()
+
+
+def enable() -> None:
+    """Starts recording."""
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    """Stops recording; what was recorded so far is kept."""
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    """Zeroes all counters and histograms, including the disassembly cache's counters."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+        for stage in STAGES:
+            _buckets[stage] = [0] * (len(BUCKETS) + 1)
+            _sums[stage] = 0.0
+    cache = sys.modules.get('disemoji.cache')
+    if cache is not None:
+        cache.DISASSEMBLY_CACHE.reset_stats()
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds `amount` to a counter (no-op while disabled)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Records one duration of a stage (no-op while disabled)."""
+    if not ENABLED:
+        return
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        _buckets[stage][index] += 1
+        _sums[stage] += seconds
+
+
+class _Timer:
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        observe(self.stage, time.perf_counter() - self.started)
+
+
+def timed(stage: str) -> ContextManager[None]:
+    """Returns a context manager that records the duration of its block under `stage`."""
+    return _Timer(stage) if ENABLED else _NO_TIMER
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Returns the current values as plain data.
+
+    {'enabled': bool,
+     'counters': {name: int, ...},  # COUNTERS plus CACHE_COUNTERS
+     'stages': {stage: {'count': int, 'sum': seconds,
+                        'buckets': {'1e-06': cumulative count, ..., '+Inf': count}}, ...}}
+    """
+    with _lock:
+        counters = dict(_counters)
+        buckets = {stage: list(values) for stage, values in _buckets.items()}
+        sums = dict(_sums)
+    cache = sys.modules.get('disemoji.cache')
+    cache_stats = cache.DISASSEMBLY_CACHE.stats() if cache is not None else {}
+    for name in CACHE_COUNTERS:
+        counters[name] = counters.get(name, 0) + cache_stats.get(name[len('cache_'):], 0)
+
+    stages: Dict[str, Any] = {}
+    for stage in STAGES:
+        cumulative: Dict[str, int] = {}
+        total = 0
+        for bound, observed in zip([*map(repr, BUCKETS), '+Inf'], buckets[stage]):
+            total += observed
+            cumulative[bound] = total
+        stages[stage] = {'count': total, 'sum': sums[stage], 'buckets': cumulative}
+    return {'enabled': ENABLED, 'counters': counters, 'stages': stages}
+
+
+def merge(other: Dict[str, Any]) -> None:
+    """Adds a snapshot taken elsewhere (e.g. in a worker process) to the values here."""
+    with _lock:
+        for name, value in other['counters'].items():
+            _counters[name] = _counters.get(name, 0) + value
+        for stage, values in other['stages'].items():
+            previous = 0
+            for index, cumulative in enumerate(values['buckets'].values()):
+                _buckets[stage][index] += cumulative - previous
+                previous = cumulative
+            _sums[stage] += values['sum']
+
+
+def to_json(data: Optional[Dict[str, Any]] = None) -> str:
+    """Renders a snapshot (default: the current one) as JSON."""
+    import json
+
+    return json.dumps(snapshot() if data is None else data, indent=2, sort_keys=True)
+
+
+def to_prometheus(data: Optional[Dict[str, Any]] = None, prefix: str = 'disemoji') -> str:
+    """Renders a snapshot (default: the current one) in the Prometheus text exposition format."""
+    data = snapshot() if data is None else data
+    lines: List[str] = []
+    descriptions = {**COUNTERS, **CACHE_COUNTERS}
+    for name, value in data['counters'].items():
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# HELP {metric} {descriptions.get(name, name)}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    metric = f"{prefix}_stage_duration_seconds"
+    lines.append(f"# HELP {metric} Time spent per processing stage.")
+    lines.append(f"# TYPE {metric} histogram")
+    for stage, values in data['stages'].items():
+        for bound, cumulative in values['buckets'].items():
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{stage="{stage}"}} {values["sum"]!r}')
+        lines.append(f'{metric}_count{{stage="{stage}"}} {values["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == '__main__':
+    # Run as a script this file is `__main__`; the instrumented modules record into `disemoji.metrics`.
+    from disemoji import metrics
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.make_dis_pretty import generate_emoji_disassembly
+    from disemoji.single_byte_map_works import emojis_to_python, python_to_emojis
+
+    metrics.enable()
+    with open(__file__, 'r', encoding='utf-8') as f:
+        source = f.read()
+    for _ in range(20):
+        emojis_to_python(python_to_emojis(source))
+        generate_emoji_disassembly(metrics.to_prometheus.__code__, DEFAULT_EMOJI_MAP)
+    print(metrics.to_prometheus())
+    print(metrics.to_json())
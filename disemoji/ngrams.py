@@ -0,0 +1,234 @@
+"""
+Opcode n-gram statistics over whole corpora.
+
+Every code object is reduced to its opcode string (one byte per
+instruction, see `disemoji.diff.opcode_sequence`). The strings are joined
+with a zero byte, which no instruction uses once CACHE entries are removed,
+so all n-grams of a corpus can be counted in one pass of C-level slicing
+and `collections.Counter` updates; n-grams that span a separator are
+dropped afterwards. That keeps counting at millions of instructions per
+second, and compilation dominates the analysis of a source tree (use
+`jobs` to compile in parallel).
+
+Static counts come from `add_code`, `add_source`, `add_file` and `add_tree`;
+dynamic counts from `trace_opcodes`, which records the opcodes a call
+actually executes:
+
+    python -m disemoji.ngrams path/to/project -n 3 --top 20
+"""
+import argparse
+import dis
+import logging
+import os
+import sys
+import types
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from disemoji.assembler import iter_code_objects
+from disemoji.diff import opcode_sequence
+from disemoji.make_dis_pretty import _get_code_object
+
+# Separates the opcode strings of different code objects; CACHE (0) never
+# appears in an opcode string.
+_SEPARATOR = b'\x00'
+
+
+def _corpus_opcodes(code_obj: types.CodeType) -> bytes:
+    """Returns the opcode strings of a code object and its nested code objects, separated."""
+    return _SEPARATOR.join(opcode_sequence(code) for code in iter_code_objects(code_obj))
+
+
+def _file_opcodes(path: str) -> bytes:
+    """Compiles a source file and returns its opcode strings; empty if it does not compile."""
+    try:
+        with open(path, 'rb') as f:
+            return _corpus_opcodes(compile(f.read(), path, 'exec', dont_inherit=True))
+    except (SyntaxError, ValueError, OSError) as e:
+        logging.warning(f"Skipping {path}: {e}")
+        return b''
+
+
+def _iter_python_files(root: str) -> Iterator[str]:
+    if os.path.isfile(root):
+        yield root
+        return
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith('.') and d != '__pycache__')
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                yield os.path.join(directory, filename)
+
+
+def format_ngram(ngram: bytes, emoji_map: Dict[str, str]) -> str:
+    """Renders an n-gram of opcodes as one emoji string."""
+    return ''.join(emoji_map.get(dis.opname[opcode], dis.opname[opcode]) for opcode in ngram)
+
+
+class NGramCounter:
+    """
+    Accumulates opcode strings and counts their n-grams.
+
+    Counts are computed on demand and cached per n until more code is added.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._counts: Dict[int, Counter] = {}
+        self.instructions = 0
+        self.code_objects = 0
+
+    def add_opcodes(self, opcodes: bytes) -> 'NGramCounter':
+        """Adds one or more separator-joined opcode strings (e.g. from `trace_opcodes`)."""
+        if opcodes:
+            self._parts.append(opcodes)
+            self.instructions += len(opcodes) - opcodes.count(_SEPARATOR)
+            self.code_objects += opcodes.count(_SEPARATOR) + 1
+            self._counts.clear()
+        return self
+
+    def add_code(self, code_input: Union[str, types.CodeType, Callable, types.FrameType, type,
+                                         types.ModuleType, Any]) -> 'NGramCounter':
+        """Adds a code input (anything `generate_emoji_disassembly` accepts) and its nested code objects."""
+        return self.add_opcodes(_corpus_opcodes(_get_code_object(code_input)))
+
+    def add_source(self, source: str, filename: str = '<string>') -> 'NGramCounter':
+        """Compiles and adds Python source."""
+        return self.add_opcodes(_corpus_opcodes(compile(source, filename, 'exec', dont_inherit=True)))
+
+    def add_file(self, path: str) -> 'NGramCounter':
+        """Compiles and adds a source file; files that do not compile are logged and skipped."""
+        return self.add_opcodes(_file_opcodes(path))
+
+    def add_tree(self, root: str, jobs: int = 1) -> 'NGramCounter':
+        """
+        Adds every .py file below `root` (hidden directories and __pycache__ excluded).
+
+        Args:
+            root: A directory or a single file.
+            jobs: Worker processes to compile with; 1 compiles in this process.
+        """
+        paths = list(_iter_python_files(root))
+        if jobs > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for opcodes in pool.map(_file_opcodes, paths, chunksize=16):
+                    self.add_opcodes(opcodes)
+        else:
+            for path in paths:
+                self.add_file(path)
+        return self
+
+    def opcodes(self) -> bytes:
+        """Returns everything added so far as one string, code objects separated by a zero byte."""
+        return _SEPARATOR.join(self._parts)
+
+    def counts(self, n: int) -> Counter:
+        """
+        Returns a Counter of n-gram (bytes of n opcodes) -> occurrences.
+
+        Raises:
+            ValueError: If n is smaller than 1.
+        """
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        counts = self._counts.get(n)
+        if counts is None:
+            buffer = self.opcodes()
+            if n == 1:
+                counts = Counter({bytes([opcode]): count for opcode, count in Counter(buffer).items()})
+            else:
+                # All slicing and counting happens in C.
+                starts = range(len(buffer) - n + 1)
+                counts = Counter(map(buffer.__getitem__, map(slice, starts, range(n, len(buffer) + 1))))
+            for ngram in [ngram for ngram in counts if _SEPARATOR in ngram]:
+                del counts[ngram]
+            self._counts[n] = counts
+        return counts
+
+    def most_common(self, n: int, top: int = 20) -> List[Tuple[bytes, int]]:
+        """Returns the `top` most frequent n-grams with their counts."""
+        return self.counts(n).most_common(top)
+
+    def format_top(self, n: int, emoji_map: Dict[str, str], top: int = 20) -> str:
+        """
+        Formats the most frequent n-grams as a table of count, share, emojis and opcode names.
+
+        Args:
+            n: The n-gram length.
+            emoji_map: A dictionary mapping opcode names to emojis.
+            top: Rows to show.
+        """
+        counts = self.counts(n)
+        total = sum(counts.values()) or 1
+        lines = [f"Top {n}-grams over {self.instructions} instructions in {self.code_objects} code objects:"]
+        for ngram, count in counts.most_common(top):
+            names = ' '.join(dis.opname[opcode] for opcode in ngram)
+            lines.append(f"{count:>10} {count / total:>7.2%}  {format_ngram(ngram, emoji_map)}  ({names})")
+        return "\n".join(lines)
+
+
+def trace_opcodes(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, bytes]:
+    """
+    Calls `func` and records every opcode it executes, including in callees.
+
+    Args:
+        func: The callable to run.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        (func's return value, executed opcodes) where each call's opcodes are
+        a separate string, ready for `NGramCounter.add_opcodes`.
+    """
+    calls: Dict[int, bytearray] = {}
+    order: List[bytearray] = []
+    co_code: Dict[types.CodeType, bytes] = {}  # co_code builds a new bytes object on every access
+
+    def tracer(frame: types.FrameType, event: str, arg: Any) -> Any:
+        if event == 'call':
+            # Assigning f_trace as well makes f_trace_opcodes take effect right away.
+            frame.f_trace_opcodes = True
+            frame.f_trace = tracer
+            executed = calls[id(frame)] = bytearray()
+            order.append(executed)
+        elif event == 'opcode':
+            code = frame.f_code
+            raw = co_code.get(code)
+            if raw is None:
+                raw = co_code[code] = code.co_code
+            calls[id(frame)].append(raw[frame.f_lasti])
+        elif event == 'return':
+            calls.pop(id(frame), None)
+        return tracer
+
+    original = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        sys.settrace(original)
+    return result, _SEPARATOR.join(bytes(executed) for executed in order if executed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m disemoji.ngrams', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='source files or directories to analyze')
+    parser.add_argument('-n', type=int, action='append', help='n-gram length, repeatable (default: 2 and 3)')
+    parser.add_argument('--top', type=int, default=20, help='n-grams to show per length (default: 20)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='compiler processes (default: all CPUs)')
+    args = parser.parse_args(argv)
+
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+
+    counter = NGramCounter()
+    for path in args.paths:
+        counter.add_tree(path, jobs=args.jobs)
+    for n in args.n or (2, 3):
+        print(counter.format_top(n, DEFAULT_EMOJI_MAP, args.top))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
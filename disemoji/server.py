@@ -0,0 +1,315 @@
+"""
+Long-running local disemoji service.
+
+Tools that call disemoji for every request otherwise pay interpreter
+startup, imports and compilation each time. `python -m disemoji.server`
+keeps all of that warm and answers small JSON-over-HTTP requests on
+localhost or on a Unix socket:
+
+    POST /disassemble  {"source": "...", "output_format": "assembler", "opname_column_width": 20}
+                       -> {"result": "<emoji disassembly>"}
+    POST /encode       {"source": "..."}  -> {"result": "<emoji stream>"}
+    POST /decode       {"emojis": "..."}  -> {"result": "<emoji disassembly>", "marshal": "<base64>"}
+    GET  /metrics      -> per endpoint request counts, cache hits, errors and latency percentiles
+
+    curl -s localhost:8765/encode -d '{"source": "print(1)"}'
+    curl -s --unix-socket /tmp/disemoji.sock http://x/metrics
+
+Compilation and disassembly run in a process pool so one large request does
+not stall the event loop. Results are cached in memory, keyed by a SHA-256
+of the endpoint and its parameters, so repeated inputs are answered without
+touching the pool.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import marshal
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 1024
+# Latency percentiles are computed over this many most recent requests per endpoint.
+LATENCY_WINDOW = 1024
+# Requests bodies larger than this are rejected with 413.
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Accepted range of /disassemble's opname_column_width; wider padding only inflates the response.
+OPNAME_COLUMN_WIDTH_RANGE = (1, 80)
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+# --- Worker functions: run in the process pool, so they must be module level. ---
+
+def _warm_worker() -> None:
+    """Pool initializer: pays the imports and emoji map build once per worker."""
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.single_byte_map_works import _byte_tables
+    _byte_tables()
+    assert DEFAULT_EMOJI_MAP
+
+
+def _disassemble(source: str, output_format: str, opname_column_width: int) -> Dict[str, Any]:
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.make_dis_pretty import generate_emoji_disassembly
+    return {'result': generate_emoji_disassembly(source, DEFAULT_EMOJI_MAP, output_format=output_format,
+                                                 opname_column_width=opname_column_width)}
+
+
+def _encode(source: str) -> Dict[str, Any]:
+    from disemoji.single_byte_map_works import python_to_emojis
+    return {'result': python_to_emojis(source)}
+
+
+def _decode(emojis: str) -> Dict[str, Any]:
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+    from disemoji.make_dis_pretty import generate_emoji_disassembly
+    from disemoji.single_byte_map_works import emojis_to_python
+    code_obj = emojis_to_python(emojis)
+    return {'result': generate_emoji_disassembly(code_obj, DEFAULT_EMOJI_MAP),
+            'marshal': base64.b64encode(marshal.dumps(code_obj)).decode('ascii')}
+
+
+def _disassemble_args(body: Dict[str, Any]) -> Tuple[Any, ...]:
+    output_format = body.get('output_format', 'assembler')
+    if output_format not in ('assembler', 'stream'):
+        raise ValueError("output_format must be 'assembler' or 'stream'")
+    width = int(body.get('opname_column_width', 20))
+    low, high = OPNAME_COLUMN_WIDTH_RANGE
+    if not low <= width <= high:
+        raise ValueError(f"opname_column_width must be between {low} and {high}")
+    return _require_str(body, 'source'), output_format, width
+
+
+def _require_str(body: Dict[str, Any], key: str) -> str:
+    value = body.get(key)
+    if not isinstance(value, str):
+        raise ValueError(f"'{key}' must be a string")
+    return value
+
+
+# Endpoint path -> (worker function, request body -> worker arguments).
+ENDPOINTS: Dict[str, Tuple[Callable[..., Dict[str, Any]], Callable[[Dict[str, Any]], Tuple[Any, ...]]]] = {
+    '/disassemble': (_disassemble, _disassemble_args),
+    '/encode': (_encode, lambda body: (_require_str(body, 'source'),)),
+    '/decode': (_decode, lambda body: (_require_str(body, 'emojis'),)),
+}
+
+
+class EndpointMetrics:
+    """Request, cache hit and error counts plus a window of recent latencies for one endpoint."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed_ms: float, cache_hit: bool, error: bool) -> None:
+        self.requests += 1
+        self.cache_hits += cache_hit
+        self.errors += error
+        self.latencies_ms.append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies_ms)
+
+        def percentile(fraction: float) -> float:
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+        return {
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'errors': self.errors,
+            'latency_ms': {'p50': percentile(0.50), 'p90': percentile(0.90), 'p99': percentile(0.99),
+                           'max': ordered[-1] if ordered else 0.0},
+        }
+
+
+class DisemojiServer:
+    """
+    Serves the ENDPOINTS over HTTP/1.1 with keep-alive.
+
+    Args:
+        workers: Size of the process pool (None: one per CPU).
+        cache_size: Maximum number of cached responses (0 disables the cache).
+    """
+
+    def __init__(self, workers: Optional[int] = None, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._workers = workers
+        self.metrics: Dict[str, EndpointMetrics] = {path: EndpointMetrics() for path in ENDPOINTS}
+
+    def __enter__(self) -> 'DisemojiServer':
+        self._pool = self._new_pool()
+        return self
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self._workers, initializer=_warm_worker)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def cache_key(path: str, args: Tuple[Any, ...]) -> str:
+        """Returns the cache key for an endpoint call: a SHA-256 of the path and its arguments."""
+        return hashlib.sha256(json.dumps([path, *args], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        payload = self._cache.get(key)
+        if payload is not None:
+            self._cache.move_to_end(key)
+        return payload
+
+    def _cache_put(self, key: str, payload: bytes) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = payload
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Returns the /metrics document."""
+        return {'cache': {'entries': len(self._cache), 'capacity': self.cache_size},
+                'endpoints': {path: metrics.snapshot() for path, metrics in self.metrics.items()}}
+
+    async def _call(self, path: str, body: bytes) -> Tuple[int, bytes, bool]:
+        """Runs one endpoint call and returns (status, JSON response body, served from cache)."""
+        worker, parse_args = ENDPOINTS[path]
+        try:
+            args = parse_args(json.loads(body or b'{}'))
+        except (ValueError, TypeError, AttributeError) as e:  # JSONDecodeError is a ValueError
+            return 400, _json({'error': f"Bad request: {e}"}), False
+
+        key = self.cache_key(path, args)
+        payload = self._cache_get(key)
+        if payload is not None:
+            return 200, payload, True
+        pool = self._pool
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(pool, worker, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. a payload crashed the interpreter). Replace the pool so later requests
+            # work again; this one is not retried, as it may well be what killed the worker.
+            if self._pool is pool:
+                logging.error(f"Worker process died serving {path}; restarting the pool")
+                self._pool = self._new_pool()
+                pool.shutdown(wait=False)
+            return 503, _json({'error': 'Worker process died; retry later'}), False
+        except (SyntaxError, ValueError, TypeError, KeyError, EOFError) as e:
+            # Invalid source or emoji stream: the client's fault, and worth caching.
+            status, payload = 400, _json({'error': f"{type(e).__name__}: {e}"})
+        else:
+            status, payload = 200, _json(result)
+        self._cache_put(key, payload)
+        return status, payload, False
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split(' ', 2)
+                headers: Dict[str, str] = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await _respond(writer, 413, _json({'error': 'Request body too large'}), keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                start = time.perf_counter()
+                path = path.split('?', 1)[0]
+                status, payload, cache_hit = await self._route(method, path, body)
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and not version.strip().upper().endswith('1.0'))
+                await _respond(writer, status, payload, keep_alive)
+                if path in self.metrics:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    self.metrics[path].record(elapsed_ms, cache_hit, error=status != 200)
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError) as e:
+            logging.debug(f"Dropping connection: {e}")
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, bytes, bool]:
+        if path == '/metrics':
+            return 200, _json(self.metrics_snapshot()), False
+        if path not in ENDPOINTS:
+            return 404, _json({'error': f"Unknown endpoint {path}",
+                               'endpoints': sorted(ENDPOINTS) + ['/metrics']}), False
+        if method != 'POST':
+            return 405, _json({'error': f"{path} only accepts POST"}), False
+        try:
+            return await self._call(path, body)
+        except Exception as e:  # A bug must not take the server down
+            logging.exception(f"Error serving {path}")
+            return 500, _json({'error': f"{type(e).__name__}: {e}"}), False
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None) -> None:
+        """Serves until cancelled, on `unix_path` if given, otherwise on host:port."""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            logging.info(f"disemoji server listening on unix:{unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logging.info(f"disemoji server listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def _json(document: Dict[str, Any]) -> bytes:
+    return json.dumps(document, ensure_ascii=False).encode('utf-8')
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, payload: bytes, keep_alive: bool) -> None:
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + payload)
+    await writer.drain()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m disemoji.server', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'address to bind (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port to bind (default: {DEFAULT_PORT})')
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f'cached responses to keep, 0 to disable (default: {DEFAULT_CACHE_SIZE})')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s (disemoji.server): %(message)s')
+    with DisemojiServer(workers=args.workers, cache_size=args.cache_size) as server:
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+
+    sys.exit(main())
@@ -1,12 +1,28 @@
-import dis
+import functools
 import marshal
+import struct
 import sys
 import types
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-# Mapping of byte values to emoji and back
-byte_to_emoji = {i: chr(0x1F600 + i) for i in range(256)}
-emoji_to_byte = {v: k for k, v in byte_to_emoji.items()}
+from disemoji import metrics
+
+
+@functools.lru_cache(maxsize=None)
+def _byte_tables() -> Tuple[Dict[int, str], Dict[str, int]]:
+    """Mapping of byte values to emoji and back, built on first use."""
+    byte_to_emoji = {i: chr(0x1F600 + i) for i in range(256)}
+    emoji_to_byte = {v: k for k, v in byte_to_emoji.items()}
+    return byte_to_emoji, emoji_to_byte
+
+
+def __getattr__(name: str) -> Any:
+    # byte_to_emoji / emoji_to_byte used to be module constants (PEP 562).
+    if name == 'byte_to_emoji':
+        return _byte_tables()[0]
+    if name == 'emoji_to_byte':
+        return _byte_tables()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def python_to_bytes(source: str) -> bytes:
@@ -14,8 +30,24 @@ def python_to_bytes(source: str) -> bytes:
     return compiled.co_code
 
 
-def bytes_to_python(bytecode: bytes) -> types.CodeType:
+def bytes_to_python(bytecode: bytes, **replacements: Any) -> types.CodeType:
+    """
+    Wraps raw bytecode in a code object built from an empty module template.
+
+    Args:
+        bytecode: The raw co_code bytes.
+        **replacements: Optional code object fields (as accepted by
+            `types.CodeType.replace`, e.g. co_consts or co_names) applied on
+            top of the template.
+
+    Returns:
+        The new code object.
+    """
     dummy = compile('', '<string>', 'exec')
+    if replacements:
+        # Apply the caller's fields to the template first so that the bytecode
+        # is validated against the final consts/names/locals tables.
+        dummy = dummy.replace(**replacements)
 
     if sys.version_info >= (3, 11):
         code_obj = types.CodeType(
@@ -81,21 +113,320 @@ def bytes_to_python(bytecode: bytes) -> types.CodeType:
 
 
 
-def python_to_emojis(source: str) -> str:
-    compiled = compile(source, filename="<string>", mode="exec")
-    marshaled = marshal.dumps(compiled)  # FULL object, not just bytecode
-    emojis = ''.join(byte_to_emoji[b] for b in marshaled)
+# Marshal type codes (Python/marshal.c).
+_FLAG_REF = 0x80
+_TYPE_REF = ord('r')
+_NO_PAYLOAD = frozenset(b'0NFTS.')
+_FIXED_PAYLOAD = {ord('i'): 4, ord('I'): 8, ord('g'): 8, ord('y'): 16}
+_SIZED_STRINGS = frozenset(b'stuaA')  # 4-byte length, then the data
+_SHORT_STRINGS = frozenset(b'zZ')  # 1-byte length, then the data
+# Interned and non-interned forms of a string load the same; canonical output uses the interned one.
+_INTERNED_FORM = {ord('u'): ord('t'), ord('a'): ord('A'), ord('z'): ord('Z')}
+_SEQUENCES = frozenset(b'([<>')  # 4-byte count, then the items
+_SETS = frozenset(b'<>')
+_LONG = struct.Struct('<i')
+
+
+class _Node:
+    """One object of a marshal stream: type code, whether it was a ref target, and its payload."""
+    __slots__ = ('type', 'parts', 'ref_target', 'needs_ref', 'new_index', 'key')
+
+    def __init__(self, type_code: int) -> None:
+        self.type = type_code
+        # Raw bytes and child nodes, in stream order.
+        self.parts: List[Union[bytes, '_Node']] = []
+        # For TYPE_REF nodes: the node referred to.
+        self.ref_target: Optional['_Node'] = None
+        self.needs_ref = False
+        self.new_index = -1
+        # (type, payload) for scalars (numbers, strings, bytes), used to share equal ones.
+        self.key: Optional[Tuple[int, bytes]] = None
+
+
+def _sort_key(node: _Node) -> bytes:
+    """A context-free encoding of a node (references expanded), to order set items."""
+    while node.type == _TYPE_REF:
+        node = node.ref_target
+    return bytes([node.type]) + b''.join(part if isinstance(part, bytes) else _sort_key(part) for part in node.parts)
+
+
+class _MarshalReader:
+    """Parses a marshal stream into _Nodes (the subset marshal.dumps writes for code objects)."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.position = 0
+        self.refs: List[_Node] = []
+
+    def _take(self, size: int) -> bytes:
+        chunk = self.data[self.position:self.position + size]
+        if len(chunk) != size:
+            raise ValueError("Truncated marshal data")
+        self.position += size
+        return chunk
+
+    def _long(self, node: _Node) -> int:
+        raw = self._take(4)
+        node.parts.append(raw)
+        return _LONG.unpack(raw)[0]
+
+    def read(self) -> _Node:
+        code = self._take(1)[0]
+        node = _Node(code & ~_FLAG_REF)
+        if code & _FLAG_REF:
+            self.refs.append(node)  # Indices follow the type bytes, in stream order
+        kind = node.type
+        if kind in _NO_PAYLOAD:
+            pass
+        elif kind in _FIXED_PAYLOAD:
+            node.key = (kind, self._take(_FIXED_PAYLOAD[kind]))
+            node.parts.append(node.key[1])
+        elif kind == _TYPE_REF:
+            target = self.refs[_LONG.unpack(self._take(4))[0]]
+            if target.key is not None:
+                # A reference to a scalar is read as a copy; _write_canonical decides which one is written.
+                node.type, node.key, node.parts = target.type, target.key, target.parts
+            else:
+                node.ref_target = target
+                target.needs_ref = True
+        elif kind in _SIZED_STRINGS or kind in _SHORT_STRINGS:
+            size = self._take(1) if kind in _SHORT_STRINGS else self._take(4)
+            node.type = _INTERNED_FORM.get(kind, kind)
+            node.key = (node.type, self._take(size[0] if kind in _SHORT_STRINGS else _LONG.unpack(size)[0]))
+            node.parts.extend((size, node.key[1]))
+        elif kind == ord('l'):
+            digits = self._long(node)
+            node.parts.append(self._take(2 * abs(digits)))
+            node.key = (kind, node.parts[0] + node.parts[1])
+        elif kind in (ord('f'), ord('x')):  # Marshal version 0 floats and complex numbers
+            for _ in range(1 if kind == ord('f') else 2):
+                size = self._take(1)
+                node.parts.extend((size, self._take(size[0])))
+        elif kind in _SEQUENCES or kind == ord(')'):
+            if kind == ord(')'):
+                size = self._take(1)
+                node.parts.append(size)
+                count = size[0]
+            else:
+                count = self._long(node)
+            node.parts.extend(self.read() for _ in range(count))
+            if kind in _SETS:
+                # Set order follows string hashes, which change with PYTHONHASHSEED.
+                node.parts[1:] = sorted(node.parts[1:], key=_sort_key)
+        elif kind == ord('{'):
+            while True:
+                key = self.read()
+                node.parts.append(key)
+                if key.type == ord('0'):
+                    break
+                node.parts.append(self.read())
+        elif kind == ord(':'):  # Slice constants (Python 3.14+)
+            node.parts.extend(self.read() for _ in range(3))
+        elif kind == ord('c'):
+            self._read_code(node)
+        else:
+            raise ValueError(f"Unsupported marshal type {chr(kind)!r} at offset {self.position - 1}")
+        return node
+
+    def _read_code(self, node: _Node) -> None:
+        # argcount, posonlyargcount, kwonlyargcount, [nlocals,] stacksize, flags
+        node.parts.append(self._take(4 * (5 if sys.version_info >= (3, 11) else 6)))
+        if sys.version_info >= (3, 11):
+            # code, consts, names, localsplusnames, localspluskinds, filename, name, qualname
+            node.parts.extend(self.read() for _ in range(8))
+            node.parts.append(self._take(4))  # firstlineno
+            node.parts.extend(self.read() for _ in range(2))  # linetable, exceptiontable
+        else:
+            # code, consts, names, varnames, freevars, cellvars, filename, name
+            node.parts.extend(self.read() for _ in range(8))
+            node.parts.append(self._take(4))  # firstlineno
+            node.parts.append(self.read())  # lnotab / linetable
+
+
+def _write_canonical(root: _Node) -> bytes:
+    """Writes a parsed stream back with refs only where used, numbered in order, and equal scalars shared."""
+    # Pass 1: share equal scalars, and decide which nodes are ref targets.
+    first_string: Dict[Tuple[int, bytes], _Node] = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.key is not None:
+            first = first_string.setdefault(node.key, node)
+            if first is not node:
+                first.needs_ref = True
+                node.type, node.ref_target, node.parts = _TYPE_REF, first, []
+        stack.extend(reversed([part for part in node.parts if isinstance(part, _Node)]))
+
+    # Pass 2: write, numbering ref targets in stream order.
+    out = bytearray()
+    next_index = 0
 
-    # Round-trip verification
-    round_trip = bytes(emoji_to_byte[c] for c in emojis)
+    def write(node: _Node) -> None:
+        nonlocal next_index
+        if node.type == _TYPE_REF:
+            target = node.ref_target
+            if target.new_index < 0:
+                # Sorting a set moved the target after this reference: write an equal copy instead.
+                write(target)
+                return
+            out.append(_TYPE_REF)
+            out.extend(_LONG.pack(target.new_index))
+            return
+        if node.needs_ref:
+            node.new_index = next_index
+            next_index += 1
+            out.append(node.type | _FLAG_REF)
+        else:
+            out.append(node.type)
+        for part in node.parts:
+            if isinstance(part, _Node):
+                write(part)
+            else:
+                out.extend(part)
+
+    write(root)
+    return bytes(out)
+
+
+def _strip_firstlineno(code_obj: types.CodeType) -> types.CodeType:
+    """
+    Sets the `__firstlineno__` a class body stores (Python 3.13+) to 1.
+
+    The compiler shares the line number constant with equal constants of
+    the class body (`x = 3` in a class on line 3), so where it sat in
+    co_consts depends on the line. The store is pointed at a constant 1 and
+    the constants are renumbered in order of first use, which leaves the
+    same layout wherever the class is. Opargs are rewritten only where they
+    all fit in one byte, so the code size does not change.
+    """
+    import dis
+
+    instructions = list(dis.get_instructions(code_obj))
+    store = next((index for index, instruction in enumerate(instructions)
+                  if instruction.opname == 'STORE_NAME' and instruction.argval == '__firstlineno__'), None)
+    if store is None or store == 0:
+        return code_obj
+    load = instructions[store - 1]
+    co_code = bytearray(code_obj.co_code)
+    if load.opname == 'LOAD_SMALL_INT':  # 3.14+: the oparg is the value
+        co_code[load.offset + 1] = 1
+        return code_obj.replace(co_code=bytes(co_code))
+    loads = [instruction for instruction in instructions if instruction.opcode in dis.hasconst]
+    if load.opname != 'LOAD_CONST' or any(instruction.arg > 0xff for instruction in loads):
+        return code_obj
+
+    old_consts = list(code_obj.co_consts)
+    one = next((index for index, const in enumerate(old_consts) if type(const) is int and const == 1), None)
+    if one is None:
+        one = len(old_consts)
+        old_consts.append(1)
+    consts: List[Any] = []
+    renumbered: Dict[int, int] = {}
+    for instruction in loads:
+        index = one if instruction is load else instruction.arg
+        if index not in renumbered:
+            renumbered[index] = len(consts)
+            consts.append(old_consts[index])
+        co_code[instruction.offset + 1] = renumbered[index] & 0xff
+    if len(consts) > 0x100:
+        return code_obj
+    loaded = {instruction.arg for instruction in loads}
+    consts.extend(const for index, const in enumerate(code_obj.co_consts) if index not in loaded)
+    return code_obj.replace(co_code=bytes(co_code), co_consts=tuple(consts))
+
+
+def _normalize_code(code_obj: types.CodeType, filename: Optional[str], strip_locations: bool) -> types.CodeType:
+    """Applies the filename / location options to a code object and all code objects nested in it."""
+    consts = tuple(
+        _normalize_code(const, filename, strip_locations) if isinstance(const, types.CodeType) else const
+        for const in code_obj.co_consts
+    )
+    changes: Dict[str, Any] = {'co_consts': consts}
+    if filename is not None:
+        changes['co_filename'] = filename
+    if strip_locations:
+        changes['co_firstlineno'] = 1
+        changes['co_linetable' if sys.version_info >= (3, 10) else 'co_lnotab'] = b''
+    code_obj = code_obj.replace(**changes)
+    return _strip_firstlineno(code_obj) if strip_locations else code_obj
+
+
+def canonical_marshal(code_obj: types.CodeType, filename: Optional[str] = None, strip_locations: bool = False) -> bytes:
+    """
+    Marshals a code object deterministically.
+
+    `marshal.dumps` flags an object as a reference target whenever its
+    reference count is above one and writes strings in their interned form
+    only if they happen to be interned, so equal code can marshal to
+    different bytes. Here the marshal output is rewritten so that it
+    depends on the code alone:
+
+    - FLAG_REF is kept only on objects that a reference actually points
+      to, and references are renumbered accordingly;
+    - every string uses its interned type code, and equal scalars
+      (strings, bytes, numbers) are written once and referenced after that;
+    - frozenset constants are written in a fixed order.
+
+    `marshal.loads` returns an equal code object.
+
+    Args:
+        code_obj: The code object.
+        filename: Replaces co_filename of the code object and all nested ones.
+        strip_locations: Drops line and column information (co_linetable) and
+                         sets co_firstlineno to 1, so the output no longer depends
+                         on where the code sits in its file, including the
+                         __firstlineno__ that class bodies store (Python 3.13+).
+
+    Returns:
+        The canonical marshal bytes.
+    """
+    if filename is not None or strip_locations:
+        code_obj = _normalize_code(code_obj, filename, strip_locations)
+    reader = _MarshalReader(marshal.dumps(code_obj))
+    return _write_canonical(reader.read())
+
+
+def python_to_emojis(source: str, canonical: bool = False, filename: Optional[str] = None,
+                     strip_locations: bool = False) -> str:
+    """
+    Compiles Python source and encodes the code object as emojis.
+
+    Args:
+        source: The Python source.
+        canonical: Encode `canonical_marshal` output, which is byte-identical for identical code.
+        filename: With `canonical`, the co_filename to record (default '<string>').
+        strip_locations: With `canonical`, drop line and column information.
+    """
+    with metrics.timed('compile'):
+        compiled = compile(source, filename="<string>", mode="exec")
+    return code_to_emojis(compiled, canonical, filename, strip_locations)
+
+def code_to_emojis(code_obj: types.CodeType, canonical: bool = False, filename: Optional[str] = None,
+                   strip_locations: bool = False) -> str:
+    """Encodes a code object as emojis; see `python_to_emojis` for the canonical options."""
+    with metrics.timed('marshal'):
+        if canonical:
+            marshaled = canonical_marshal(code_obj, filename, strip_locations)
+        else:
+            marshaled = marshal.dumps(code_obj)  # FULL object, not just bytecode
+    byte_to_emoji, emoji_to_byte = _byte_tables()
+    with metrics.timed('translate'):
+        emojis = ''.join(byte_to_emoji[b] for b in marshaled)
+
+        # Round-trip verification
+        round_trip = bytes(emoji_to_byte[c] for c in emojis)
     if round_trip != marshaled:
         raise ValueError("Emoji round-trip verification failed!")
-
+    metrics.count('bytes_encoded', len(marshaled))
     return emojis
 
 def emojis_to_python(emojis: str) -> types.CodeType:
-    marshaled = bytes(emoji_to_byte[c] for c in emojis)
-    code_obj = marshal.loads(marshaled)
+    emoji_to_byte = _byte_tables()[1]
+    with metrics.timed('translate'):
+        marshaled = bytes(emoji_to_byte[c] for c in emojis)
+    with metrics.timed('marshal'):
+        code_obj = marshal.loads(marshaled)
+    metrics.count('bytes_decoded', len(marshaled))
     return code_obj
 
 
@@ -0,0 +1,226 @@
+"""
+Emoji stack dumps of a live process.
+
+`dump_stacks()` walks every thread's stack (`sys._current_frames()`) and the
+suspended asyncio tasks, and shows a small emoji disassembly window around
+each frame's current instruction (`f_lasti`), marked with CURRENT_MARKER.
+`write_dump()` writes the same text atomically, and `install_signal_handler()`
+makes a stuck worker dump itself on `kill -USR1 <pid>`:
+
+    from disemoji.stackdump import install_signal_handler
+    install_signal_handler('/tmp/disemoji-stacks-{pid}.txt')
+
+Dumps are meant to be taken repeatedly, so only the window lines are
+formatted and each code object's instructions come from the shared
+DISASSEMBLY_CACHE (see disemoji.cache).
+"""
+import asyncio
+import bisect
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import types
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from disemoji.cache import DISASSEMBLY_CACHE
+from disemoji.make_dis_pretty import _format_instruction_assembler
+
+# Marks the instruction a frame is executing (or suspended at).
+CURRENT_MARKER = '👉'
+DEFAULT_WINDOW = 3
+DEFAULT_SIGNAL = getattr(signal, 'SIGUSR1', None)
+
+
+def format_frame(frame: types.FrameType, emoji_map: Dict[str, str], window: int = DEFAULT_WINDOW) -> List[str]:
+    """
+    Formats one frame: its location and the instructions around `f_lasti`.
+
+    Args:
+        frame: The frame to show.
+        emoji_map: A dictionary mapping opcode names to emojis.
+        window: Instructions shown before and after the current one.
+
+    Returns:
+        The lines of the frame's section.
+    """
+    code_obj = frame.f_code
+    qualname = getattr(code_obj, 'co_qualname', code_obj.co_name)
+    lines = [f'  File "{code_obj.co_filename}", line {frame.f_lineno}, in {qualname}']
+    instructions = DISASSEMBLY_CACHE.instructions(code_obj)
+    if not instructions:
+        return lines
+    # f_lasti is -1 (or 0) for frames that have not started yet.
+    current = max(0, bisect.bisect_right(instructions, frame.f_lasti, key=lambda instruction: instruction.offset) - 1)
+    for index in range(max(0, current - window), min(len(instructions), current + window + 1)):
+        marker = CURRENT_MARKER if index == current else '  '
+        lines.append(f"    {marker}{_format_instruction_assembler(instructions[index], emoji_map, 20)}")
+    return lines
+
+
+def _format_stack(innermost: Optional[types.FrameType], emoji_map: Dict[str, str], window: int) -> List[str]:
+    """Formats a frame chain outermost first, like a traceback."""
+    frames = []
+    while innermost is not None:
+        frames.append(innermost)
+        innermost = innermost.f_back
+    lines: List[str] = []
+    for frame in reversed(frames):
+        lines.extend(format_frame(frame, emoji_map, window))
+    return lines
+
+
+# Functions of this module that may sit on top of the dumping thread's stack.
+_OWN_FUNCTIONS = frozenset({'dump_stacks', 'write_dump', 'handler'})
+
+
+def _skip_own_frames(frame: Optional[types.FrameType]) -> Optional[types.FrameType]:
+    """Drops the dumper's own frames from the top of the calling thread's stack."""
+    while (frame is not None and frame.f_code.co_filename == __file__
+           and frame.f_code.co_name in _OWN_FUNCTIONS):
+        frame = frame.f_back
+    return frame
+
+
+def _iter_tasks(loops: Iterable[asyncio.AbstractEventLoop]) -> Iterator[asyncio.Task]:
+    seen = set()
+    for loop in loops:
+        for task in asyncio.all_tasks(loop):
+            if id(task) not in seen:
+                seen.add(id(task))
+                yield task
+
+
+def dump_stacks(
+        emoji_map: Optional[Dict[str, str]] = None,
+        window: int = DEFAULT_WINDOW,
+        loops: Iterable[asyncio.AbstractEventLoop] = ()
+) -> str:
+    """
+    Formats the stacks of all threads and asyncio tasks as emoji disassembly windows.
+
+    Args:
+        emoji_map: A dictionary mapping opcode names to emojis (default: DEFAULT_EMOJI_MAP).
+        window: Instructions shown before and after each frame's current one.
+        loops: Event loops whose tasks are dumped. The loop running in the
+               calling thread, if any, is always included.
+
+    Returns:
+        The dump. Threads come first, innermost frame last; then one section
+        per pending task, showing the coroutine frames it is suspended in.
+    """
+    if emoji_map is None:
+        from disemoji.codes import DEFAULT_EMOJI_MAP
+        emoji_map = DEFAULT_EMOJI_MAP
+
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = [f"Emoji stack dump of process {os.getpid()} at {time.strftime('%Y-%m-%d %H:%M:%S')}"]
+    current_ident = threading.get_ident()
+    for ident, frame in sys._current_frames().items():
+        if ident == current_ident:
+            frame = _skip_own_frames(frame)
+        lines.append("")
+        lines.append(f"Thread {thread_names.get(ident, '<unknown>')} (id {ident}):")
+        lines.extend(_format_stack(frame, emoji_map, window))
+
+    loops = list(loops)
+    running_loop = asyncio._get_running_loop()
+    if running_loop is not None and running_loop not in loops:
+        loops.append(running_loop)
+    running_tasks = {id(asyncio.current_task(loop)) for loop in loops}
+    for task in _iter_tasks(loops):
+        lines.append("")
+        if id(task) in running_tasks:
+            # Its frames are on its loop's thread stack above.
+            lines.append(f"Task {task.get_name()} (running, see its thread above)")
+            continue
+        lines.append(f"Task {task.get_name()} ({'done' if task.done() else 'pending'}):")
+        # get_stack() returns the suspended coroutine frames outermost first.
+        for frame in task.get_stack():
+            lines.extend(format_frame(frame, emoji_map, window))
+    return "\n".join(lines) + "\n"
+
+
+def write_dump(path: str, **dump_options: Any) -> str:
+    """
+    Writes `dump_stacks(**dump_options)` to a file atomically.
+
+    The dump is written to a temporary file next to `path` and renamed over
+    it, so readers never see a partial dump.
+
+    Args:
+        path: The destination; `{pid}` is replaced by the process id.
+        **dump_options: Passed to `dump_stacks`.
+
+    Returns:
+        The path written to.
+    """
+    path = path.format(pid=os.getpid())
+    text = dump_stacks(**dump_options)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def install_signal_handler(path: str, signum: Optional[int] = DEFAULT_SIGNAL, **dump_options: Any) -> Any:
+    """
+    Dumps all stacks to `path` whenever the process receives `signum`.
+
+    Must be called from the main thread. The handler runs in the main thread
+    between bytecodes, so it also sees the asyncio loop running there.
+
+    Args:
+        path: The destination, as for `write_dump`.
+        signum: The signal to handle (default: SIGUSR1).
+        **dump_options: Passed to `dump_stacks`.
+
+    Returns:
+        The previous handler, for `signal.signal(signum, previous)`.
+
+    Raises:
+        ValueError: If the platform has no such signal (e.g. SIGUSR1 on Windows).
+    """
+    if signum is None:
+        raise ValueError("No signal given and SIGUSR1 is not available on this platform")
+
+    def handler(received_signum: int, frame: Optional[types.FrameType]) -> None:
+        try:
+            written = write_dump(path, **dump_options)
+            logging.info(f"Emoji stack dump written to {written}")
+        except OSError as e:
+            logging.error(f"Could not write emoji stack dump to {path}: {e}")
+
+    return signal.signal(signum, handler)
+
+
+if __name__ == '__main__':
+    def spin(event: threading.Event) -> int:
+        total = 0
+        while not event.is_set():
+            total += 1
+        return total
+
+    async def sleeper() -> None:
+        await asyncio.sleep(60)
+
+    async def main() -> None:
+        stop = threading.Event()
+        worker = threading.Thread(target=spin, args=(stop,), name='spinner')
+        worker.start()
+        task = asyncio.create_task(sleeper(), name='sleeper')
+        await asyncio.sleep(0.1)
+        print(dump_stacks())
+        stop.set()
+        task.cancel()
+        worker.join()
+
+    asyncio.run(main())
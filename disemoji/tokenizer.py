@@ -0,0 +1,180 @@
+"""
+Splits emoji streams back into opcode names.
+
+Emoji tokens have different lengths and many of them share prefixes
+('➕' and '➕✨', '💨📦' and '💨📦🧹'), so a stream can be neither split on
+whitespace nor matched greedily. `EmojiTokenizer` stores the map in a trie and
+decodes with longest-match, guided by a backwards pass that records which
+positions can still be completed. Both passes look at most one token length
+ahead of each position, so decoding is linear in the stream length.
+
+Building a tokenizer checks the map first: every token must be non-empty,
+unique and the code as a whole uniquely decodable (Sardinas-Patterson), so the
+longest-match split is also the only possible one.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Key under which a trie node stores the opcode name of the token ending there.
+_TERMINAL = ''
+
+
+def _normalize(emoji: str) -> str:
+    """Removes whitespace; streams are written without separators."""
+    return ''.join(emoji.split())
+
+
+def find_collisions(emoji_map: Dict[str, str]) -> List[str]:
+    """
+    Lists every reason why an emoji map cannot be decoded unambiguously.
+
+    Args:
+        emoji_map: A dictionary mapping opcode names to emojis.
+
+    Returns:
+        Human readable problem descriptions, empty if the map is usable.
+    """
+    problems: List[str] = []
+    owners: Dict[str, str] = {}
+    for opname, emoji in emoji_map.items():
+        token = _normalize(emoji)
+        if not token:
+            problems.append(f"{opname} has an empty emoji")
+        elif token in owners:
+            problems.append(f"{opname} and {owners[token]} share the emoji {token!r}")
+        else:
+            owners[token] = opname
+    if problems:
+        return problems
+
+    # Sardinas-Patterson: follow dangling suffixes until one is itself a token.
+    tokens: Set[str] = set(owners)
+    by_first_char: Dict[str, List[str]] = {}
+    for token in tokens:
+        by_first_char.setdefault(token[0], []).append(token)
+
+    def dangling(suffix: str) -> Iterable[str]:
+        for token in by_first_char.get(suffix[0], ()):
+            if token != suffix and token.startswith(suffix):
+                yield token[len(suffix):]
+            elif token != suffix and suffix.startswith(token):
+                yield suffix[len(token):]
+
+    frontier: List[Tuple[str, str]] = []
+    for token in tokens:
+        for end in range(1, len(token)):
+            if token[:end] in tokens:
+                frontier.append((token[end:], f"{owners[token[:end]]} + ... vs {owners[token]}"))
+    seen: Set[str] = set()
+    while frontier:
+        suffix, origin = frontier.pop()
+        if suffix in tokens:
+            problems.append(f"Ambiguous stream: {origin} (dangling {suffix!r} is {owners[suffix]})")
+            continue
+        if suffix in seen:
+            continue
+        seen.add(suffix)
+        frontier.extend((next_suffix, origin) for next_suffix in dangling(suffix))
+    return problems
+
+
+def check_emoji_map(emoji_map: Dict[str, str]) -> None:
+    """
+    Validates that an emoji map can be decoded unambiguously.
+
+    Args:
+        emoji_map: A dictionary mapping opcode names to emojis.
+
+    Raises:
+        ValueError: If any emoji is empty, duplicated, or the stream is ambiguous.
+    """
+    problems = find_collisions(emoji_map)
+    if problems:
+        raise ValueError("Emoji map cannot be tokenized:\n  " + "\n  ".join(problems))
+
+
+class EmojiTokenizer:
+    """
+    Decodes space-free emoji streams with a longest-match trie.
+
+    Args:
+        emoji_map: A dictionary mapping opcode names to emojis.
+        check: Validate the map with `check_emoji_map` while building.
+    """
+
+    def __init__(self, emoji_map: Dict[str, str], check: bool = True) -> None:
+        if check:
+            check_emoji_map(emoji_map)
+        self._trie: Dict[str, dict] = {}
+        self._longest = 0
+        for opname, emoji in emoji_map.items():
+            token = _normalize(emoji)
+            if not token:
+                continue
+            node = self._trie
+            for char in token:
+                node = node.setdefault(char, {})
+            node[_TERMINAL] = opname
+            self._longest = max(self._longest, len(token))
+
+    def _matches(self, stream: str, start: int) -> Iterable[Tuple[int, str]]:
+        """Yields (end, opname) for every token starting at `start`, shortest first."""
+        node = self._trie
+        for end in range(start, len(stream)):
+            node = node.get(stream[end])
+            if node is None:
+                return
+            opname = node.get(_TERMINAL)
+            if opname is not None:
+                yield end + 1, opname
+
+    def tokenize(self, stream: str) -> List[str]:
+        """
+        Splits an emoji stream into opcode names.
+
+        Whitespace in the stream is ignored, so both space-separated and
+        space-free streams are accepted.
+
+        Args:
+            stream: The emoji stream.
+
+        Returns:
+            The opcode names, in stream order.
+
+        Raises:
+            ValueError: If the stream cannot be split into known emojis.
+        """
+        stream = _normalize(stream)
+        length = len(stream)
+        # completes[i] is True when stream[i:] can be split into tokens.
+        completes = bytearray(length + 1)
+        completes[length] = 1
+        for start in range(length - 1, -1, -1):
+            for end, _ in self._matches(stream, start):
+                if completes[end]:
+                    completes[start] = 1
+                    break
+
+        opnames: List[str] = []
+        position = 0
+        while position < length:
+            best: Optional[Tuple[int, str]] = None
+            for end, opname in self._matches(stream, position):
+                if completes[end]:
+                    best = (end, opname)
+            if best is None:
+                raise ValueError(f"Unknown emoji sequence at position {position}: "
+                                 f"{stream[position:position + self._longest]!r}")
+            position, opname = best
+            opnames.append(opname)
+        return opnames
+
+
+if __name__ == '__main__':
+    from disemoji.codes import DEFAULT_EMOJI_MAP
+
+    for problem in find_collisions(DEFAULT_EMOJI_MAP):
+        print(problem)
+
+    tokenizer = EmojiTokenizer(DEFAULT_EMOJI_MAP)
+    stream = ''.join(DEFAULT_EMOJI_MAP[op] for op in ('RESUME', 'LOAD_FAST', 'LOAD_FAST_AND_CLEAR', 'RETURN_VALUE'))
+    print(stream, '->', tokenizer.tokenize(stream))
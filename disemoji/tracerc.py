@@ -1,10 +1,16 @@
-from typing import Optional, Set, Callable, Any, Dict, List
+from typing import Optional, Set, Callable, Any, Dict, List, TextIO, Tuple
 import sys
 import dis
 import inspect
+import threading
+import time
+import tracemalloc
+import types
 from contextlib import contextmanager
 from dataclasses import dataclass, field
 
+from disemoji import metrics
+from disemoji.cache import DISASSEMBLY_CACHE
 from disemoji.codes import DEFAULT_EMOJI_MAP
 from disemoji.ui import emoji_print
 
@@ -12,7 +18,25 @@ from disemoji.ui import emoji_print
 @dataclass
 class BytecodeTracer:
     traced_functions: Set[str] = field(default_factory=set)
-    _disassembled_instructions_cache: Dict[int, List[dis.Instruction]] = field(default_factory=dict)
+    # Stream the trace is written to; None means sys.stdout.
+    output: Optional[TextIO] = None
+    # False only counts executions (see execution_counts) without printing the trace.
+    print_trace: bool = True
+    # Code object -> instruction offset -> times executed, while not printing the trace (or tracking
+    # allocations); covers the latest activate() and is kept after it exits, until the next one.
+    counts: Dict[types.CodeType, Dict[int, int]] = field(default_factory=dict)
+    # True attributes memory allocations (see allocation_report) instead of printing the trace.
+    track_allocations: bool = False
+    # Opcode events between two tracemalloc snapshots in allocation mode.
+    snapshot_interval: int = 50_000
+    # Code object -> instruction offset -> net bytes allocated while it ran (from tracemalloc's counter).
+    allocations: Dict[types.CodeType, Dict[int, int]] = field(default_factory=dict)
+    # (filename, line) -> [net bytes, net blocks] from snapshot differences.
+    line_allocations: Dict[Tuple[str, int], List[int]] = field(default_factory=dict)
+    # (code, offset, traced memory) after the last traced instruction, or None.
+    _allocation_cursor: Optional[Tuple[types.CodeType, int, int]] = None
+    _last_snapshot: Optional[tracemalloc.Snapshot] = None
+    _events_since_snapshot: int = 0
     _printed_headers: Set[int] = field(default_factory=set)
     _last_printed_lines: Dict[int, int] = field(default_factory=dict)
 
@@ -27,7 +51,14 @@ class BytecodeTracer:
         Context manager for tracing that automatically
         manages state entry and exit.
         """
+        self.counts.clear()  # Do not keep code objects of earlier activations alive
+        started_tracemalloc = self.track_allocations and not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
         try:
+            if self.track_allocations:
+                self._take_allocation_snapshot()
+
             # Save the original trace function
             original_trace = sys.gettrace()
 
@@ -40,8 +71,14 @@ class BytecodeTracer:
             # Restore original trace function
             sys.settrace(original_trace)
 
+            if self.track_allocations:
+                self._take_allocation_snapshot()
+                self._last_snapshot = None
+                self._allocation_cursor = None
+                if started_tracemalloc:
+                    tracemalloc.stop()
+
             # Clear internal state
-            self._disassembled_instructions_cache.clear()
             self._printed_headers.clear()
             self._last_printed_lines.clear()
 
@@ -54,32 +91,56 @@ class BytecodeTracer:
 
         # Selective tracing based on function name
         should_trace_detail = func_name in self.traced_functions
+        if metrics.ENABLED:
+            metrics.count('trace_events_handled' if should_trace_detail else 'trace_events_ignored')
 
         if should_trace_detail:
             frame.f_trace_opcodes = True
 
+        if should_trace_detail and event == 'call':
+            frame.f_trace = self._tracer  # Makes f_trace_opcodes take effect right away
+
+        if event == 'return' and should_trace_detail and self.track_allocations:
+            self._charge_allocations()
+            # The rest of the CALL in a traced caller pays for what follows.
+            caller = frame.f_back
+            self._allocation_cursor = None
+            if caller is not None and caller.f_code.co_name in self.traced_functions:
+                self._allocation_cursor = (caller.f_code, caller.f_lasti, tracemalloc.get_traced_memory()[0])
+
         if event == 'opcode' and should_trace_detail:
             code = frame.f_code
             code_id = id(code)
             current_bytecode_offset = frame.f_lasti
+            if self.track_allocations:
+                self._charge_allocations()
+            if not self.print_trace or self.track_allocations:
+                offset_counts = self.counts.get(code)
+                if offset_counts is None:
+                    offset_counts = self.counts[code] = {}
+                offset_counts[current_bytecode_offset] = offset_counts.get(current_bytecode_offset, 0) + 1
+            if self.track_allocations:
+                # Read after the bookkeeping above, so the tracer's own allocations are not charged.
+                self._allocation_cursor = (code, current_bytecode_offset, tracemalloc.get_traced_memory()[0])
+                return self._tracer
+            if not self.print_trace:
+                return self._tracer
 
             # Print full disassembly once per function
             if code_id not in self._printed_headers:
-                emoji_print(f"\n--- Disassembly for: {func_name} ({code.co_filename}, line {code.co_firstlineno}) ---")
+                header_lines = [f"\n--- Disassembly for: {func_name} ({code.co_filename}, line {code.co_firstlineno}) ---"]
 
-                # Retrieve or cache disassembled instructions
-                if code_id not in self._disassembled_instructions_cache:
-                    self._disassembled_instructions_cache[code_id] = list(dis.Bytecode(code))
-
-                all_instrs = self._disassembled_instructions_cache[code_id]
+                all_instrs = DISASSEMBLY_CACHE.instructions(code)
 
                 for instr in all_instrs:
                     starts_line_str = f" " if instr.starts_line else "/"
                     emoji_op_name = DEFAULT_EMOJI_MAP.get(instr.opname)
-                    emoji_print(f"{starts_line_str} {instr.offset:3d}: {emoji_op_name} {instr.argrepr}")
+                    header_lines.append(f"{starts_line_str} {instr.offset:3d}: {emoji_op_name} {instr.argrepr}")
 
-                emoji_print(f"--- End Disassembly for {func_name} ---\n")
-                emoji_print(f"--- Execution Trace for {func_name} (File: {code.co_filename}) ---")
+                header_lines.append(f"--- End Disassembly for {func_name} ---\n")
+                header_lines.append(f"--- Execution Trace for {func_name} (File: {code.co_filename}) ---")
+                # One translate pass and one write for the whole block
+                emoji_print("\n".join(header_lines), file=self.output)
 
                 self._printed_headers.add(code_id)
                 self._last_printed_lines.pop(code_id, None)
@@ -93,29 +154,583 @@ class BytecodeTracer:
                     line_index = current_source_lineno - start_line
                     if 0 <= line_index < len(source_lines):
                         source_line_text = source_lines[line_index].rstrip()
-                        emoji_print(f"\nLn.{current_source_lineno:3d} {source_line_text}")
+                        emoji_print(f"\nLn.{current_source_lineno:3d} {source_line_text}", file=self.output)
                         self._last_printed_lines[code_id] = current_source_lineno
                 except (OSError, TypeError):
                     # Handle cases where source can't be retrieved
                     pass
 
             # Find and print current bytecode instruction
-            all_instructions = self._disassembled_instructions_cache[code_id]
-            current_instruction = next(
-                (instr for instr in all_instructions if instr.offset == current_bytecode_offset),
-                None
-            )
+            current_instruction = DISASSEMBLY_CACHE.instruction_at(code, current_bytecode_offset)
 
             if current_instruction:
                 emoji_op_name = DEFAULT_EMOJI_MAP.get(current_instruction.opname)
                 emoji_print(
-                    f"   {current_instruction.offset:3d}: {emoji_op_name} {current_instruction.argrepr}"
+                    f"   {current_instruction.offset:3d}: {emoji_op_name} {current_instruction.argrepr}",
+                    file=self.output
                 )
             else:
-                emoji_print(f"  --> Error: Could not find instruction at offset {current_bytecode_offset} in {func_name}.")
+                emoji_print(f"  --> Error: Could not find instruction at offset {current_bytecode_offset} in {func_name}.",
+                            file=self.output)
+
+        return self._tracer
+
+    def execution_counts(self, code: types.CodeType) -> Dict[int, int]:
+        """Returns instruction offset -> times executed for one traced code object (empty if never run)."""
+        return self.counts.get(code, {})
+
+    def _charge_allocations(self) -> None:
+        """Charges the memory traced since the last traced instruction to that instruction."""
+        cursor = self._allocation_cursor
+        if cursor is not None:
+            code, offset, baseline = cursor
+            delta = tracemalloc.get_traced_memory()[0] - baseline
+            if delta:
+                per_offset = self.allocations.setdefault(code, {})
+                per_offset[offset] = per_offset.get(offset, 0) + delta
+        self._events_since_snapshot += 1
+        if self._events_since_snapshot >= self.snapshot_interval:
+            self._take_allocation_snapshot()
+
+    def _take_allocation_snapshot(self) -> None:
+        """
+        Adds the per-line difference to the previous snapshot to line_allocations.
+
+        Differences are net: memory allocated and freed within one batch
+        does not show up. Only allocations made directly by a line of a traced function's file count;
+        the tracer's own allocations happen in this file and are filtered out.
+        """
+        snapshot = tracemalloc.take_snapshot()
+        filters = [tracemalloc.Filter(True, filename) for filename in {code.co_filename for code in self.counts}]
+        if self._last_snapshot is not None and filters:
+            current, previous = snapshot.filter_traces(filters), self._last_snapshot.filter_traces(filters)
+            for stat in current.compare_to(previous, 'lineno'):
+                if stat.size_diff or stat.count_diff:
+                    frame = stat.traceback[0]
+                    totals = self.line_allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+                    totals[0] += stat.size_diff
+                    totals[1] += stat.count_diff
+        self._last_snapshot = snapshot
+        self._events_since_snapshot = 0
+        if self._allocation_cursor is not None:
+            # Snapshots allocate too; do not charge them to the instruction.
+            code, offset, _ = self._allocation_cursor
+            self._allocation_cursor = (code, offset, tracemalloc.get_traced_memory()[0])
+
+    def allocation_report(self, emoji_map: Optional[Dict[str, str]] = None, top: int = 10) -> str:
+        """
+        Renders the allocations of each traced function, from an activation with track_allocations.
+
+        For every function: its net bytes, the `top` instructions that
+        allocated most (those with at least a tenth of the function's bytes are
+        marked ALLOCATION_MARKER), and the net bytes and blocks of each line.
+        """
+        emoji_map = DEFAULT_EMOJI_MAP if emoji_map is None else emoji_map
+        lines: List[str] = []
+        for code, per_offset in self.allocations.items():
+            total = sum(per_offset.values())
+            lines.append(f"Allocations of {getattr(code, 'co_qualname', code.co_name)} "
+                         f"({code.co_filename}, line {code.co_firstlineno}): {total:+,} bytes net")
+            by_offset = {instr.offset: instr for instr in dis.get_instructions(code)}
+            ranked = sorted(per_offset.items(), key=lambda item: item[1], reverse=True)[:top]
+            for offset, size in ranked:
+                if size <= 0:
+                    break
+                instr = by_offset.get(offset)
+                opname = instr.opname if instr is not None else '?'
+                line_number = instr.positions.lineno if instr is not None and instr.positions else None
+                marker = ALLOCATION_MARKER if total > 0 and size * 10 >= total else '  '
+                lines.append(f"  {marker} {size:>+14,} B  {emoji_map.get(opname, opname)} {opname} "
+                             f"(offset {offset}, line {line_number})")
+            code_lines = {line for _, _, line in code.co_lines() if line is not None}
+            for (filename, line_number), (size, blocks) in sorted(self.line_allocations.items()):
+                if filename == code.co_filename and line_number in code_lines:
+                    lines.append(f"     line {line_number:>5}: {size:>+14,} B in {blocks:+,} blocks")
+            lines.append("")
+        return "\n".join(lines)
+
+
+# Markers of the live view: the instruction running at redraw time, and the hottest ones.
+LIVE_MARKERS: Dict[str, str] = {'current': '👉', 'hot': '🔥'}
+
+
+@dataclass
+class LiveTracer(BytecodeTracer):
+    """
+    A BytecodeTracer that redraws a live emoji disassembly instead of printing every event.
+
+    Opcode events only bump the in-memory counters of BytecodeTracer; at most
+    `refresh_hz` times per second the traced functions are redrawn with each
+    instruction's count, the current instruction marked LIVE_MARKERS['current']
+    and the `hot_instructions` most executed ones marked LIVE_MARKERS['hot'].
+    Display cost therefore depends on the refresh rate, not on the event rate.
+
+    On a terminal each frame replaces the previous one (ANSI home + clear);
+    other streams get the frames one after another. A final frame is drawn
+    when the tracer is deactivated.
+    """
+    print_trace: bool = False
+    refresh_hz: float = 10.0
+    hot_instructions: int = 5
+    # Rows per function; longer listings show a window around the current instruction.
+    max_rows: int = 30
+    emoji_map: Optional[Dict[str, str]] = None
+    events: int = 0
+    frames_drawn: int = 0
+    _current: Optional[Tuple[types.CodeType, int]] = None
+    _next_draw: float = 0.0
+    _started: float = 0.0
 
+    @contextmanager
+    def activate(self):
+        """Context manager that traces and redraws while active, and draws a final frame on exit."""
+        self._started = time.perf_counter()
+        self._next_draw = self._started
+        try:
+            with super().activate():
+                yield self
+        finally:
+            self.redraw()
+
+    def _tracer(self, frame, event, arg):
+        super()._tracer(frame, event, arg)
+        if event == 'opcode':
+            # Only traced frames have opcode events.
+            self._current = (frame.f_code, frame.f_lasti)
+            self.events += 1
+            now = time.perf_counter()
+            if now >= self._next_draw:
+                self.redraw()
+                self._next_draw = now + 1.0 / self.refresh_hz
+            elif metrics.ENABLED:
+                metrics.count('trace_events_dropped')
         return self._tracer
 
+    def render(self) -> str:
+        """Returns the current frame: every traced function's listing with counts and markers."""
+        from disemoji.make_dis_pretty import _format_header
+
+        emoji_map = DEFAULT_EMOJI_MAP if self.emoji_map is None else self.emoji_map
+        lines: List[str] = []
+        for code, per_offset in list(self.counts.items()):
+            listing = DISASSEMBLY_CACHE.instructions(code)
+            hot = set(sorted(per_offset, key=per_offset.__getitem__, reverse=True)[:self.hot_instructions])
+            current = self._current[1] if self._current is not None and self._current[0] is code else None
+            start = 0
+            if len(listing) > self.max_rows and current is not None:
+                position = next((i for i, instr in enumerate(listing) if instr.offset == current), 0)
+                start = max(0, min(position - self.max_rows // 2, len(listing) - self.max_rows))
+            lines.append(_format_header(code))
+            rendered = DISASSEMBLY_CACHE.assembler_lines(code, emoji_map, 20)
+            for instr, line in zip(listing[start:start + self.max_rows], rendered[start:start + self.max_rows]):
+                marker = (LIVE_MARKERS['current'] if instr.offset == current
+                          else LIVE_MARKERS['hot'] if instr.offset in hot else '  ')
+                lines.append(f"{marker} {per_offset.get(instr.offset, 0):>10} {line}")
+            lines.append("")
+        elapsed = time.perf_counter() - self._started
+        rate = self.events / elapsed if elapsed > 0 else 0.0
+        lines.append(f"{self.events:,} events, {rate:,.0f} events/s, frame {self.frames_drawn + 1}")
+        return "\n".join(lines)
+
+    def redraw(self) -> None:
+        """Draws one frame to `output`."""
+        output = self.output if self.output is not None else sys.stdout
+        frame = self.render()
+        if output.isatty():
+            output.write("\x1b[H\x1b[2J" + frame + "\n")
+        else:
+            output.write(frame + "\n\n")
+        output.flush()
+        self.frames_drawn += 1
+
+
+# Marks the instructions that allocate most in BytecodeTracer.allocation_report().
+ALLOCATION_MARKER = '🔥'
+
+# Coverage markers for CoverageTracer.report().
+COVERAGE_MARKERS: Dict[str, str] = {'executed': '🟩', 'missed': '🟥'}
+
+# Conditional branches: the instructions that emit BRANCH (3.13) or BRANCH_LEFT/BRANCH_RIGHT (3.14+) events.
+_BRANCH_OPNAME_PREFIXES = ('POP_JUMP_IF_', 'FOR_ITER')
+# Instructions at a FOR_ITER's jump target that an exhausted iterator jumps over: they never run
+# (3.13 skips END_FOR and the POP_TOP after it, 3.12 and 3.14 only END_FOR).
+_FOR_ITER_SKIPPED = ('END_FOR', 'POP_TOP') if sys.version_info[:2] == (3, 13) else ('END_FOR',)
+
+
+def _set_bit(bits: bytearray, index: int) -> None:
+    bits[index >> 3] |= 1 << (index & 7)
+
+
+def _get_bit(bits: bytearray, index: int) -> bool:
+    return bool(bits[index >> 3] >> (index & 7) & 1)
+
+
+@dataclass
+class CoverageTracer:
+    """
+    Records which instructions and branch edges ran, using sys.monitoring.
+
+    Every INSTRUCTION and BRANCH event returns DISABLE, so each location
+    reports at most once and code runs at full speed after warm-up. Results
+    are bit arrays per code object: `instructions` has one bit per code unit
+    (offset // 2), `branches` two bits per code unit, for the fall-through
+    (2 * unit) and taken (2 * unit + 1) edge of the branch at that offset.
+
+    With no traced functions, all code is covered; otherwise only code
+    objects with a registered name.
+
+    Python 3.13 has a single BRANCH event per location, which can only be
+    disabled for both edges at once. By default it stays enabled until both
+    edges ran, which is exact but costs on every iteration of a loop that
+    has not finished yet; `complete_branches=False` disables it after the
+    first edge instead, at the price of missing the other one. From 3.14 on,
+    BRANCH_LEFT and BRANCH_RIGHT are disabled separately and this does not matter.
+    """
+    traced_functions: Set[str] = field(default_factory=set)
+    tool_id: int = 1  # sys.monitoring.COVERAGE_ID
+    complete_branches: bool = True
+    instructions: Dict[types.CodeType, bytearray] = field(default_factory=dict)
+    branches: Dict[types.CodeType, bytearray] = field(default_factory=dict)
+    # Offset of the next instruction after each branch, to tell its two edges apart.
+    _fallthrough: Dict[types.CodeType, Dict[int, int]] = field(default_factory=dict)
+    # Offsets that run without an INSTRUCTION event: RESUMEs, and per FOR_ITER the instructions its exit skips.
+    _resumes: Dict[types.CodeType, List[int]] = field(default_factory=dict)
+    _loop_exits: Dict[types.CodeType, Dict[int, List[int]]] = field(default_factory=dict)
+    _split_branch_events: bool = False
+
+    def trace_function(self, func_name: str):
+        """Register a function to be covered."""
+        self.traced_functions.add(func_name)
+        return self
+
+    @contextmanager
+    def activate(self):
+        """
+        Context manager that records coverage while active.
+
+        Results are kept after exit, and further activations add to them.
+
+        Raises:
+            RuntimeError: If sys.monitoring is unavailable (Python < 3.12).
+            ValueError: If another tool holds `tool_id`.
+        """
+        monitoring = getattr(sys, 'monitoring', None)
+        if monitoring is None:
+            raise RuntimeError("CoverageTracer needs sys.monitoring (Python 3.12+)")
+        events = monitoring.events
+        # 3.14 splits BRANCH into BRANCH_LEFT and BRANCH_RIGHT.
+        branch_events = [getattr(events, name) for name in ('BRANCH_LEFT', 'BRANCH_RIGHT') if hasattr(events, name)]
+        self._split_branch_events = bool(branch_events)
+        branch_events = branch_events or [events.BRANCH]
+        covered_events = events.INSTRUCTION
+        for event in branch_events:
+            covered_events |= event
+
+        monitoring.use_tool_id(self.tool_id, 'disemoji-coverage')
+        try:
+            monitoring.register_callback(self.tool_id, events.INSTRUCTION, self._on_instruction)
+            for event in branch_events:
+                monitoring.register_callback(self.tool_id, event, self._on_branch)
+            # Locations disabled by an earlier run must report again.
+            monitoring.restart_events()
+            if self.traced_functions:
+                def on_start(code: types.CodeType, instruction_offset: int) -> Any:
+                    if code.co_name in self.traced_functions:
+                        monitoring.set_local_events(self.tool_id, code, covered_events)
+                        # The instruction that started the frame has already run.
+                        _set_bit(self._bitmaps(code), instruction_offset >> 1)
+                    return monitoring.DISABLE
+
+                monitoring.register_callback(self.tool_id, events.PY_START, on_start)
+                monitoring.set_events(self.tool_id, events.PY_START)
+            else:
+                monitoring.set_events(self.tool_id, covered_events)
+            yield self
+        finally:
+            monitoring.set_events(self.tool_id, events.NO_EVENTS)
+            for code in self.instructions:
+                monitoring.set_local_events(self.tool_id, code, events.NO_EVENTS)
+            monitoring.free_tool_id(self.tool_id)
+
+    def _bitmaps(self, code: types.CodeType) -> bytearray:
+        bits = self.instructions.get(code)
+        if bits is None:
+            units = len(code.co_code) // 2
+            bits = self.instructions[code] = bytearray((units + 7) // 8)
+            self.branches[code] = bytearray((2 * units + 7) // 8)
+            instructions = list(dis.get_instructions(code))
+            self._fallthrough[code] = {
+                instr.offset: following.offset for instr, following in zip(instructions, instructions[1:])
+                if instr.opname.startswith(_BRANCH_OPNAME_PREFIXES)
+            }
+            self._resumes[code] = [instr.offset for instr in instructions if instr.opname == 'RESUME']
+            by_offset = {instr.offset: index for index, instr in enumerate(instructions)}
+            loop_exits: Dict[int, List[int]] = {}
+            for instr in instructions:
+                if instr.opname == 'FOR_ITER' and instr.jump_target in by_offset:
+                    following = instructions[by_offset[instr.jump_target]:][:len(_FOR_ITER_SKIPPED)]
+                    loop_exits[instr.offset] = [skipped.offset for skipped, opname in zip(following, _FOR_ITER_SKIPPED)
+                                                if skipped.opname == opname]
+            self._loop_exits[code] = loop_exits
+        return bits
+
+    def _covered(self, code: types.CodeType) -> bytearray:
+        """
+        Returns the instruction bits of a code object, completed with instructions that run
+        without reporting an INSTRUCTION event.
+
+        RESUME never reports one, so it counts as executed once anything in the code ran;
+        the END_FOR (and on 3.13 the POP_TOP) an exhausted FOR_ITER jumps over count as
+        executed once that loop exit was taken, since they can never run themselves.
+        """
+        bits = bytearray(self.instructions[code])
+        if any(bits):
+            for offset in self._resumes[code]:
+                _set_bit(bits, offset >> 1)
+        edges = self.branches[code]
+        for offset, skipped in self._loop_exits[code].items():
+            if _get_bit(edges, 2 * (offset >> 1) + 1):
+                for skipped_offset in skipped:
+                    _set_bit(bits, skipped_offset >> 1)
+        return bits
+
+    def _on_instruction(self, code: types.CodeType, instruction_offset: int) -> Any:
+        if metrics.ENABLED:
+            metrics.count('trace_events_handled')
+        _set_bit(self._bitmaps(code), instruction_offset >> 1)
+        return sys.monitoring.DISABLE
+
+    def _on_branch(self, code: types.CodeType, instruction_offset: int, destination_offset: int) -> Any:
+        if metrics.ENABLED:
+            metrics.count('trace_events_handled')
+        self._bitmaps(code)
+        edges = self.branches[code]
+        unit = 2 * (instruction_offset >> 1)
+        _set_bit(edges, unit + (destination_offset != self._fallthrough[code].get(instruction_offset)))
+        # A 3.13 BRANCH event covers both edges of its location, so it may
+        # only be disabled once both ran; BRANCH_LEFT/RIGHT are disabled separately.
+        if (self._split_branch_events or not self.complete_branches
+                or (_get_bit(edges, unit) and _get_bit(edges, unit + 1))):
+            return sys.monitoring.DISABLE
+        return None
+
+    def executed(self, code: types.CodeType, offset: int) -> bool:
+        """Returns whether the instruction at `offset` in `code` ran."""
+        return code in self.instructions and _get_bit(self._covered(code), offset >> 1)
+
+    def summary(self) -> Dict[str, int]:
+        """Counts instructions and branch edges, executed and total, over all covered code objects."""
+        counts = {'instructions': 0, 'executed_instructions': 0, 'branch_edges': 0, 'executed_branch_edges': 0}
+        for code in self.instructions:
+            bits = self._covered(code)
+            for instr in dis.get_instructions(code):
+                counts['instructions'] += 1
+                counts['executed_instructions'] += _get_bit(bits, instr.offset >> 1)
+                if instr.offset in self._fallthrough[code]:
+                    counts['branch_edges'] += 2
+                    counts['executed_branch_edges'] += sum(
+                        _get_bit(self.branches[code], 2 * (instr.offset >> 1) + taken) for taken in (0, 1))
+        return counts
+
+    def report(self, emoji_map: Optional[Dict[str, str]] = None, opname_width: int = 20) -> str:
+        """
+        Renders the covered code objects as emoji assembler listings.
+
+        Each instruction is prefixed with COVERAGE_MARKERS['executed'] or
+        ['missed']; conditional branches get a second line with the marker of
+        each edge.
+        """
+        from disemoji.make_dis_pretty import _format_header, _format_instruction_assembler
+
+        emoji_map = DEFAULT_EMOJI_MAP if emoji_map is None else emoji_map
+        marker = {True: COVERAGE_MARKERS['executed'], False: COVERAGE_MARKERS['missed']}
+        lines: List[str] = []
+        for code in self.instructions:
+            bits = self._covered(code)
+            lines.append(_format_header(code))
+            for instr in dis.get_instructions(code):
+                executed = _get_bit(bits, instr.offset >> 1)
+                lines.append(marker[executed] + _format_instruction_assembler(instr, emoji_map, opname_width))
+                if instr.offset in self._fallthrough[code]:
+                    edges = self.branches[code]
+                    unit = 2 * (instr.offset >> 1)
+                    lines.append(f"{'':15}↳ fall through {marker[_get_bit(edges, unit)]} "
+                                 f"jump {marker[_get_bit(edges, unit + 1)]}")
+            lines.append("")
+        counts = self.summary()
+        lines.append(f"Coverage: {counts['executed_instructions']}/{counts['instructions']} instructions, "
+                     f"{counts['executed_branch_edges']}/{counts['branch_edges']} branch edges")
+        return "\n".join(lines)
+
+
+# Heat scale for LineProfiler.report(), coolest first, by share of the hottest line's time.
+LINE_HEAT: List[str] = ['⬜', '🟦', '🟩', '🟨', '🟧', '🟥', '🔥']
+
+
+@dataclass
+class LineProfiler:
+    """
+    Measures wall time and hits per source line, using sys.monitoring LINE events.
+
+    Unlike BytecodeTracer no opcode events are requested, so profiled code
+    pays for one callback per executed line, and nothing elsewhere. The time
+    of a line runs from its LINE event to the next event of the same frame,
+    so it includes the calls the line makes. Results accumulate per
+    (code object, line number) in `times` (nanoseconds) and `hits`.
+
+    With no traced functions, all code is profiled; otherwise only code
+    objects with a registered name.
+    """
+    traced_functions: Set[str] = field(default_factory=set)
+    tool_id: int = 2  # sys.monitoring.PROFILER_ID
+    times: Dict[Tuple[types.CodeType, int], int] = field(default_factory=dict)
+    hits: Dict[Tuple[types.CodeType, int], int] = field(default_factory=dict)
+    # Per thread: stack of [code, current line, perf_counter_ns when it started] for running frames.
+    _frames: threading.local = field(default_factory=threading.local)
+    # (code, offset of a PY_RESUME) -> its line number.
+    _resume_lines: Dict[Tuple[types.CodeType, int], Optional[int]] = field(default_factory=dict)
+
+    def trace_function(self, func_name: str):
+        """Register a function to be profiled."""
+        self.traced_functions.add(func_name)
+        return self
+
+    @contextmanager
+    def activate(self):
+        """
+        Context manager that profiles while active.
+
+        Results are kept after exit, and further activations add to them.
+
+        Raises:
+            RuntimeError: If sys.monitoring is unavailable (Python < 3.12).
+            ValueError: If another tool holds `tool_id`.
+        """
+        monitoring = getattr(sys, 'monitoring', None)
+        if monitoring is None:
+            raise RuntimeError("LineProfiler needs sys.monitoring (Python 3.12+)")
+        events = monitoring.events
+        local_events = events.LINE | events.PY_RETURN | events.PY_YIELD | events.PY_RESUME
+        monitoring.use_tool_id(self.tool_id, 'disemoji-line-profiler')
+        profiled: Set[types.CodeType] = set()
+        try:
+            monitoring.register_callback(self.tool_id, events.PY_START, self._on_start)
+            monitoring.register_callback(self.tool_id, events.PY_RESUME, self._on_resume)
+            monitoring.register_callback(self.tool_id, events.LINE, self._on_line)
+            for event in (events.PY_RETURN, events.PY_YIELD, events.PY_UNWIND):
+                monitoring.register_callback(self.tool_id, event, self._on_exit)
+            monitoring.restart_events()
+            if self.traced_functions:
+                def on_start(code: types.CodeType, instruction_offset: int) -> Any:
+                    if code.co_name not in self.traced_functions:
+                        return monitoring.DISABLE
+                    if code not in profiled:
+                        profiled.add(code)
+                        monitoring.set_local_events(self.tool_id, code, local_events)
+                    return self._on_start(code, instruction_offset)
+
+                monitoring.register_callback(self.tool_id, events.PY_START, on_start)
+                monitoring.set_events(self.tool_id, events.PY_START | events.PY_UNWIND)
+            else:
+                monitoring.set_events(self.tool_id, events.PY_START | events.PY_UNWIND | local_events)
+            yield self
+        finally:
+            monitoring.set_events(self.tool_id, events.NO_EVENTS)
+            for code in profiled:
+                monitoring.set_local_events(self.tool_id, code, events.NO_EVENTS)
+            monitoring.free_tool_id(self.tool_id)
+            self._frames = threading.local()
+
+    def _stack(self) -> List[List[Any]]:
+        stack = getattr(self._frames, 'stack', None)
+        if stack is None:
+            stack = self._frames.stack = []
+        return stack
+
+    def _on_start(self, code: types.CodeType, instruction_offset: int) -> Any:
+        self._stack().append([code, None, time.perf_counter_ns()])
+
+    def _on_resume(self, code: types.CodeType, instruction_offset: int) -> Any:
+        # A generator resumes mid-line, usually without a LINE event: keep charging that line.
+        key = (code, instruction_offset)
+        line_number = self._resume_lines.get(key)
+        if line_number is None:
+            line_number = next((line for start, end, line in code.co_lines() if start <= instruction_offset < end),
+                               None)
+            self._resume_lines[key] = line_number
+        self._stack().append([code, line_number, time.perf_counter_ns()])
+
+    def _on_line(self, code: types.CodeType, line_number: int) -> Any:
+        now = time.perf_counter_ns()
+        if metrics.ENABLED:
+            metrics.count('trace_events_handled')
+        stack = self._stack()
+        if not stack or stack[-1][0] is not code:
+            # Activated inside this frame: start timing it from here.
+            stack.append([code, None, now])
+        frame = stack[-1]
+        if frame[1] is not None:
+            key = (code, frame[1])
+            self.times[key] = self.times.get(key, 0) + now - frame[2]
+        key = (code, line_number)
+        self.hits[key] = self.hits.get(key, 0) + 1
+        frame[1] = line_number
+        frame[2] = time.perf_counter_ns()  # Leave the callback's own time out
+
+    def _on_exit(self, code: types.CodeType, instruction_offset: int, value: Any) -> Any:
+        now = time.perf_counter_ns()
+        stack = self._stack()
+        if not stack or stack[-1][0] is not code:
+            if metrics.ENABLED:
+                metrics.count('trace_events_ignored')
+            return None  # PY_UNWIND is global: a frame that was not profiled
+        if metrics.ENABLED:
+            metrics.count('trace_events_handled')
+        _, line_number, started = stack.pop()
+        if line_number is not None:
+            key = (code, line_number)
+            self.times[key] = self.times.get(key, 0) + now - started
+        return None
+
+    def report(self) -> str:
+        """
+        Renders the source of each profiled function annotated with time, hits and heat.
+
+        Each line shows its total time, hit count, time per hit, share of the
+        function's time and a LINE_HEAT emoji relative to the function's hottest line.
+        """
+        by_code: Dict[types.CodeType, Dict[int, Tuple[int, int]]] = {}
+        for key in self.hits.keys() | self.times.keys():
+            code, line_number = key
+            by_code.setdefault(code, {})[line_number] = (self.times.get(key, 0), self.hits.get(key, 0))
+
+        lines: List[str] = []
+        for code, per_line in by_code.items():
+            total = sum(elapsed for elapsed, _ in per_line.values())
+            hottest = max(elapsed for elapsed, _ in per_line.values()) or 1
+            lines.append(f"Line profile of {getattr(code, 'co_qualname', code.co_name)} "
+                         f"({code.co_filename}, line {code.co_firstlineno}): {total / 1e6:.3f} ms")
+            lines.append(f"{'':2} {'Line':>5} {'Time ms':>10} {'Hits':>8} {'Per hit µs':>11} {'%':>6}  Source")
+            try:
+                source_lines, start_line = inspect.getsourcelines(code)
+            except (OSError, TypeError):
+                source_lines, start_line = [], code.co_firstlineno
+            numbers = range(start_line, start_line + len(source_lines)) if source_lines else sorted(per_line)
+            for line_number in numbers:
+                index = line_number - start_line
+                text = source_lines[index].rstrip() if 0 <= index < len(source_lines) else ''
+                if line_number not in per_line:
+                    lines.append(f"{'':2} {line_number:>5} {'':10} {'':8} {'':11} {'':6}  {text}")
+                    continue
+                elapsed, hits = per_line[line_number]
+                heat = LINE_HEAT[round(elapsed / hottest * (len(LINE_HEAT) - 1))]
+                per_hit = elapsed / hits / 1e3 if hits else 0.0
+                share = elapsed / total if total else 0.0
+                lines.append(f"{heat} {line_number:>5} {elapsed / 1e6:>10.3f} {hits:>8} {per_hit:>11.2f} "
+                             f"{share:>6.1%}  {text}")
+            lines.append("")
+        return "\n".join(lines)
+
 
 # Example usage
 def test_tracer():
@@ -130,5 +745,67 @@ def test_tracer():
     with tracer.trace_function('sample_function').activate():
         sample_function(3, 4)
 
+def test_coverage():
+    coverage = CoverageTracer()
+
+    def classify(n):
+        if n < 0:
+            return 'negative'
+        for divisor in (2, 3):
+            if n % divisor == 0:
+                return f'divisible by {divisor}'
+        return 'other'
+
+    with coverage.trace_function('classify').activate():
+        classify(4)
+        classify(7)
+    print(coverage.report())
+
+def test_allocations():
+    tracer = BytecodeTracer(track_allocations=True)
+
+    def build_rows(n):
+        rows = []
+        for i in range(n):
+            rows.append([i, str(i), {'square': i * i}])
+        return rows
+
+    with tracer.trace_function('build_rows').activate():
+        rows = build_rows(2_000)  # Kept alive, so the final snapshot still sees it
+    print(tracer.allocation_report())
+    del rows
+
+def test_live_tracer():
+    tracer = LiveTracer(refresh_hz=4)
+
+    def busy(seconds):
+        deadline = time.perf_counter() + seconds
+        total = 0
+        while time.perf_counter() < deadline:
+            total += 1
+        return total
+
+    with tracer.trace_function('busy').activate():
+        busy(1.0)
+
+def test_line_profiler():
+    profiler = LineProfiler()
+
+    def primes(limit):
+        found = []
+        for n in range(2, limit):
+            if all(n % p for p in found if p * p <= n):
+                found.append(n)
+        return found
+
+    with profiler.trace_function('primes').activate():
+        primes(20_000)
+    print(profiler.report())
+
+
 if __name__ == "__main__":
     test_tracer()
+    test_coverage()
+    test_allocations()
+    test_live_tracer()
+    test_line_profiler()
@@ -1,43 +1,51 @@
-from typing import Dict, Optional
+import sys
+from typing import Dict, Optional, TextIO
 
-def emoji_print(text: str) -> str:
+from disemoji import metrics
+
+# Characters with a 1:1 emoji replacement.
+EMOJI_CHARACTER_MAP: Dict[str, str] = {
+    '0': '0️⃣', '1': '1️⃣', '2': '2️⃣', '3': '3️⃣', '4': '4️⃣',
+    '5': '5️⃣', '6': '6️⃣', '7': '7️⃣', '8': '8️⃣', '9': '9️⃣',
+    '#': '#️⃣', '*': '*️⃣',
+     #
+    'a': '🅐', 'b': '🅑', 'c': '🅒', 'd': '🅓', 'e': '🅔',
+    'f': '🅕', 'g': '🅖', 'h': '🅗', 'i': '🅘', 'j': '🅙',
+    'k': '🅚', 'l': '🅛', 'm': '🅜', 'n': '🅝', 'o': '🅞',
+    'p': '🅟', 'q': '🅠', 'r': '🅡', 's': '🅢', 't': '🅣',
+    'u': '🅤', 'v': '🅥', 'w': '🅦', 'x': '🅧', 'y': '🅨',
+    'z': '🅩',
+    'A': '🅐', 'B': '🅑', 'C': '🅒', 'D': '🅓', 'E': '🅔',
+    'F': '🅕', 'G': '🅖', 'H': '🅗', 'I': '🅘', 'J': '🅙',
+    'K': '🅚', 'L': '🅛', 'M': '🅜', 'N': '🅝', 'O': '🅞',
+    'P': '🅟', 'Q': '🅠', 'R': '🅡', 'S': '🅢', 'T': '🅣',
+    'U': '🅤', 'V': '🅥', 'W': '🅦', 'X': '🅧', 'Y': '🅨',
+    'Z': '🅩',
+    '!': '❗', '?': '❓',
+    ' ': '⬛'
+}
+
+# Precomputed once so that every call is a single str.translate pass.
+EMOJI_TRANSLATION_TABLE = str.maketrans(EMOJI_CHARACTER_MAP)
+
+
+def emoji_print(text: str, print_result: bool = True, file: Optional[TextIO] = None) -> str:
     """
     Replaces characters in a string with corresponding emojis if a 1:1 mapping exists.
     Leaves emojis and unknown characters unchanged.
 
     Args:
-        text: The input string.
+        text: The input string. Large multi-line blocks are converted in one pass.
+        print_result: Print the converted string. Pass False to only return it.
+        file: The stream to print to. Defaults to sys.stdout.
 
     Returns:
         The string with characters replaced by emojis where possible.
     """
-    emoji_map: Dict[str, str] = {
-        '0': '0️⃣', '1': '1️⃣', '2': '2️⃣', '3': '3️⃣', '4': '4️⃣',
-        '5': '5️⃣', '6': '6️⃣', '7': '7️⃣', '8': '8️⃣', '9': '9️⃣',
-        '#': '#️⃣', '*': '*️⃣',
-         #
-        'a': '🅐', 'b': '🅑', 'c': '🅒', 'd': '🅓', 'e': '🅔',
-        'f': '🅕', 'g': '🅖', 'h': '🅗', 'i': '🅘', 'j': '🅙',
-        'k': '🅚', 'l': '🅛', 'm': '🅜', 'n': '🅝', 'o': '🅞',
-        'p': '🅟', 'q': '🅠', 'r': '🅡', 's': '🅢', 't': '🅣',
-        'u': '🅤', 'v': '🅥', 'w': '🅦', 'x': '🅧', 'y': '🅨',
-        'z': '🅩',
-        'A': '🅐', 'B': '🅑', 'C': '🅒', 'D': '🅓', 'E': '🅔',
-        'F': '🅕', 'G': '🅖', 'H': '🅗', 'I': '🅘', 'J': '🅙',
-        'K': '🅚', 'L': '🅛', 'M': '🅜', 'N': '🅝', 'O': '🅞',
-        'P': '🅟', 'Q': '🅠', 'R': '🅡', 'S': '🅢', 'T': '🅣',
-        'U': '🅤', 'V': '🅥', 'W': '🅦', 'X': '🅧', 'Y': '🅨',
-        'Z': '🅩',
-        '!': '❗', '?': '❓',
-        ' ': '⬛'
-    }
-    result = ""
-    for char in text:
-        if char in emoji_map:
-            result += emoji_map[char]
-        else:
-            result += char
-    print(result)
+    result = text.translate(EMOJI_TRANSLATION_TABLE)
+    if print_result:
+        with metrics.timed('print'):
+            print(result, file=file if file is not None else sys.stdout)
     return result
 
 if __name__ == '__main__':
@@ -0,0 +1,39 @@
+import glob
+import os
+import sys
+import sysconfig
+
+import pytest
+
+from disemoji.assembler import assemble, generate_emoji_assembly, iter_code_objects
+from disemoji.codes import DEFAULT_EMOJI_MAP
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'disemoji')
+STDLIB = sysconfig.get_paths()['stdlib']
+CORPUS = [*sorted(glob.glob(os.path.join(PACKAGE_DIR, '*.py'))),
+          *(os.path.join(STDLIB, name) for name in ('argparse.py', 'dataclasses.py', 'enum.py', 'typing.py'))]
+
+# The listing format relies on dis.Instruction.line_number and friends.
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 13), reason="the assembler needs Python 3.13+")
+
+
+@pytest.mark.parametrize('path', CORPUS, ids=os.path.basename)
+def test_assembly_round_trips(path):
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+    assembled = assemble(generate_emoji_assembly(code, DEFAULT_EMOJI_MAP), DEFAULT_EMOJI_MAP)
+
+    originals, results = list(iter_code_objects(code)), list(iter_code_objects(assembled))
+    assert len(results) == len(originals)
+    for original, result in zip(originals, results):
+        assert result.co_code == original.co_code, original.co_qualname
+
+
+def test_nested_code_objects_assemble_on_their_own():
+    import argparse
+
+    with open(argparse.__file__, 'rb') as f:
+        code = compile(f.read(), argparse.__file__, 'exec', dont_inherit=True)
+    for nested in iter_code_objects(code):
+        assembled = assemble(generate_emoji_assembly(nested, DEFAULT_EMOJI_MAP), DEFAULT_EMOJI_MAP)
+        assert assembled.co_code == nested.co_code, nested.co_qualname
@@ -0,0 +1,139 @@
+import glob
+import hashlib
+import json
+import marshal
+import os
+import subprocess
+import sys
+
+import pytest
+
+from disemoji.single_byte_map_works import canonical_marshal, code_to_emojis, emojis_to_python
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'disemoji')
+CORPUS = sorted(glob.glob(os.path.join(PACKAGE_DIR, '*.py')))
+
+# Frozenset constants (from `in {...}` tests) iterate in an order that follows string hashes.
+FROZENSET_SOURCE = '''
+def classify(word):
+    if word in {"alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"}:
+        return "greek"
+    return "other" if word not in {"one", "two", "three", "four", "five"} else "number"
+
+class Shape:
+    def area(self):
+        return 0
+'''
+
+# Compiles each file freshly and prints the SHA-256 of its canonical marshal bytes as JSON.
+_DIGESTS_SCRIPT = '''
+import hashlib, json, sys
+from disemoji.single_byte_map_works import canonical_marshal
+
+digests = {}
+for path in sys.argv[1:]:
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+    digests[path] = hashlib.sha256(canonical_marshal(code)).hexdigest()
+print(json.dumps(digests))
+'''
+
+
+def _digests_in_subprocess(paths, seed):
+    env = dict(os.environ, PYTHONHASHSEED=seed,
+               PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(PACKAGE_DIR), os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-c', _DIGESTS_SCRIPT, *paths], env=env, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout)
+
+
+def _compile(source, filename='<string>'):
+    return compile(source, filename, 'exec', dont_inherit=True)
+
+
+@pytest.fixture(scope='module')
+def frozenset_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp('corpus') / 'frozensets.py'
+    path.write_text(FROZENSET_SOURCE)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def expected_digests(frozenset_file):
+    return _digests_in_subprocess([*CORPUS, frozenset_file], '0')
+
+
+@pytest.mark.parametrize('seed', ['1', '12345', 'random'])
+def test_fresh_compiles_are_identical_across_hash_seeds(seed, frozenset_file, expected_digests):
+    assert _digests_in_subprocess([*CORPUS, frozenset_file], seed) == expected_digests
+
+
+def test_fresh_compiles_are_identical_in_process(expected_digests):
+    for path in CORPUS:
+        with open(path, 'rb') as f:
+            data = canonical_marshal(_compile(f.read(), path))
+        assert hashlib.sha256(data).hexdigest() == expected_digests[path], path
+
+
+def test_loads_back_equal_code():
+    for path in CORPUS:
+        with open(path, 'rb') as f:
+            code = _compile(f.read(), path)
+        assert marshal.loads(canonical_marshal(code)) == code, path
+
+
+def test_frozenset_constants():
+    code = _compile(FROZENSET_SOURCE)
+    classify = next(const for const in code.co_consts if hasattr(const, 'co_code'))
+    frozensets = [const for const in classify.co_consts if isinstance(const, frozenset)]
+    assert len(frozensets) == 2
+
+    loaded = marshal.loads(canonical_marshal(code))
+    assert loaded == code
+    assert canonical_marshal(loaded) == canonical_marshal(code)
+
+
+def test_filename_option():
+    first = _compile(FROZENSET_SOURCE, 'first.py')
+    second = _compile(FROZENSET_SOURCE, 'second.py')
+    assert canonical_marshal(first) != canonical_marshal(second)
+    assert canonical_marshal(first, filename='shape.py') == canonical_marshal(second, filename='shape.py')
+
+    loaded = marshal.loads(canonical_marshal(first, filename='shape.py'))
+    stack = [loaded]
+    while stack:
+        code = stack.pop()
+        assert code.co_filename == 'shape.py'
+        stack.extend(const for const in code.co_consts if hasattr(const, 'co_code'))
+
+
+def test_strip_locations_option():
+    code = _compile(FROZENSET_SOURCE)
+    shifted = _compile('\n\n\n' + FROZENSET_SOURCE)
+    assert canonical_marshal(code) != canonical_marshal(shifted)
+    assert canonical_marshal(code, strip_locations=True) == canonical_marshal(shifted, strip_locations=True)
+
+    loaded = marshal.loads(canonical_marshal(shifted, strip_locations=True))
+    assert loaded.co_firstlineno == 1
+    assert [line for _, _, line in loaded.co_lines() if line is not None] == []
+
+
+@pytest.mark.parametrize('body', ['x = 4', 'x = 4\n    y = 1', 'pass'])
+def test_strip_locations_class_firstlineno(body):
+    # On line 4 the class's __firstlineno__ constant is shared with `x = 4`.
+    source = f'\n\n\nclass Shape:\n    {body}\n'
+    stripped = canonical_marshal(_compile(source), strip_locations=True)
+    assert stripped == canonical_marshal(_compile('\n' + source), strip_locations=True)
+
+    namespace = {}
+    exec(marshal.loads(stripped), namespace)
+    assert getattr(namespace['Shape'], 'x', 4) == 4
+    assert getattr(namespace['Shape'], '__firstlineno__', 1) == 1
+
+
+def test_code_to_emojis_canonical_round_trip():
+    code = _compile(FROZENSET_SOURCE)
+    emojis = code_to_emojis(code, canonical=True, filename='shape.py', strip_locations=True)
+    assert emojis == code_to_emojis(_compile('\n' + FROZENSET_SOURCE, 'other.py'), canonical=True,
+                                    filename='shape.py', strip_locations=True)
+    assert emojis_to_python(emojis) == marshal.loads(canonical_marshal(code, 'shape.py', strip_locations=True))
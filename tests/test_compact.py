@@ -0,0 +1,36 @@
+import dis
+import os
+import sysconfig
+
+import pytest
+
+from disemoji.assembler import iter_code_objects
+from disemoji.codes import DEFAULT_EMOJI_MAP
+from disemoji.compact import BUILTIN_TRAINING_FILES, compact_stream, expand_stream, load_builtin_dictionary
+
+STDLIB = sysconfig.get_paths()['stdlib']
+# Training files plus held-out ones the dictionary has not seen.
+CORPUS = [name for name in (*BUILTIN_TRAINING_FILES, 'http/client.py', 'pydoc.py', 'asyncio/base_events.py')
+          if os.path.exists(os.path.join(STDLIB, *name.split('/')))]
+
+
+@pytest.fixture(scope='module')
+def dictionary(tmp_path_factory):
+    return load_builtin_dictionary(cache_dir=str(tmp_path_factory.mktemp('cache')))
+
+
+@pytest.mark.parametrize('name', CORPUS)
+def test_expand_restores_opnames(name, dictionary):
+    path = os.path.join(STDLIB, *name.split('/'))
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+    for nested in iter_code_objects(code):
+        stream = compact_stream(nested, DEFAULT_EMOJI_MAP, dictionary)
+        expected = [instruction.opname for instruction in dis.get_instructions(nested)]
+        assert expand_stream(stream, DEFAULT_EMOJI_MAP, dictionary) == expected, nested.co_qualname
+
+
+def test_dictionary_round_trips_through_its_cache(tmp_path, dictionary):
+    cached = load_builtin_dictionary(cache_dir=str(tmp_path))
+    assert load_builtin_dictionary(cache_dir=str(tmp_path)).entries == cached.entries
+    assert cached.entries == dictionary.entries
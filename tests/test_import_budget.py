@@ -0,0 +1,5 @@
+from disemoji.bench import IMPORT_BUDGET_US, check_import_budget
+
+
+def test_import_stays_within_budget():
+    assert check_import_budget() <= IMPORT_BUDGET_US